@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""Measure md_tokenizer throughput on a synthetic devlog.
+
+Usage:
+    python benchmarks/bench_md_tokenizer.py [--size-mb 100]
+"""
+
+import argparse
+import time
+
+from lumpy_log.md_tokenizer import tokenize_blocks
+from lumpy_log.utils import DEVLOG_SEPARATOR
+
+ITEM = """# Commit {n}: Refactor the **parser** for item {n}
+
+**Author:** Dev Eloper
+**Date:** 2024-01-15 10:{minute:02d}
+
+Reworked the `tokenize` step so that paragraphs are joined once and
+_inline_ formatting is handled later. This line wraps onto a second
+line to exercise paragraph continuation.
+
+## Modified files
+
+- lumpy_log/md_to_docx.py
+  - converted lines {n}
+- tests/test_md_to_docx.py
+1. First step
+2. Second step
+
+```python
+def handler_{n}(value):
+    return value * {n}
+```
+"""
+
+
+def build_devlog(size_bytes: int) -> str:
+    """Build a devlog of roughly size_bytes from repeated commit items."""
+    parts = []
+    total = 0
+    n = 0
+    while total < size_bytes:
+        part = ITEM.format(n=n, minute=n % 60) + DEVLOG_SEPARATOR
+        parts.append(part)
+        total += len(part)
+        n += 1
+    return "".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=100, help="Size of the synthetic devlog in MB (default: 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs; the best is reported (default: 3)")
+    args = parser.parse_args()
+
+    devlog = build_devlog(int(args.size_mb * 1024 * 1024))
+    lines = devlog.split("\n")
+    size_mb = len(devlog.encode("utf-8")) / (1024 * 1024)
+    print(f"Synthetic devlog: {size_mb:.1f} MB, {len(lines):,} lines")
+
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        events = sum(1 for _ in tokenize_blocks(lines))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"Events: {events:,}")
+    print(f"Best of {args.repeat}: {best:.2f}s ({size_mb / best:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,54 @@
-import re
-from lumpy_log.list1 import list1
+from lumpy_log.list1 import list1view
+
+# Bump whenever lump detection changes change log output, so change logs
+# written by earlier versions are regenerated rather than resumed past
+# 2: multiline block comments (including their closing lines) are detected
+# 3: changed methods are listed in source order
+LUMP_FORMAT = 3
+
+def multiline_comment_mask(lang, lines):
+    """Work out which lines of a file sit inside a multiline comment.
+
+    Scans the file once with the language's compiled patterns, so every lump cut
+    from the same file can share the result. Returns a list where mask[i] is
+    True if 1-indexed line i opens, continues or closes a comment (mask[0] is
+    unused), or None if the language has no multiline comments.
+    """
+    patterns = lang.comment_patterns
+    begin_re = patterns["begin"]
+    end_re = patterns["end"]
+    symmetric = patterns["symmetric"]
+    if not begin_re:
+        return None
+
+    mask = [False]
+    in_comment = False
+    for s in lines:
+        was_in_comment = in_comment
+        if symmetric:
+            # For symmetric delimiters (like """ in Python), each occurrence
+            # toggles the comment state: first one opens, second one closes, etc.
+            # Example: """comment""" means we enter on first """, exit on second
+            for _ in begin_re.finditer(s):
+                in_comment = not in_comment  # Flip True->False or False->True
+        else:
+            # For asymmetric delimiters, process begins first, then ends
+            if not in_comment and begin_re.search(s):
+                in_comment = True
+            if in_comment and end_re.search(s):
+                in_comment = False
+        mask.append(was_in_comment or in_comment)
+    return mask
+
 
 class ChangeLump(object):
-    def __init__(self, lang, lines, start=None, end=None, func=None, verbose=False):
+    def __init__(self, lang, lines, start=None, end=None, func=None, verbose=False, comment_mask=None):
         self.verbose = False and verbose
         self.lang = lang
-        self.lines = list1(lines)
+        # Read-only view: lumps from the same file share one list of lines
+        self.lines = lines if isinstance(lines, list1view) else list1view(lines)
+        # Shared per-file multiline comment state, see multiline_comment_mask
+        self.comment_mask = comment_mask
         self.commentStart = None
         self.multiLineStart = None
         self.multiLine = False
@@ -111,76 +154,36 @@ class ChangeLump(object):
         line = self.lines[i]
         if(self.verbose):
             print(self.lang.name, "self.lang.comment_structure",self.lang.comment_structure)
-        comment_structure = self.lang.comment_structure
+        patterns = self.lang.comment_patterns
 
-        begin = comment_structure.get("begin")
-        end = comment_structure.get("end")
-        single = comment_structure.get("single")
+        begin = patterns["begin"]
+        end = patterns["end"]
+        single = patterns["single"]
 
         # Multiline comments: treat lines with both begin and end as comment,
         # and any line inside unmatched begin/end pairs as comment.
         if begin:
-            try:
-                beginmatches = re.findall(begin, line)
-                endmatches = re.findall(end, line)
-
-                # If both markers appear on the same line, it's a comment line.
-                if len(beginmatches) and len(endmatches):
-                    return True
-                
-                # If this line is inside an open multiline comment, it's a comment.
-                if self._in_multiline_comment(i, begin, end):
-                    return True
-            except Exception as Err:
-                print(type(Err), Err)
-                print(self.lang.comment_family, comment_structure)
+            # If both markers appear on the same line, it's a comment line.
+            if begin.search(line) and end.search(line):
+                return True
+            
+            # If this line is inside an open multiline comment, it's a comment.
+            if self._in_multiline_comment(i):
+                return True
 
         # Single-line comments
-        if single:
-            try:
-                if re.search(single, line.strip()):
-                    return True
-            except Exception as Err:
-                print("Single", type(Err), Err)
-                print(self.lang.comment_family, comment_structure["single"])
+        if single and single.search(line.strip()):
+            return True
 
         return False
 
-    def _in_multiline_comment(self, i, begin_re, end_re):
+    def _in_multiline_comment(self, i):
         """Return True if line i is inside an unmatched multiline comment block."""
         try:
-            # Check if begin and end delimiters are the same (symmetric like """)
-            # Strip common regex anchors to compare the actual delimiter strings
-            begin_stripped = begin_re.strip('^$\\s')
-            end_stripped = end_re.strip('^$\\s')
-            symmetric = (begin_stripped == end_stripped)
-            
-            in_comment = False
-            for idx in range(0, i + 1):
-                s = self.lines[idx]
-                
-                if symmetric:
-                    # For symmetric delimiters (like """ in Python), each occurrence
-                    # toggles the comment state: first one opens, second one closes, etc.
-                    # Example: """comment""" means we enter on first """, exit on second
-                    matches = re.findall(begin_re, s)
-                    for _ in matches:
-                        in_comment = not in_comment  # Flip True->False or False->True
-                else:
-                    # For asymmetric delimiters, track depth
-                    begins = len(re.findall(begin_re, s))
-                    ends = len(re.findall(end_re, s))
-                    
-                    # Process begins first, then ends
-                    if not in_comment and begins > 0:
-                        in_comment = True
-                    if in_comment and ends > 0:
-                        in_comment = False
-                    
-            
-            return in_comment
+            if self.comment_mask is None:
+                self.comment_mask = multiline_comment_mask(self.lang, self.lines)
+            return bool(self.comment_mask and self.comment_mask[i])
         except Exception as Err:
             if self.verbose:
                 print("_in_multiline_comment error", type(Err), Err)
             return False
-
@@ -3,28 +3,26 @@ import argparse
 import sys
 from pathlib import Path
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader
 
-from .core import main as core_main
-from .test_processor import main as test_main
-from .config import get_output_format, print_active_config, get_config_value
-from .utils import _rebuild_index, _get_templates_dir, _format_markdown
+# Subcommand handlers are imported when they run, so e.g. `lumpy-log test`
+# never pays for pydriller/GitPython imports used only by `changes`
+from .config import LumpyConfig
 from . import OUTPUT_JOURNAL_DIR, OUTPUT_CHANGELOGS_DIR, OUTPUT_TESTRESULTS_DIR
 
 
 def rebuild_main(args):
     """Rebuild index from existing commits and test results"""
+    from .utils import _rebuild_index
     try:
         # Use config system for defaults
-        from .config import get_config_value
-        
-        output_folder = get_config_value('outputfolder', args, '.', 'devlog')
         repo_path = '.'
+        config = LumpyConfig(args, repo_path)
+        output_folder = config.get('outputfolder', 'devlog')
         
         # Show active configuration if verbose
-        verbose = get_config_value('verbose', args, '.', False)
+        verbose = config.get('verbose', False)
         if verbose:
-            print_active_config(args, repo_path)
+            config.print_active()
         
         # Check if CLI switch was provided
         if args.get('output_format'):
@@ -32,7 +30,7 @@ def rebuild_main(args):
             if isinstance(output_formats, str):
                 output_formats = [output_formats]
         else:
-            output_formats = get_output_format(args, repo_path)
+            output_formats = config.output_formats
         
         # Detect current branch
         import subprocess
@@ -50,11 +48,13 @@ def rebuild_main(args):
         results = _rebuild_index(
             output_folder,
             verbose=verbose,
-            changelog_order=get_config_value('changelog', args, '.', False),
+            changelog_order=config.get('changelog', False),
             output_formats=output_formats,
             current_branch=current_branch,
-            limit=get_config_value('limit', args, '.', None),
-            repo_path=repo_path
+            limit=config.get('limit'),
+            repo_path=repo_path,
+            config=config,
+            incremental=False,
         )
         
         if not verbose:
@@ -82,12 +82,16 @@ def rebuild_main(args):
 
 def entry_main(args):
     """Create a new dated entry from the entry template and rebuild index"""
+    from jinja2 import Environment, FileSystemLoader
+    from .utils import _rebuild_index, _get_templates_dir, _format_markdown
+
     repo_path = '.'
-    verbose = get_config_value('verbose', args, repo_path, False)
+    config = LumpyConfig(args, repo_path)
+    verbose = config.get('verbose', False)
     if verbose:
-        print_active_config(args, repo_path)
+        config.print_active()
 
-    output_folder = get_config_value('outputfolder', args, repo_path, 'devlog')
+    output_folder = config.get('outputfolder', 'devlog')
     entries_dir = Path(output_folder) / OUTPUT_JOURNAL_DIR
     entries_dir.mkdir(parents=True, exist_ok=True)
 
@@ -112,15 +116,15 @@ def entry_main(args):
     if verbose:
         print(f"Entry created: {filepath}")
 
-    output_formats = get_output_format(args, repo_path)
     _rebuild_index(
         output_folder,
         verbose=verbose,
-        changelog_order=get_config_value('changelog', args, repo_path, False),
-        output_formats=output_formats,
+        changelog_order=config.get('changelog', False),
+        output_formats=config.output_formats,
         current_branch=None,
-        limit=get_config_value('limit', args, repo_path, None),
+        limit=config.get('limit'),
         repo_path=repo_path,
+        config=config,
     )
 
     if not verbose:
@@ -129,6 +133,38 @@ def entry_main(args):
     return 0
 
 
+def _format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def cache_main(args):
+    """Show statistics for, or prune, the rendered image cache"""
+    from .image_cache import ImageCache
+
+    config = LumpyConfig(args, '.')
+    cache = ImageCache.from_config(config)
+
+    if args.get('action') == 'prune':
+        max_mb = args.get('max_mb')
+        max_bytes = None if max_mb is None else int(max_mb * 1024 * 1024)
+        removed, freed = cache.prune(max_bytes)
+        print(f"Pruned {removed} image(s), freed {_format_size(freed)}")
+
+    stats = cache.stats()
+    print(f"Cache: {stats['path']}")
+    print(f"Images: {stats['entries']}")
+    print(f"Size: {_format_size(stats['bytes'])} of {_format_size(stats['max_bytes'])}")
+    if stats['oldest_access'] is not None:
+        oldest = datetime.fromtimestamp(stats['oldest_access']).strftime('%Y-%m-%d %H:%M:%S')
+        newest = datetime.fromtimestamp(stats['newest_access']).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"Last used: {oldest} (oldest) to {newest} (newest)")
+    return 0
+
+
 def main():
     """Main entry point for the CLI"""
     parser = argparse.ArgumentParser(
@@ -189,17 +225,24 @@ def main():
         type=int,
         help="Limit index/devlog to N most recent entries"
     )
-    
+    changes_parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        help="Render commits in N parallel worker processes (default: 1)"
+    )
+
     # Test command (processes test output)
     test_parser = subparsers.add_parser(
         'test', 
         help='Process unit test output and generate test_results entry',
-        description='Process test output (TAP format or raw text) and generate markdown documentation.',
+        description='Process test output (TAP, JUnit XML or raw text) and generate markdown documentation.',
         epilog='''
 Examples:
   Bash/Linux/macOS:
     pytest --tap | lumpy-log test
+    pytest --tap | lumpy-log test --tee
     pytest --tap > results.txt && lumpy-log test --input results.txt
+    lumpy-log test --input build/test-results/junit.xml
   
   Windows (cmd/PowerShell):
     py -m pytest --tap | lumpy-log test
@@ -220,6 +263,11 @@ Note: Requires pytest-tap plugin (pip install pytest-tap)
         "--input",
         help="Input file with test output (if not specified, reads from stdin)"
     )
+    test_parser.add_argument(
+        "--tee",
+        action="store_true",
+        help="Echo the test output to stdout as it arrives while parsing it"
+    )
     test_parser.add_argument(
         "-v", "--verbose",
         action="store_true",
@@ -319,6 +367,25 @@ Note: Requires pytest-tap plugin (pip install pytest-tap)
         help="Output format(s) (overrides .lumpyconfig.yml)"
     )
     
+    # Cache command (inspects/prunes the rendered image cache)
+    cache_parser = subparsers.add_parser(
+        'cache',
+        help='Show or prune the rendered code image cache',
+        description='Inspect the code image cache (LUMPY_CACHE_DIR, cache_dir in .lumpyconfig.yml, or .lumpy_cache) '
+                    'or evict least recently used images until it fits cache_max_mb.'
+    )
+    cache_parser.add_argument(
+        "action",
+        choices=['stats', 'prune'],
+        help="stats: show cache size; prune: evict least recently used images"
+    )
+    cache_parser.add_argument(
+        "--max-mb",
+        dest="max_mb",
+        type=float,
+        help="Prune down to this size instead of cache_max_mb (0 empties the cache)"
+    )
+
     # Parse args, but handle backwards compatibility
     # If first arg looks like an option (starts with -) but is NOT --help/-h, assume 'changes' command
     if len(sys.argv) > 1 and sys.argv[1].startswith('-') and sys.argv[1] not in ['--help', '-h']:
@@ -338,12 +405,16 @@ Note: Requires pytest-tap plugin (pip install pytest-tap)
     
     # Route to appropriate handler
     if args.command == 'test':
+        from .test_processor import main as test_main
         sys.exit(test_main(vars(args)))
     elif args.command == 'rebuild':
         sys.exit(rebuild_main(vars(args)))
     elif args.command == 'journal':
         sys.exit(entry_main(vars(args)))
+    elif args.command == 'cache':
+        sys.exit(cache_main(vars(args)))
     else:
+        from .core import main as core_main
         sys.exit(core_main(vars(args)))
 
 
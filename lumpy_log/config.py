@@ -1,7 +1,6 @@
 """Configuration handling for lumpy_log output formats."""
 
 import os
-import yaml
 from pathlib import Path
 
 DEFAULT_OUTPUT_FORMAT = "obsidian"
@@ -18,19 +17,243 @@ DEFAULTS = {
     'force': False,
     'dryrun': False,
     'render_code_as_images': False,
+    'image_workers': 4,
+    'cache_dir': '.lumpy_cache',
+    'cache_max_mb': 256,
+    'jobs': 1,
 }
 
+# Parsed config files, keyed by (resolved path, mtime) so an edited file is
+# picked up but an unchanged one is only parsed once per process
+_config_file_cache = {}
+
+
 def _load_config_file(repo_path: str = ".") -> dict:
     """Load .lumpyconfig.yml from repo_path if present."""
     config_file = Path(repo_path) / ".lumpyconfig.yml"
-    if config_file.exists():
+    try:
+        mtime = config_file.stat().st_mtime_ns
+    except OSError:
+        return {}
+
+    cache_key = (str(config_file.resolve()), mtime)
+    if cache_key not in _config_file_cache:
+        import yaml
         try:
             with open(config_file, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f) or {}
+                _config_file_cache[cache_key] = yaml.safe_load(f) or {}
         except Exception as e:
             print(f"Warning: could not read {config_file}: {e}")
             return {}
-    return {}
+    return _config_file_cache[cache_key]
+
+
+class LumpyConfig(object):
+    """Configuration for a single run.
+
+    Reads .lumpyconfig.yml once and resolves each value (CLI args, then
+    config file, then defaults) the first time it is asked for. Create one
+    per command and pass it down rather than re-resolving values.
+    """
+
+    def __init__(self, args: dict = None, repo_path: str = "."):
+        self.args = args or {}
+        self.repo_path = repo_path
+        self.file_values = _load_config_file(repo_path)
+        self._resolved = {}
+
+    def get(self, key: str, default=None):
+        """Get a config value from CLI args or config file.
+
+        Args:
+            key: Config key name
+            default: Default value if not found (uses DEFAULTS if not provided)
+
+        Returns:
+            Config value from CLI args (priority), config file, or default
+        """
+        cache_key = (key, default)
+        if cache_key not in self._resolved:
+            self._resolved[cache_key] = self._resolve(key, default)
+        return self._resolved[cache_key]
+
+    def _resolve(self, key: str, default=None):
+        # CLI args have highest priority
+        if key in self.args and self.args.get(key) is not None:
+            return self.args[key]
+
+        # Config file second priority
+        if key in self.file_values:
+            return self.file_values[key]
+
+        # Default value
+        if default is not None:
+            return default
+        return DEFAULTS.get(key)
+
+    @property
+    def output_formats(self) -> list:
+        """Output format(s) from CLI args and config file.
+
+        Returns:
+            List of output formats: ["obsidian"], ["devlog"], ["docx"], or combinations
+        """
+        if "output_formats" not in self._resolved:
+            config_formats = self.file_values.get("output_format", DEFAULT_OUTPUT_FORMAT)
+            if isinstance(config_formats, str):
+                config_formats = [config_formats]
+
+            # CLI args override config
+            if self.args.get("output_format"):
+                cli_formats = self.args["output_format"]
+                if isinstance(cli_formats, str):
+                    cli_formats = [cli_formats]
+                formats = [f for f in cli_formats if f in VALID_FORMATS] or [DEFAULT_OUTPUT_FORMAT]
+            else:
+                formats = [f for f in config_formats if f in VALID_FORMATS] or [DEFAULT_OUTPUT_FORMAT]
+            self._resolved["output_formats"] = formats
+        return self._resolved["output_formats"]
+
+    def raw_output(self, default: bool = False) -> bool:
+        """Whether to include raw test output.
+
+        Precedence: CLI raw_test_output -> CLI raw_output -> config raw_test_output ->
+        config raw_output -> default.
+        """
+        if self.args.get("raw_test_output") is not None:
+            return bool(self.args["raw_test_output"])
+        if self.args.get("raw_output") is not None:
+            return bool(self.args["raw_output"])
+
+        if "raw_test_output" in self.file_values:
+            return bool(self.file_values.get("raw_test_output"))
+        if "raw_output" in self.file_values:
+            return bool(self.file_values.get("raw_output"))
+
+        return bool(default)
+
+    @property
+    def hcti_credentials(self) -> dict:
+        """HCTI API credentials from environment variables or config file.
+
+        Environment variables take precedence over config file.
+
+        Returns:
+            Dict with 'user_id' and 'api_key' keys, or empty dict if not found
+        """
+        if "hcti_credentials" not in self._resolved:
+            self._resolved["hcti_credentials"] = self._resolve_hcti_credentials()
+        return self._resolved["hcti_credentials"]
+
+    def _resolve_hcti_credentials(self) -> dict:
+        # Try environment variables first (highest priority)
+        env_user_id = os.environ.get('HCTI_API_USER_ID')
+        env_api_key = os.environ.get('HCTI_API_KEY')
+
+        if env_user_id and env_api_key:
+            return {
+                'user_id': env_user_id,
+                'api_key': env_api_key,
+                'source': 'environment'
+            }
+
+        # Try config file
+        config_user_id = self.file_values.get('hcti_api_user_id')
+        config_api_key = self.file_values.get('hcti_api_key')
+
+        if config_user_id and config_api_key:
+            return {
+                'user_id': config_user_id,
+                'api_key': config_api_key,
+                'source': 'config file'
+            }
+
+        return {}
+
+    @property
+    def image_cache_dir(self) -> str:
+        """Directory for the rendered image cache.
+
+        The LUMPY_CACHE_DIR environment variable (per user) takes precedence
+        over cache_dir in the config file (per repo). Relative paths are
+        resolved against repo_path.
+        """
+        if "image_cache_dir" not in self._resolved:
+            cache_dir = os.environ.get('LUMPY_CACHE_DIR') or self.get('cache_dir')
+            self._resolved["image_cache_dir"] = str(Path(self.repo_path) / os.path.expanduser(cache_dir))
+        return self._resolved["image_cache_dir"]
+
+    @property
+    def kroki_url(self) -> str:
+        """Kroki server for mermaid diagrams (LUMPY_KROKI_URL, then kroki_url in the config file), or None for the default."""
+        return os.environ.get('LUMPY_KROKI_URL') or self.get('kroki_url')
+
+    def print_active(self):
+        """Print all active configuration values showing source (CLI/config/default)."""
+        print("=" * 60)
+        print("Active Configuration:")
+        print("=" * 60)
+
+        # Define config keys to display
+        config_keys = [
+            ('output_format', 'Output format(s)'),
+            ('outputfolder', 'Output folder'),
+            ('verbose', 'Verbose mode'),
+            ('limit', 'Entry limit'),
+            ('changelog', 'Changelog order'),
+            ('render_code_as_images', 'Code blocks as images in docx output'),
+            ('force', 'Force overwrite of change logs'),
+            ('dryrun', 'Dry run mode'),
+            ('jobs', 'Parallel jobs'),
+            ('from_commit', 'From commit'),
+            ('to_commit', 'To commit'),
+        ]
+
+        for key, label in config_keys:
+            # Determine value and source
+            cli_value = self.args.get(key)
+            config_value = self.file_values.get(key)
+            default_value = DEFAULTS.get(key)
+
+            if cli_value is not None:
+                value = cli_value
+                source = "CLI"
+            elif config_value is not None:
+                value = config_value
+                source = "config file"
+            else:
+                value = default_value
+                source = "default"
+
+            # Skip if None and no default
+            if value is None:
+                continue
+
+            print(f"  {label:.<30} {value!r:20} [{source}]")
+
+        # Handle raw test output (honors both raw_test_output and raw_output aliases)
+        raw_effective = self.raw_output(DEFAULTS.get('raw_output', False))
+        raw_cli = self.args.get('raw_test_output', self.args.get('raw_output'))
+        raw_cfg = self.file_values.get('raw_test_output', self.file_values.get('raw_output'))
+        if raw_cli is not None:
+            raw_source = 'CLI'
+        elif raw_cfg is not None:
+            raw_source = 'config file'
+        else:
+            raw_source = 'default'
+        print(f"  {'Raw test output':.<30} {raw_effective!r:20} [{raw_source}]")
+
+        # Show HCTI credentials status
+        hcti_creds = self.hcti_credentials
+        if hcti_creds:
+            hcti_status = f"configured ({hcti_creds.get('source')})"
+        else:
+            hcti_status = "not configured"
+        print(f"  {'HCTI API credentials':.<30} {hcti_status:20} [status]")
+
+        print("=" * 60)
+        print()
+
 
 def get_config_value(key: str, args: dict, repo_path: str = ".", default=None):
     """Get a config value from CLI args or config file.
@@ -44,19 +267,7 @@ def get_config_value(key: str, args: dict, repo_path: str = ".", default=None):
     Returns:
         Config value from CLI args (priority), config file, or default
     """
-    # CLI args have highest priority
-    if key in args and args.get(key) is not None:
-        return args[key]
-    
-    # Config file second priority
-    config = _load_config_file(repo_path)
-    if key in config:
-        return config[key]
-    
-    # Default value
-    if default is not None:
-        return default
-    return DEFAULTS.get(key)
+    return LumpyConfig(args, repo_path).get(key, default)
 
 def get_output_format(args: dict, repo_path: str = ".") -> list:
     """Determine output format(s) from CLI args and config file.
@@ -68,20 +279,7 @@ def get_output_format(args: dict, repo_path: str = ".") -> list:
     Returns:
         List of output formats: ["obsidian"], ["devlog"], ["docx"], or combinations
     """
-    # Load config file
-    config = _load_config_file(repo_path)
-    config_formats = config.get("output_format", DEFAULT_OUTPUT_FORMAT)
-    if isinstance(config_formats, str):
-        config_formats = [config_formats]
-    
-    # CLI args override config
-    if args.get("output_format"):
-        cli_formats = args["output_format"]
-        if isinstance(cli_formats, str):
-            cli_formats = [cli_formats]
-        return [f for f in cli_formats if f in VALID_FORMATS] or [DEFAULT_OUTPUT_FORMAT]
-    
-    return [f for f in config_formats if f in VALID_FORMATS] or [DEFAULT_OUTPUT_FORMAT]
+    return LumpyConfig(args, repo_path).output_formats
 
 
 def get_raw_output(args: dict, repo_path: str = ".", default: bool = False) -> bool:
@@ -90,18 +288,7 @@ def get_raw_output(args: dict, repo_path: str = ".", default: bool = False) -> b
     Precedence: CLI raw_test_output -> CLI raw_output -> config raw_test_output ->
     config raw_output -> default.
     """
-    if args.get("raw_test_output") is not None:
-        return bool(args["raw_test_output"])
-    if args.get("raw_output") is not None:
-        return bool(args["raw_output"])
-
-    config = _load_config_file(repo_path)
-    if "raw_test_output" in config:
-        return bool(config.get("raw_test_output"))
-    if "raw_output" in config:
-        return bool(config.get("raw_output"))
-
-    return bool(default)
+    return LumpyConfig(args, repo_path).raw_output(default)
 
 def get_hcti_credentials(repo_path: str = ".") -> dict:
     """Get HCTI API credentials from config file or environment variables.
@@ -114,30 +301,7 @@ def get_hcti_credentials(repo_path: str = ".") -> dict:
     Returns:
         Dict with 'user_id' and 'api_key' keys, or empty dict if not found
     """
-    # Try environment variables first (highest priority)
-    env_user_id = os.environ.get('HCTI_API_USER_ID')
-    env_api_key = os.environ.get('HCTI_API_KEY')
-    
-    if env_user_id and env_api_key:
-        return {
-            'user_id': env_user_id,
-            'api_key': env_api_key,
-            'source': 'environment'
-        }
-    
-    # Try config file
-    config = _load_config_file(repo_path)
-    config_user_id = config.get('hcti_api_user_id')
-    config_api_key = config.get('hcti_api_key')
-    
-    if config_user_id and config_api_key:
-        return {
-            'user_id': config_user_id,
-            'api_key': config_api_key,
-            'source': 'config file'
-        }
-    
-    return {}
+    return LumpyConfig({}, repo_path).hcti_credentials
 
 def print_active_config(args: dict, repo_path: str = "."):
     """Print all active configuration values showing source (CLI/config/default).
@@ -146,67 +310,4 @@ def print_active_config(args: dict, repo_path: str = "."):
         args: CLI arguments dict
         repo_path: Repository path for config file lookup
     """
-    print("=" * 60)
-    print("Active Configuration:")
-    print("=" * 60)
-    
-    config_file = _load_config_file(repo_path)
-    
-    # Define config keys to display
-    config_keys = [
-        ('output_format', 'Output format(s)'),
-        ('outputfolder', 'Output folder'),
-        ('verbose', 'Verbose mode'),
-        ('limit', 'Entry limit'),
-        ('changelog', 'Changelog order'),
-        ('render_code_as_images', 'Code blocks as images in docx output'),
-        ('force', 'Force overwrite of change logs'),
-        ('dryrun', 'Dry run mode'),
-        ('from_commit', 'From commit'),
-        ('to_commit', 'To commit'),
-    ]
-    
-    for key, label in config_keys:
-        # Determine value and source
-        cli_value = args.get(key)
-        config_value = config_file.get(key)
-        default_value = DEFAULTS.get(key)
-        
-        if cli_value is not None:
-            value = cli_value
-            source = "CLI"
-        elif config_value is not None:
-            value = config_value
-            source = "config file"
-        else:
-            value = default_value
-            source = "default"
-        
-        # Skip if None and no default
-        if value is None:
-            continue
-            
-        print(f"  {label:.<30} {value!r:20} [{source}]")
-
-    # Handle raw test output (honors both raw_test_output and raw_output aliases)
-    raw_effective = get_raw_output(args, repo_path, DEFAULTS.get('raw_output', False))
-    raw_cli = args.get('raw_test_output', args.get('raw_output'))
-    raw_cfg = config_file.get('raw_test_output', config_file.get('raw_output'))
-    if raw_cli is not None:
-        raw_source = 'CLI'
-    elif raw_cfg is not None:
-        raw_source = 'config file'
-    else:
-        raw_source = 'default'
-    print(f"  {'Raw test output':.<30} {raw_effective!r:20} [{raw_source}]")
-    
-    # Show HCTI credentials status
-    hcti_creds = get_hcti_credentials(repo_path)
-    if hcti_creds:
-        hcti_status = f"configured ({hcti_creds.get('source')})"
-    else:
-        hcti_status = "not configured"
-    print(f"  {'HCTI API credentials':.<30} {hcti_status:20} [status]")
-    
-    print("=" * 60)
-    print()
+    LumpyConfig(args, repo_path).print_active()
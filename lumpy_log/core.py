@@ -1,26 +1,30 @@
 #!/usr/bin/python3
 
-import yaml
-from jinja2 import Environment, FileSystemLoader
 from genericpath import exists
 from re import split, sub
 import sys, os
-import pathspec
+import hashlib
+import json
+import subprocess
 from pydriller import Repository
-from .changelump import ChangeLump
+from .changelump import ChangeLump, multiline_comment_mask, LUMP_FORMAT
+from .list1 import list1view
 from .languages import Languages
-from .test_processor import TestProcessor
 from .utils import _get_templates_dir, _format_markdown, _rebuild_index
-from .config import get_output_format, get_config_value, print_active_config
-from . import OUTPUT_CHANGELOGS_DIR
+from .config import LumpyConfig
+from . import OUTPUT_CHANGELOGS_DIR, __version__
 
-languages = Languages(os.path.join(os.path.dirname(os.path.abspath(__file__)), "languages.yml"))
+# Language data and templates are loaded on first use, see _get_languages()
+# and _get_templates()
+_languages = None
+_templates = {}
 
-jinja_env = Environment(loader=FileSystemLoader(_get_templates_dir()))
-tCommit = jinja_env.get_template("commit_entry.md")
-tModifiedFiles = jinja_env.get_template("modified_files.md")
-tObsidianIndex = jinja_env.get_template("obsidian_index.md")
 
+# Run state for incremental runs, kept inside the output folder
+RUN_STATE_FILE = ".lumpy_state.json"
+
+# Templates whose content shapes the change log files
+CHANGELOG_TEMPLATES = ["commit_entry.md", "modified_files.md"]
 
 change_verbs_past = {
     "ADD" : "Added",
@@ -31,6 +35,24 @@ change_verbs_past = {
     "UNKNOWN" : "Unknown"
 }
 
+def _get_languages() -> Languages:
+    """Load languages.yml on first use."""
+    global _languages
+    if _languages is None:
+        _languages = Languages(os.path.join(os.path.dirname(os.path.abspath(__file__)), "languages.yml"))
+    return _languages
+
+
+def _get_templates() -> dict:
+    """Compile the change log templates on first use."""
+    if not _templates:
+        from jinja2 import Environment, FileSystemLoader
+        jinja_env = Environment(loader=FileSystemLoader(_get_templates_dir()))
+        _templates["commit"] = jinja_env.get_template("commit_entry.md")
+        _templates["modified_files"] = jinja_env.get_template("modified_files.md")
+    return _templates
+
+
 def _load_lumpy_ignore(repo_path: str):
     """Load .lumpyignore patterns (gitignore-style), with built-in defaults.
 
@@ -51,18 +73,312 @@ def _load_lumpy_ignore(repo_path: str):
             if __name__ == "__main__" or os.environ.get("LUMPY_LOG_VERBOSE_ERRORS"):
                 print(f"Warning: could not read .lumpyignore: {e}")
 
+    import pathspec
     return pathspec.PathSpec.from_lines("gitwildmatch", patterns)
 
 
-def main(args):
+def _run_fingerprint(repo_path: str) -> str:
+    """Hash the inputs that shape change log output.
+
+    Covers .lumpyignore, .lumpyconfig.yml, the change log templates, the
+    package version and the lump format. If any of them change, existing
+    change logs are stale.
+    """
+    digest = hashlib.sha256(f"{__version__}\0lump-format-{LUMP_FORMAT}".encode("utf-8"))
+    paths = [os.path.join(repo_path, ".lumpyignore"), os.path.join(repo_path, ".lumpyconfig.yml")]
+    paths += [os.path.join(_get_templates_dir(), name) for name in CHANGELOG_TEMPLATES]
+    for path in paths:
+        digest.update(b"\0" + os.path.basename(path).encode("utf-8") + b"\0")
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def _load_run_state(outputfolder: str) -> dict:
+    """Load the run state left by the previous changes run, if any."""
+    state_path = os.path.join(outputfolder, RUN_STATE_FILE)
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_run_state(outputfolder: str, state: dict):
+    """Write the run state atomically so an interrupted run can't corrupt it."""
+    state_path = os.path.join(outputfolder, RUN_STATE_FILE)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def _is_ancestor(repo_path: str, commit: str, rev: str = "HEAD") -> bool:
+    """Return True if commit exists and is reachable from rev."""
+    try:
+        result = subprocess.run(
+            ['git', 'merge-base', '--is-ancestor', commit, rev],
+            cwd=repo_path,
+            capture_output=True,
+        )
+        return result.returncode == 0
+    except Exception:
+        return False
+
+
+def _rev_list(repo_path: str, branch: str, *options: str):
+    """Run git rev-list on branch and return the commit hashes it prints.
+
+    A detached HEAD uses HEAD itself. Returns None if git fails, so callers
+    can fall back.
+    """
+    rev = "HEAD" if branch in (None, "", "HEAD", "unknown") else f"refs/heads/{branch}"
+    try:
+        result = subprocess.run(
+            ['git', 'rev-list', *options, rev, '--'],
+            cwd=repo_path,
+            capture_output=True,
+            text=True
+        )
+    except Exception:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.split()
+
+
+def _main_branch_commits(repo_path: str, branch: str):
+    """Return the set of commit hashes reachable from branch.
+
+    One git rev-list per run replaces pydriller's per-commit in_main_branch,
+    which runs git branch --contains for every commit. Returns None if git
+    fails.
+    """
+    hashes = _rev_list(repo_path, branch)
+    return None if hashes is None else set(hashes)
+
+
+def _commits_since(repo_path: str, branch: str, since: str):
+    """Return since and the commits added to branch after it, oldest first.
+
+    Includes commits merged in from branches that forked before since, which
+    pydriller's from_commit (an --ancestry-path walk) misses. Parents come
+    before children. Returns None if git fails.
+    """
+    # ^<since>^@ excludes everything reachable from since's parents
+    return _rev_list(repo_path, branch, "--reverse", "--topo-order", f"^{since}^@")
+
+
+def _load_commits(repo_path: str, hashes):
+    """Yield pydriller commits for the given hashes, in order."""
+    from pydriller import Git
+    git = Git(repo_path)
+    try:
+        for h in hashes:
+            yield git.get_commit(h)
+    finally:
+        git.clear()
+
+
+def _existing_commit_hashes(change_logs_dir: str) -> set:
+    """Return the short hashes of commits that already have a change log.
+
+    Change log filenames end in "_<hash7>.md", so this is a directory listing
+    only - no files are opened.
+    """
+    hashes = set()
+    if os.path.isdir(change_logs_dir):
+        for entry in os.scandir(change_logs_dir):
+            stem, ext = os.path.splitext(entry.name)
+            if ext == ".md" and "_" in stem:
+                hashes.add(stem.rsplit("_", 1)[1])
+    return hashes
+
+
+def _render_commit(commit, ignore_spec, verbose=False):
+    """Render a pydriller commit into its change log entry.
+
+    Returns the commit dict, with the formatted entry under "markdown".
+    """
+    languages = _get_languages()
+    templates = _get_templates()
+    genfilename = commit.author_date.strftime("%Y%m%d_%H%M")+"_"+commit.hash[:7]
+    newcommit = {
+        "hash":commit.hash,
+        "msg":commit.msg,
+        "author":commit.author.name,
+        "date":commit.author_date.strftime("%Y-%m-%d"),
+        "name": genfilename,
+        "author_date":commit.author_date,
+        "modifications":[],
+    }
+    newcommit["markdown"] = templates["commit"].render(newcommit)
+            
+    if hasattr(commit, "modified_files"):
+        for m in commit.modified_files:
+            # Skip files that match .lumpyignore patterns
+            try:
+                if ignore_spec and ignore_spec.match_file(m.filename):
+                    if verbose:
+                        print(f"Ignoring per .lumpyignore: {m.filename}")
+                    continue
+            except Exception:
+                # If matching fails for any reason, do not block processing
+                pass
+            filename, file_extension = os.path.splitext(m.filename)
+            language = languages.getByExtension(file_extension)
+            change_verb = m.change_type.name[0]+m.change_type.name[1:].lower()
+            
+            newmod = {
+                "filename":m.filename,
+                "change_type":m.change_type.name,
+                "change_verb": change_verb,
+                "change_verb_past": change_verbs_past[m.change_type.name],
+                "code" : [],
+                "lumps": [],
+                "language": language.mdname,
+                "source":""
+            }
+                                
+            if m.filename.lower().endswith(('.png', '.jpg', '.jpeg', 'gif')) == False:                    
+                if m.change_type.name == "ADD":
+                    newmod["code"].append(m.source_code)
+                    
+                if m.change_type.name == "MODIFY":
+                    # One shared line buffer per file for all of its lumps
+                    lines = list1view(str.splitlines(m.source_code))
+                        
+                    if False and verbose:
+                        print ("m.changed_methods", m.changed_methods)
+                    if (len(m.changed_methods)):
+                        # One comment scan per file, shared by all its lumps
+                        comment_mask = multiline_comment_mask(language, lines)
+                        # changed_methods comes from a set, so order it for stable output
+                        changed_methods = sorted(m.changed_methods, key=lambda c: (c.start_line, c.end_line, c.name))
+                        for c in changed_methods:
+                            newfunc = c.__dict__
+                            lump = ChangeLump(language, lines, func=c.__dict__, verbose=verbose, comment_mask=comment_mask)
+                            lump.extendOverComments()
+                            newfunccode = lump.code
+                            newmod["source"] = "changed_methods"
+                            newmod["code"].append(newfunccode)
+                            newmod["lumps"].append(lump)
+                    else:
+                        if False and verbose:
+                            print ("Change m", m.diff_parsed)
+                        
+                        newmod["source"] = "line change"
+                        
+                        lump = None
+                        lumps = []
+                        for (linenum, linetext) in m.diff_parsed["added"]:
+                            if lump is None:
+                                lump = ChangeLump(language, lines, start=linenum, verbose=verbose)
+                                lump.extendOverText()
+                                lumps.append(lump)    
+                            if(not lump.inLump(linenum-1)):
+                                lump = ChangeLump(language, lines, start=linenum, verbose=verbose)
+                                lump.extendOverText()
+                                lumps.append(lump)
+                        
+                        for lump in lumps:
+                            if False and verbose:
+                                print("lump.code", lump.code)
+                            newmod["code"].append(lump.code)
+                            newmod["lumps"].append(lump)
+                        
+                        #newmod["code"].append(m.source_code)
+
+                newcommit["markdown"] += "\n\n" + templates["modified_files"].render(newmod)
+                
+            newcommit["modifications"].append(newmod)
+    
+    # Normalize whitespace before saving
+    newcommit["markdown"] = _format_markdown(newcommit["markdown"])
+    return newcommit
+
+
+# Per-process state for parallel rendering, set up by _init_shard_worker
+_worker_state = {}
+
+
+def _init_shard_worker(repo_path, verbose, open_lock):
+    """Open the repository once per worker process.
+
+    pydriller writes to .git/config when it opens a repository, so workers
+    take turns opening it to avoid fighting over config.lock.
+    """
+    from pydriller import Git
+    with open_lock:
+        _worker_state["git"] = Git(repo_path)
+    _worker_state["ignore_spec"] = _load_lumpy_ignore(repo_path)
+    _worker_state["verbose"] = verbose
+
+
+def _render_commit_shard(hashes):
+    """Render a shard of commits in a worker process.
+
+    Returns the markdown for each hash, in the order given.
+    """
+    git = _worker_state["git"]
+    return [
+        _render_commit(git.get_commit(h), _worker_state["ignore_spec"], _worker_state["verbose"])["markdown"]
+        for h in hashes
+    ]
+
+
+def _render_commits_parallel(repo_path, pending, jobs, dryrun=False, verbose=False):
+    """Render pending commits across a process pool.
+
+    Args:
+        repo_path: Path to the git repository
+        pending: List of (genfilepath, commit hash) tuples, in traversal order
+        jobs: Number of worker processes
+        dryrun: If True, render but don't write files
+        verbose: Print progress messages
+
+    The commit range is split into contiguous shards (several per worker so
+    slow commits balance out). Results come back in shard order, so files are
+    written in the same order as the serial path.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    shard_size = max(1, -(-len(pending) // (jobs * 4)))
+    shards = [pending[i:i + shard_size] for i in range(0, len(pending), shard_size)]
+    if verbose:
+        print(f"Rendering {len(pending)} commits in {len(shards)} shards with {jobs} jobs")
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_shard_worker,
+        initargs=(repo_path, verbose, multiprocessing.Lock()),
+    ) as executor:
+        results = executor.map(_render_commit_shard, [[h for (_, h) in shard] for shard in shards])
+        for shard, markdowns in zip(shards, results):
+            for (genfilepath, _), markdown in zip(shard, markdowns):
+                if not dryrun:
+                    with open(genfilepath, "w", encoding="utf-8") as f:
+                        f.write(markdown)
+                    if verbose:
+                        print(f"Wrote {genfilepath}")
+
+
+def main(args, config=None):
     # Show active configuration if verbose
     repo_path = args.get('repo', '.')
-    verbose = get_config_value('verbose', args, repo_path, False)
-    outputfolder = get_config_value('outputfolder', args, repo_path, 'devlog')
+    if config is None:
+        config = LumpyConfig(args, repo_path)
+    verbose = config.get('verbose', False)
+    outputfolder = config.get('outputfolder', 'devlog')
 
     # Show active configuration if verbose
     if verbose:
-        print_active_config(args, repo_path)
+        config.print_active()
 
     kwargs = {}
     for param in args.keys():
@@ -79,6 +395,7 @@ def main(args):
             "HCTI_API_USER_ID",
             "HCTI_API_KEY",
             "limit",  # limit is for index generation, not pydriller
+            "jobs",
         ]:
             if args[param]:
                 kwargs[param] = args[param]
@@ -99,10 +416,9 @@ def main(args):
 
     # Build ignore spec once per run
     ignore_spec = _load_lumpy_ignore(repo_path)
-    output_formats = get_output_format(args, repo_path)
+    output_formats = config.output_formats
     
     # Detect current branch
-    import subprocess
     try:
         result = subprocess.run(
             ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
@@ -118,102 +434,69 @@ def main(args):
     if True or verbose:
         print(f"Processing current branch: {current_branch}")
     
-    for commit in Repository(repo_path, **kwargs).traverse_commits():
-        if commit.in_main_branch:
+    jobs = config.get('jobs', 1) or 1
+    pending = []
+
+    # Resume from the last processed commit unless the inputs that shape the
+    # change logs have changed, in which case regenerate everything
+    force = bool(args["force"])
+    fingerprint = _run_fingerprint(repo_path)
+    state = _load_run_state(outputfolder)
+    resume_from = None
+    if state and not force:
+        if state.get("fingerprint") != fingerprint:
+            if verbose:
+                print("Inputs changed since the last run, regenerating all change logs")
+            force = True
+        elif (
+            "from_commit" not in kwargs
+            and "to_commit" not in kwargs
+            and state.get("last_commit")
+            and _is_ancestor(repo_path, state["last_commit"])
+        ):
+            resume_from = state["last_commit"]
+            if verbose:
+                print(f"Resuming from last processed commit {state['last_commit'][:7]}")
+
+    # Skip commits that already have a change log before pydriller diffs them
+    # or asks git which branches contain them
+    change_logs_dir = os.path.join(outputfolder, OUTPUT_CHANGELOGS_DIR)
+    existing_hashes = set() if force else _existing_commit_hashes(change_logs_dir)
+    if verbose and existing_hashes:
+        print(f"Skipping {len(existing_hashes)} commits with existing change logs")
+
+    # Resumed runs load only the new commits, so older history is never read
+    new_commits = None
+    if resume_from:
+        new_commits = _commits_since(repo_path, current_branch, resume_from)
+    if new_commits is not None:
+        main_commits = set(new_commits)
+        commit_source = _load_commits(repo_path, new_commits)
+    else:
+        main_commits = _main_branch_commits(repo_path, current_branch)
+        commit_source = Repository(repo_path, **kwargs).traverse_commits()
+
+    last_commit = state.get("last_commit")
+    for commit in commit_source:
+        last_commit = commit.hash
+        if commit.hash[:7] in existing_hashes:
+            continue
+        if main_commits is not None:
+            in_main_branch = commit.hash in main_commits
+        else:
+            in_main_branch = commit.in_main_branch
+        if in_main_branch:
             genfilename = commit.author_date.strftime("%Y%m%d_%H%M")+"_"+commit.hash[:7]
-            change_logs_dir = os.path.join(outputfolder, OUTPUT_CHANGELOGS_DIR)
             genfilepath = os.path.join(change_logs_dir, genfilename+".md")
             
-            if(args["force"] or not os.path.exists(genfilepath)):
+            if(force or not os.path.exists(genfilepath)):
+                if jobs > 1:
+                    pending.append((genfilepath, commit.hash))
+                    continue
+
                 if verbose:
                     print("Making", genfilepath)
-                newcommit = {
-                    "hash":commit.hash,
-                    "msg":commit.msg,
-                    "author":commit.author.name,
-                    "date":commit.author_date.strftime("%Y-%m-%d"),
-                    "name": genfilename,
-                    "author_date":commit.author_date,
-                    "modifications":[],
-                }
-                newcommit["markdown"] = tCommit.render(newcommit)
-                        
-                if hasattr(commit, "modified_files"):
-                    for m in commit.modified_files:
-                        # Skip files that match .lumpyignore patterns
-                        try:
-                            if ignore_spec and ignore_spec.match_file(m.filename):
-                                if verbose:
-                                    print(f"Ignoring per .lumpyignore: {m.filename}")
-                                continue
-                        except Exception:
-                            # If matching fails for any reason, do not block processing
-                            pass
-                        filename, file_extension = os.path.splitext(m.filename)
-                        language = languages.getByExtension(file_extension)
-                        change_verb = m.change_type.name[0]+m.change_type.name[1:].lower()
-                        
-                        newmod = {
-                            "filename":m.filename,
-                            "change_type":m.change_type.name,
-                            "change_verb": change_verb,
-                            "change_verb_past": change_verbs_past[m.change_type.name],
-                            "code" : [],
-                            "lumps": [],
-                            "language": language.mdname,
-                            "source":""
-                        }
-                                            
-                        if m.filename.lower().endswith(('.png', '.jpg', '.jpeg', 'gif')) == False:                    
-                            if m.change_type.name == "ADD":
-                                newmod["code"].append(m.source_code)
-                                
-                            if m.change_type.name == "MODIFY":
-                                lines = str.splitlines(m.source_code)
-                                    
-                                if False and verbose:
-                                    print ("m.changed_methods", m.changed_methods)
-                                if (len(m.changed_methods)):
-                                    for c in m.changed_methods:
-                                        newfunc = c.__dict__
-                                        lump = ChangeLump(language, lines, func=c.__dict__, verbose=verbose)
-                                        lump.extendOverComments()
-                                        newfunccode = lump.code
-                                        newmod["source"] = "changed_methods"
-                                        newmod["code"].append(newfunccode)
-                                        newmod["lumps"].append(lump)
-                                else:
-                                    if False and verbose:
-                                        print ("Change m", m.diff_parsed)
-                                    
-                                    newmod["source"] = "line change"
-                                    
-                                    lump = None
-                                    lumps = []
-                                    for (linenum, linetext) in m.diff_parsed["added"]:
-                                        if lump is None:
-                                            lump = ChangeLump(language, lines, start=linenum, verbose=verbose)
-                                            lump.extendOverText()
-                                            lumps.append(lump)    
-                                        if(not lump.inLump(linenum-1)):
-                                            lump = ChangeLump(language, lines, start=linenum, verbose=verbose)
-                                            lump.extendOverText()
-                                            lumps.append(lump)
-                                    
-                                    for lump in lumps:
-                                        if False and verbose:
-                                            print("lump.code", lump.code)
-                                        newmod["code"].append(lump.code)
-                                        newmod["lumps"].append(lump)
-                                    
-                                    #newmod["code"].append(m.source_code)
-
-                            newcommit["markdown"] += "\n\n" + tModifiedFiles.render(newmod)
-                            
-                        newcommit["modifications"].append(newmod)
-                
-                # Normalize whitespace before saving
-                newcommit["markdown"] = _format_markdown(newcommit["markdown"])
+                newcommit = _render_commit(commit, ignore_spec, verbose=verbose)
                 
                 # Write the commit file to disk (unless dry run)
                 if not args.get("dryrun"):
@@ -223,6 +506,12 @@ def main(args):
                         print(f"Wrote {genfilepath}")
                 
                 commits.append(newcommit)
+
+    if pending:
+        _render_commits_parallel(repo_path, pending, jobs, dryrun=args.get("dryrun"), verbose=verbose)
+
+    if not args.get("dryrun"):
+        _save_run_state(outputfolder, {"last_commit": last_commit, "fingerprint": fingerprint})
     
     # Rebuild index after processing commits
 
@@ -232,8 +521,9 @@ def main(args):
                         verbose=verbose,
                         output_formats=output_formats,
                         current_branch=current_branch,
-                        limit=get_config_value("limit", args, repo_path, None),
+                        limit=config.get("limit"),
                         repo_path=repo_path,
+                        config=config,
         )
 
 
@@ -0,0 +1,194 @@
+"""Content-addressed cache for rendered images (code blocks as PNGs).
+
+Images are stored as <sha256>.png alongside an index recording each entry's
+size and last access time. The index is kept in least-recently-used order so
+the cache can be held under a size cap by evicting from the front.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = ".lumpy_cache"
+DEFAULT_CACHE_MAX_MB = 256
+IMAGES_SUBDIR = "code_images"
+INDEX_FILE = "index.json"
+
+
+class ImageCache(object):
+    """Size-capped, LRU-evicting image cache.
+
+    Lookups only touch the in-memory index; call flush() (or use the cache as
+    a context manager) to persist access times. Writes are atomic, so a
+    crashed or concurrent run never leaves a truncated image behind.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.directory = self.root / IMAGES_SUBDIR
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = None
+        # Sum of entry sizes, kept alongside _entries so puts don't re-add them
+        self._total = 0
+        self._dirty = False
+
+    @classmethod
+    def from_config(cls, config) -> "ImageCache":
+        """Create the cache configured for a run (see LumpyConfig.image_cache_dir)."""
+        max_mb = config.get('cache_max_mb')
+        if max_mb is None:
+            max_mb = DEFAULT_CACHE_MAX_MB
+        return cls(config.image_cache_dir, int(float(max_mb) * 1024 * 1024))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Content address for the given parts (e.g. renderer, language, source)."""
+        return hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.png"
+
+    def _load(self) -> dict:
+        """Load the index, reconciling it with the files actually present."""
+        if self._entries is not None:
+            return self._entries
+        try:
+            with open(self.directory / INDEX_FILE, encoding="utf-8") as f:
+                indexed = json.load(f).get("entries", {})
+        except (OSError, ValueError, AttributeError):
+            indexed = {}
+
+        present = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".png") and entry.is_file():
+                        stat = entry.stat()
+                        present[entry.name[:-4]] = {"size": stat.st_size, "atime": stat.st_mtime}
+        except FileNotFoundError:
+            pass
+
+        # Known entries keep their LRU order; files the index missed count as least recent
+        loaded = {key: present[key] for key in sorted(present.keys() - indexed.keys(), key=lambda k: present[k]["atime"])}
+        for key, entry in indexed.items():
+            if key in present:
+                loaded[key] = {"size": present[key]["size"], "atime": entry.get("atime", present[key]["atime"])}
+        self._dirty = loaded.keys() != indexed.keys()
+        self._entries = loaded
+        self._total = sum(entry["size"] for entry in loaded.values())
+        return loaded
+
+    def get(self, key: str) -> Path:
+        """Return the cached image path for key, or None on a miss."""
+        with self._lock:
+            entries = self._load()
+            entry = entries.pop(key, None)
+            if entry is None:
+                return None
+            path = self._path(key)
+            if not path.exists():
+                self._total -= entry["size"]
+                self._dirty = True
+                return None
+            entry["atime"] = time.time()
+            entries[key] = entry
+            self._dirty = True
+            return path
+
+    def put(self, key: str, data: bytes) -> Path:
+        """Store image bytes under key, evicting old entries if over the cap."""
+        with self._lock:
+            entries = self._load()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_name, path)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+            previous = entries.pop(key, None)
+            if previous is not None:
+                self._total -= previous["size"]
+            entries[key] = {"size": len(data), "atime": time.time()}
+            self._total += len(data)
+            self._dirty = True
+            self._evict(self.max_bytes, keep=key)
+            return path
+
+    def _evict(self, max_bytes: int, keep: str = None) -> tuple:
+        entries = self._entries
+        removed = freed = 0
+        for key in list(entries):
+            if self._total <= max_bytes:
+                break
+            if key == keep:
+                continue
+            size = entries.pop(key)["size"]
+            self._path(key).unlink(missing_ok=True)
+            self._total -= size
+            removed += 1
+            freed += size
+        if removed:
+            self._dirty = True
+        return removed, freed
+
+    def prune(self, max_bytes: int = None) -> tuple:
+        """Evict least recently used images until the cache fits max_bytes.
+
+        Args:
+            max_bytes: Size to prune down to (defaults to the cache's cap; 0 clears it)
+
+        Returns:
+            Tuple of (images removed, bytes freed)
+        """
+        with self._lock:
+            self._load()
+            result = self._evict(self.max_bytes if max_bytes is None else max_bytes)
+            self._flush()
+            return result
+
+    def stats(self) -> dict:
+        """Summary of the cache contents."""
+        with self._lock:
+            entries = self._load()
+            atimes = [entry["atime"] for entry in entries.values()]
+            return {
+                "path": str(self.directory),
+                "entries": len(entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "oldest_access": min(atimes) if atimes else None,
+                "newest_access": max(atimes) if atimes else None,
+            }
+
+    def flush(self) -> None:
+        """Persist the index (access times and evictions) if it changed."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._dirty or self._entries is None or not self.directory.exists():
+            return
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"entries": self._entries}, f)
+            os.replace(tmp_name, self.directory / INDEX_FILE)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self._dirty = False
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+"""JUnit/xUnit XML parser for test output processing."""
+
+import re
+from typing import Iterable
+from xml.etree.ElementTree import XMLParser, ParseError
+from .tap_parser import (
+    TAPResult,
+    MAX_DIAGNOSTIC_LINES,
+    MAX_DIAGNOSTIC_LINE_LENGTH,
+)
+
+# Optional XML declaration, comments and BOM before the root element
+JUNIT_START_RE = re.compile(
+    r'^\ufeff?\s*(?:<\?xml[^>]*\?>\s*)?(?:<!--.*?-->\s*)*<testsuites?[\s>/]',
+    re.DOTALL
+)
+
+# Characters of failure text kept per test (enough for MAX_DIAGNOSTIC_LINES full lines)
+MAX_DIAGNOSTIC_CHARS = MAX_DIAGNOSTIC_LINES * MAX_DIAGNOSTIC_LINE_LENGTH
+
+OUTCOMES = ('failure', 'error', 'skipped')
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _bounded_text(text: str, truncated: bool = False) -> str:
+    """Keep at most MAX_DIAGNOSTIC_LINES lines of MAX_DIAGNOSTIC_LINE_LENGTH characters."""
+    lines = text.splitlines()
+    if len(lines) > MAX_DIAGNOSTIC_LINES:
+        lines = lines[:MAX_DIAGNOSTIC_LINES]
+        truncated = True
+    if any(len(line) > MAX_DIAGNOSTIC_LINE_LENGTH for line in lines):
+        lines = [line[:MAX_DIAGNOSTIC_LINE_LENGTH] for line in lines]
+        truncated = True
+    if truncated:
+        lines.append("... (truncated)")
+    return '\n'.join(lines)
+
+
+class _JUnitTarget:
+    """XMLParser target that tallies <testcase> results as elements close.
+
+    No tree is built: only the current test case's attributes and the first
+    MAX_DIAGNOSTIC_CHARS characters of its failure text are held, so large
+    reports (including big <system-out> sections) parse in constant memory.
+    """
+
+    def __init__(self, result: TAPResult):
+        self.result = result
+        self._case = None
+        self._outcome = None
+        self._capture = False
+        self._text = []
+        self._text_size = 0
+        self._truncated = False
+
+    def start(self, tag, attrib):
+        name = _local_name(tag)
+        if name == 'testcase':
+            self._case = attrib
+            self._outcome = None
+            self._text = []
+            self._text_size = 0
+            self._truncated = False
+        elif self._case is not None and name in OUTCOMES:
+            # A failure or error outranks a skip; the first failure wins
+            if self._outcome is None or (self._outcome[0] == 'skipped' and name != 'skipped'):
+                self._outcome = (name, attrib.get('type', ''), attrib.get('message', ''))
+                self._capture = name != 'skipped'
+
+    def end(self, tag):
+        name = _local_name(tag)
+        if name in OUTCOMES:
+            self._capture = False
+        elif name == 'testcase' and self._case is not None:
+            self._finish_case()
+            self._case = None
+
+    def data(self, text):
+        if not self._capture or self._truncated:
+            return
+        room = MAX_DIAGNOSTIC_CHARS - self._text_size
+        if len(text) > room:
+            text = text[:room]
+            self._truncated = True
+        self._text.append(text)
+        self._text_size += len(text)
+
+    def close(self):
+        return self.result
+
+    def _finish_case(self):
+        result = self.result
+        result.tests_run += 1
+        if self._outcome is None:
+            result.tests_passed += 1
+            return
+        kind, error_type, message = self._outcome
+        if kind == 'skipped':
+            result.tests_skipped += 1
+            return
+
+        result.tests_failed += 1
+        case = self._case
+        name = case.get('name', '')
+        classname = case.get('classname') or case.get('class', '')
+        line = kind
+        if error_type:
+            line += f" ({error_type})"
+        if message:
+            line += f": {message.splitlines()[0][:MAX_DIAGNOSTIC_LINE_LENGTH]}"
+        failed = {
+            'number': str(result.tests_run),
+            'description': f"{classname}.{name}" if classname else name,
+            'line': line,
+        }
+        if message.strip():
+            failed['message'] = _bounded_text(message.strip())
+
+        text = ''.join(self._text).strip('\n')
+        if text:
+            failed['diagnostics'] = _bounded_text(text, self._truncated)
+        result.failed_tests.append(failed)
+
+
+class JUnitParser:
+    """Incremental JUnit/xUnit XML parser with the same interface as StreamingTAPParser.
+
+    Counts <testcase> elements as passed, failed (<failure> or <error>) or
+    skipped, keeping only failed tests. Malformed or truncated XML stops
+    parsing and is reported as a failed entry, like a TAP bail out.
+    """
+
+    def __init__(self):
+        self.result = TAPResult()
+        self._parser = XMLParser(target=_JUnitTarget(self.result))
+        self._broken = False
+
+    @staticmethod
+    def is_junit_format(output: str) -> bool:
+        """Quick check if output starts with a <testsuites> or <testsuite> element"""
+        return bool(JUNIT_START_RE.match(output))
+
+    @staticmethod
+    def parse(junit_output: str) -> TAPResult:
+        """Parse JUnit XML output"""
+        parser = JUnitParser()
+        parser.feed_line(junit_output)
+        return parser.finish()
+
+    def feed_line(self, line: str) -> None:
+        """Parse the next chunk of XML (a line or any other piece)."""
+        if self._broken:
+            return
+        try:
+            self._parser.feed(line)
+        except ParseError as e:
+            self._fail(e)
+
+    def feed(self, lines: Iterable[str]) -> None:
+        """Parse each chunk from an iterable (e.g. an open text stream)."""
+        for line in lines:
+            self.feed_line(line)
+
+    def finish(self) -> TAPResult:
+        """Return the result for everything fed so far."""
+        if not self._broken:
+            self._broken = True
+            try:
+                self._parser.close()
+            except ParseError as e:
+                self._fail(e)
+        return self.result
+
+    def _fail(self, error: ParseError) -> None:
+        self._broken = True
+        self.result.failed_tests.append({
+            'number': 'ERROR',
+            'description': f"Malformed JUnit XML: {error}",
+            'line': str(error)
+        })
@@ -1,14 +1,18 @@
 #!/usr/bin/python3
-import yaml
+import re
 
 class Languages(object):
     def __init__(self, LANGUAGES_PATH = "languages.yml"):
+        import yaml
         self.LANGUAGES_PATH = LANGUAGES_PATH
         with open(self.LANGUAGES_PATH, 'r') as file:
             #self.LANGUAGES = [Language(sLang, oLang) for sLang, oLang in yaml.safe_load(file).items()]
             self.LANGUAGES = yaml.safe_load(file)
 
-    # TODO : Cache the fetched language objects
+        # Resolved Language objects, by name and (for unknown types) by extension
+        self._languages = {}
+        self._unknown = {}
+        self._extensions = self._buildExtensionIndex()
 
     @property
     def list(self):
@@ -21,12 +25,17 @@ class Languages(object):
     def getByExtension(self, ext):
         Lang = self._getByExtension(ext)
         if(Lang is None):
-            return Language(ext[1:],{"type":"data"})
+            if ext not in self._unknown:
+                self._unknown[ext] = Language(ext[1:],{"type":"data"})
+            return self._unknown[ext]
         return self.getLanguage(Lang)
 
     def getLanguage(self, Lang):
+        if Lang in self._languages:
+            return self._languages[Lang]
         if Lang in  self.LANGUAGES:
             newLang = Language(Lang, self.LANGUAGES[Lang])
+            self._languages[Lang] = newLang
             if(newLang.lexer_name):
                 newLang.lexer = self.getLanguage(newLang.lexer_name)
             
@@ -40,17 +49,24 @@ class Languages(object):
         return None
 
     def _getByExtension(self, ext):
-        primary = [Lang for Lang in self.LANGUAGES if self.LANGUAGES[Lang]['primary_extension'] == ext] 
-        
-        if (len(primary)):
-            return primary[0]#
-            
-        secondary = [Lang for Lang in self.LANGUAGES if 'extensions' in self.LANGUAGES[Lang] and ext in self.LANGUAGES[Lang]['extensions']] 
-        
-        if (len(secondary)):
-            return secondary[0]#['lang'].lower()
-        
-        return None
+        return self._extensions.get(ext)
+
+    def _buildExtensionIndex(self):
+        """Map each extension to its language name.
+
+        A primary_extension match wins over an extensions list match, and
+        otherwise the first language in languages.yml wins.
+        """
+        index = {}
+        for Lang, oLang in self.LANGUAGES.items():
+            primary = (oLang or {}).get('primary_extension')
+            if primary is not None and primary not in index:
+                index[primary] = Lang
+        for Lang, oLang in self.LANGUAGES.items():
+            for ext in (oLang or {}).get('extensions') or []:
+                if ext not in index:
+                    index[ext] = Lang
+        return index
 
 class Language(object):
     name = str
@@ -59,6 +75,7 @@ class Language(object):
     lexer = None
     comment_lang = None
     _comment_structure = None
+    _comment_patterns = None
 
     def __init__(self, sLang, oLang):
         self.name = sLang
@@ -115,6 +132,33 @@ class Language(object):
             return self.comment_lang.comment_structure
         
         return None
+
+    @property
+    def comment_patterns(self):
+        """Compiled single/begin/end comment patterns, built once per language.
+
+        Missing or invalid patterns are None. An end pattern falls back to the
+        begin pattern, and "symmetric" records whether both are the same
+        delimiter (like Python's triple quotes).
+        """
+        if self._comment_patterns is None:
+            comments = self.comment_structure or {}
+            patterns = {}
+            for key in ("single", "begin", "end"):
+                try:
+                    patterns[key] = re.compile(comments[key]) if comments.get(key) else None
+                except re.error as Err:
+                    print(self.name, key, type(Err), Err)
+                    patterns[key] = None
+            if patterns["end"] is None:
+                patterns["end"] = patterns["begin"]
+
+            # Strip common regex anchors to compare the actual delimiter strings
+            begin = comments.get("begin") or ""
+            end = comments.get("end") or begin
+            patterns["symmetric"] = (begin.strip('^$\\s') == end.strip('^$\\s'))
+            self._comment_patterns = patterns
+        return self._comment_patterns
       
 if __name__ == "__main__":
     languages = Languages()
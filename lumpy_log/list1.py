@@ -96,3 +96,51 @@ class list1(UserList):
         which would break iteration (since it starts at index 0).
         """
         return iter(self.data)
+
+
+class list1view(object):
+    """A read-only, 1-indexed view over an existing sequence.
+
+    Unlike list1, which copies its input, the view keeps a reference to the
+    underlying data. Many views can share one list of file lines without
+    duplicating it. Slicing returns a new view over just the sliced items.
+    """
+
+    __slots__ = ("data",)
+
+    # Same 1-indexed to 0-indexed conversion rules as list1
+    _convert_index_input = list1._convert_index_input
+
+    def __init__(self, data=()):
+        if isinstance(data, (list1, list1view)):
+            data = data.data
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        """Get item by 1-indexed position."""
+        if isinstance(key, slice):
+            start = self._convert_index_input(key.start)
+            stop = self._convert_index_input(key.stop)
+            return self.__class__(self.data[start:stop:key.step])
+        return self.data[self._convert_index_input(key)]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __contains__(self, item):
+        return item in self.data
+
+    def __eq__(self, other):
+        if isinstance(other, (list1, list1view)):
+            other = other.data
+        return list(self.data) == list(other)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.data!r})"
+
+    def index(self, item, *args):
+        """Return 1-indexed position of item."""
+        return self.data.index(item, *args) + 1
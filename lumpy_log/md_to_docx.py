@@ -6,55 +6,61 @@ with nice code block handling and no external markdown parsing dependencies.
 
 import re
 import hashlib
+import json
+from copy import deepcopy
 from pathlib import Path
 from typing import List, Tuple
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+from docx.oxml.ns import qn, nsmap
+from docx.oxml import OxmlElement, parse_xml
+from lxml import etree
 # NEW: imports for mermaid rendering
 import os
 import tempfile
 import urllib.request
 import base64
-
-
-def _get_cache_dir() -> Path:
-    """Get or create the cache directory for code images."""
-    package_dir = os.path.dirname(os.path.abspath(__file__))
-    cache_dir = Path(".lumpy_cache") / "code_images"
-    cache_dir.mkdir(parents=True, exist_ok=True)
-    return cache_dir
-
-
-def _get_cached_image(code: str, language: str, renderer: str = "hcti") -> Path:
+from .image_cache import ImageCache, DEFAULT_CACHE_DIR
+from .md_tokenizer import (
+    tokenize_blocks,
+    split_blocks,
+    BLOCK_HEADING,
+    BLOCK_RULE,
+    BLOCK_BULLET,
+    BLOCK_ORDERED,
+    BLOCK_PARAGRAPH,
+    BLOCK_CODE,
+)
+
+HCTI_API_URL = "https://hcti.io/v1/image"
+KROKI_URL = "https://kroki.io"
+# Concurrent HCTI requests when pre-rendering code images
+DEFAULT_IMAGE_WORKERS = 4
+# Bump when the XML produced for a block changes, to invalidate cached blocks
+DOCX_BLOCK_CACHE_VERSION = 3
+
+_HEX_COLOR = re.compile(r'^[0-9a-fA-F]{6}$')
+# Control characters other than tab/newline/carriage return, lone surrogates, U+FFFE/U+FFFF
+_XML_INVALID_CHARS = re.compile('[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+_INLINE_FORMATTING = re.compile(r'\*\*(.+?)\*\*|\*(.+?)\*|__(.+?)__|_(.+?)_|`(.+?)`')
+
+
+def _default_image_cache() -> ImageCache:
+    """Image cache used when the caller does not supply one."""
+    return ImageCache(os.environ.get('LUMPY_CACHE_DIR') or DEFAULT_CACHE_DIR)
+
+
+def _get_cached_image(code: str, language: str, renderer: str = "hcti", cache: ImageCache = None) -> Path:
     """Check if a cached image exists for this code block."""
-    content = f"{renderer}:{language}:{code}"
-    cache_key = hashlib.sha256(content.encode("utf-8")).hexdigest()
-
-    cache_dir = _get_cache_dir()
-    cached_file = cache_dir / f"{cache_key}.png"
-    
-    print(f"Looking for cached image at: {cached_file}")
-    if cached_file.exists():
-        print("Found cached image.")
-        return cached_file
-    return None
+    cache = cache or _default_image_cache()
+    return cache.get(ImageCache.key(renderer, language, code))
 
 
-def _save_to_cache(code: str, language: str, image_bytes: bytes, renderer: str = "hcti") -> Path:
+def _save_to_cache(code: str, language: str, image_bytes: bytes, renderer: str = "hcti", cache: ImageCache = None) -> Path:
     """Save rendered image to cache."""
-    content = f"{renderer}:{language}:{code}"
-    cache_key = hashlib.sha256(content.encode("utf-8")).hexdigest()
-
-    cache_dir = _get_cache_dir()
-    cached_file = cache_dir / f"{cache_key}.png"
-
-    with open(cached_file, "wb") as f:
-        f.write(image_bytes)
-
-    return cached_file
+    cache = cache or _default_image_cache()
+    return cache.put(ImageCache.key(renderer, language, code), image_bytes)
 
 
 def _add_code_block_formatting(paragraph, background_color: Tuple[int, int, int] = (240, 240, 240), apply_text_color: bool = True):
@@ -86,14 +92,78 @@ def _add_code_block_formatting(paragraph, background_color: Tuple[int, int, int]
     paragraph.paragraph_format.space_after = Pt(0)
 
 
+# Style name used to highlight code blocks rendered as text
+CODE_STYLE = 'friendly'
+
+# Per style name: token type -> (color, bold, italic); filled in as token types are seen
+_token_styles = {}
+# Run properties (w:rPr) template per (color, bold, italic), copied onto each run
+_run_properties = {}
+
+
+def _parse_style(style_str: str) -> Tuple[str, bool, bool]:
+    """Parse a Pygments style string into (hex color or None, bold, italic)."""
+    color, bold, italic = None, False, False
+    for part in (style_str or '').split():
+        if part == 'bold':
+            bold = True
+        elif part == 'italic':
+            italic = True
+        elif part.startswith('#') or _HEX_COLOR.match(part):
+            color = part.lstrip('#')
+            if len(color) == 3:
+                # Shorthand like #04D
+                color = ''.join(c * 2 for c in color)
+    return color, bold, italic
+
+
+def _token_style(style, tok_type) -> Tuple[str, bool, bool]:
+    """Styling for a token type: that of its nearest ancestor the style defines, memoized per style."""
+    table = _token_styles.setdefault(style, {})
+    attrs = table.get(tok_type)
+    if attrs is None:
+        t = tok_type
+        while t and t not in style.styles:
+            t = t.parent
+        attrs = table[tok_type] = _parse_style(style.styles.get(t, ''))
+    return attrs
+
+
+def _code_run_properties(attrs: Tuple[str, bool, bool]):
+    """w:rPr for a code run with the given styling, built once per distinct styling."""
+    rpr = _run_properties.get(attrs)
+    if rpr is None:
+        from docx.text.run import Run
+        run = Run(OxmlElement('w:r'), None)
+        run.font.name = 'Courier New'
+        run.font.size = Pt(9)  # Match reduced size from _add_code_block_formatting
+        color, bold, italic = attrs
+        if bold:
+            run.bold = True
+        if italic:
+            run.italic = True
+        if color:
+            run.font.color.rgb = RGBColor.from_string(color.upper())
+        rpr = _run_properties[attrs] = run._r.rPr
+    return rpr
+
+
+def _add_code_run(paragraph, text: str, attrs: Tuple[str, bool, bool]):
+    r = paragraph._p.add_r()
+    r.append(deepcopy(_code_run_properties(attrs)))
+    r.text = text
+
+
 # NEW: syntax-highlighted code block rendering (optional pygments)
 def _add_highlighted_code_block(doc, code: str, language: str = ""):
-    """Add a code block with syntax highlighting using pygments if available."""
+    """Add a code block with syntax highlighting using pygments if available.
+
+    Adjacent tokens on a line that share styling are written as one run.
+    """
     try:
         from pygments import lex
         from pygments.lexers import get_lexer_by_name, TextLexer
         from pygments.styles import get_style_by_name
-        from pygments.token import Token
     except Exception:
         # Fallback to plain code block formatting
         for line in code.split('\n'):
@@ -106,141 +176,156 @@ def _add_highlighted_code_block(doc, code: str, language: str = ""):
     except Exception:
         lexer = TextLexer()
 
-    style = get_style_by_name('friendly')
-
-    def _parse_style(style_str: str):
-        attrs = {'color': None, 'bold': False, 'italic': False}
-        if not style_str:
-            return attrs
-        for part in style_str.split():
-            if part == 'bold':
-                attrs['bold'] = True
-            elif part == 'italic':
-                attrs['italic'] = True
-            elif part.startswith('#') or re.match(r'^[0-9a-fA-F]{6}$', part):
-                hexval = part if part.startswith('#') else f'#{part}'
-                attrs['color'] = hexval
-        return attrs
-
-    def _style_for(tt):
-        t = tt
-        while t and t not in style.styles:
-            t = t.parent
-        return _parse_style(style.styles.get(t, ''))
+    style = get_style_by_name(CODE_STYLE)
 
     # Build paragraphs line-by-line to keep shading per line
     paragraph = doc.add_paragraph(style='Normal')
     _add_code_block_formatting(paragraph, apply_text_color=False)
 
+    pending = []
+    pending_attrs = None
     for tok_type, tok_val in lex(code, lexer):
+        attrs = _token_style(style, tok_type)
         pieces = tok_val.split('\n')
         for idx, piece in enumerate(pieces):
             if piece:
-                run = paragraph.add_run(piece)
-                run.font.name = 'Courier New'
-                run.font.size = Pt(9)  # Match reduced size from _add_code_block_formatting
-                attrs = _style_for(tok_type)
-                if attrs['bold']:
-                    run.bold = True
-                if attrs['italic']:
-                    run.italic = True
-                if attrs['color']:
-                    hexval = attrs['color'].lstrip('#')
-                    r = int(hexval[0:2], 16)
-                    g = int(hexval[2:4], 16)
-                    b = int(hexval[4:6], 16)
-                    run.font.color.rgb = RGBColor(r, g, b)
+                if attrs != pending_attrs and pending:
+                    _add_code_run(paragraph, ''.join(pending), pending_attrs)
+                    pending = []
+                pending.append(piece)
+                pending_attrs = attrs
             if idx < len(pieces) - 1:
+                if pending:
+                    _add_code_run(paragraph, ''.join(pending), pending_attrs)
+                    pending = []
                 # newline => start a new shaded paragraph
                 paragraph = doc.add_paragraph(style='Normal')
                 _add_code_block_formatting(paragraph, apply_text_color=False)
+    if pending:
+        _add_code_run(paragraph, ''.join(pending), pending_attrs)
 
 
 # NEW: mermaid rendering via Kroki
-def _render_mermaid_and_insert(doc, mermaid_code: str, width_inches: float = 6.0):
-    """Render mermaid to PNG via Kroki and insert into the document."""
-    try:
-        req = urllib.request.Request(
-            url='https://kroki.io/mermaid/png',
-            data=mermaid_code.encode('utf-8'),
-            headers={'Content-Type': 'text/plain'}
-        )
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            img_bytes = resp.read()
+def _render_mermaid_and_insert(doc, mermaid_code: str, width_inches: float = 6.0, kroki_url: str = None, image_cache: ImageCache = None):
+    """Render mermaid to PNG via Kroki and insert into the document.
 
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-        try:
-            tmp.write(img_bytes)
-            tmp.close()
-            doc.add_picture(tmp.name, width=Inches(width_inches))
-        finally:
-            os.unlink(tmp.name)
+    Renders are cached by diagram source, so an unchanged diagram costs no
+    network call on later exports.
+    """
+    cache = image_cache or _default_image_cache()
+    cache_key = ImageCache.key("kroki", "mermaid", mermaid_code)
+    try:
+        cached_image = cache.get(cache_key)
+        if cached_image is None:
+            base_url = kroki_url or os.environ.get('LUMPY_KROKI_URL') or KROKI_URL
+            req = urllib.request.Request(
+                url=f"{base_url.rstrip('/')}/mermaid/png",
+                data=mermaid_code.encode('utf-8'),
+                headers={'Content-Type': 'text/plain'}
+            )
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                img_bytes = resp.read()
+            cached_image = cache.put(cache_key, img_bytes)
+        doc.add_picture(str(cached_image), width=Inches(width_inches))
     except Exception:
         # Fallback: insert raw code block
         para = doc.add_paragraph(mermaid_code, style='Normal')
         _add_code_block_formatting(para)
 
 
-def _render_code_with_playwright(html_content: str, width_inches: float = 6.0) -> bytes:
-    """Render HTML to PNG using Playwright (local, no API credentials required).
+class _PlaywrightRenderer:
+    """Render code-block HTML to PNG with a single Playwright browser session.
 
-    Returns PNG bytes on success, or None on failure/missing dependency.
+    The browser is launched on the first render and one page is reused for
+    every block until close(), so startup cost is paid once per document.
+    If Playwright is missing or the browser fails to launch, render() returns
+    None for every block without retrying.
     """
-    debug = os.environ.get('LUMPY_DEBUG') == '1'
-    
-    try:
-        from playwright.sync_api import sync_playwright
-    except ImportError as e:
-        if debug:
-            print(f"[DEBUG] Playwright not available: {e}")
-        return None
 
-    width_px = max(int(width_inches * 96), 640)
-    
-    if debug:
-        print(f"[DEBUG] Rendering code block with Playwright")
-        print(f"[DEBUG] Width: {width_inches} inches ({width_px} px)")
-        print(f"[DEBUG] HTML content length: {len(html_content)} chars")
+    def __init__(self):
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self._unavailable = False
 
-    try:
-        with sync_playwright() as p:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _start(self, debug: bool) -> bool:
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError as e:
+            if debug:
+                print(f"[DEBUG] Playwright not available: {e}")
+            return False
+
+        try:
+            self._playwright = sync_playwright().start()
             browser_name = os.environ.get("LUMPY_PLAYWRIGHT_BROWSER", "chromium").lower()
             if debug:
                 print(f"[DEBUG] Launching browser: {browser_name}")
-            
+
             # Try to use system chromium first, then fall back to bundled
             launch_kwargs = {"args": ["--no-sandbox"]}
-            
+
             # If system chromium exists, use it
             system_chromium = "/usr/bin/chromium-browser"
             if os.path.exists(system_chromium):
                 if debug:
                     print(f"[DEBUG] Using system chromium: {system_chromium}")
                 launch_kwargs["executable_path"] = system_chromium
-            
-            browser = {
-                "chromium": p.chromium,
-                "firefox": p.firefox,
-                "webkit": p.webkit,
-            }.get(browser_name, p.chromium).launch(**launch_kwargs)
-            
+
+            self._browser = {
+                "chromium": self._playwright.chromium,
+                "firefox": self._playwright.firefox,
+                "webkit": self._playwright.webkit,
+            }.get(browser_name, self._playwright.chromium).launch(**launch_kwargs)
+
             if debug:
                 print(f"[DEBUG] Browser launched successfully")
-            
-            page = browser.new_page(viewport={"width": width_px, "height": 10})
-            
+            return True
+        except Exception as e:
             if debug:
-                print(f"[DEBUG] Page created with initial viewport: {width_px}x10")
-            
-            try:
-                page.set_content(html_content, wait_until="load")
-                if debug:
-                    print(f"[DEBUG] HTML content set on page")
-            except Exception as e:
-                if debug:
-                    print(f"[DEBUG] Error setting page content: {e}")
-                raise
-            
+                print(f"[DEBUG] Error launching Playwright browser: {type(e).__name__}: {e}")
+            self.close()
+            return False
+
+    def render(self, html_content: str, width_inches: float = 6.0) -> bytes:
+        """Render HTML to PNG.
+
+        Returns PNG bytes on success, or None on failure/missing dependency.
+        """
+        debug = os.environ.get('LUMPY_DEBUG') == '1'
+        if self._unavailable:
+            return None
+        if self._browser is None and not self._start(debug):
+            self._unavailable = True
+            return None
+
+        width_px = max(int(width_inches * 96), 640)
+
+        if debug:
+            print(f"[DEBUG] Rendering code block with Playwright")
+            print(f"[DEBUG] Width: {width_inches} inches ({width_px} px)")
+            print(f"[DEBUG] HTML content length: {len(html_content)} chars")
+
+        try:
+            if self._page is None:
+                self._page = self._browser.new_page(viewport={"width": width_px, "height": 10})
+            else:
+                self._page.set_viewport_size({"width": width_px, "height": 10})
+            page = self._page
+
+            if debug:
+                print(f"[DEBUG] Page ready with initial viewport: {width_px}x10")
+
+            page.set_content(html_content, wait_until="load")
+            if debug:
+                print(f"[DEBUG] HTML content set on page")
+
             # Resize to the content height for a tight screenshot
             try:
                 box = page.evaluate("""
@@ -260,71 +345,82 @@ def _render_code_with_playwright(html_content: str, width_inches: float = 6.0) -
                 if debug:
                     print(f"[DEBUG] Error evaluating content size: {e}")
                 box = {"width": width_px, "height": 400, "preFound": False}
-            
+
             final_width = max(width_px, box.get("width", width_px))
             final_height = box.get("height", 400)
-            
+
             if debug:
                 print(f"[DEBUG] Setting final viewport to: {final_width}x{final_height}")
-            
+
             page.set_viewport_size({"width": final_width, "height": final_height})
-            
+
             # Add a small delay to ensure rendering is complete
             page.wait_for_load_state("networkidle")
-            
+
             if debug:
                 print(f"[DEBUG] Taking screenshot...")
-            
+
             img_bytes = page.screenshot(full_page=True)
-            
+
             if debug:
                 print(f"[DEBUG] Screenshot captured: {len(img_bytes)} bytes")
-            
-            browser.close()
+
             return img_bytes
-    except Exception as e:
-        if debug:
-            print(f"[DEBUG] Error in Playwright rendering: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
-        return None
+        except Exception as e:
+            if debug:
+                print(f"[DEBUG] Error in Playwright rendering: {type(e).__name__}: {e}")
+                import traceback
+                traceback.print_exc()
+            # Start the next block on a fresh page in case this one is wedged
+            self._close_page()
+            return None
+
+    def _close_page(self):
+        if self._page is not None:
+            try:
+                self._page.close()
+            except Exception:
+                pass
+            self._page = None
+
+    def close(self):
+        """Shut down the page, browser and Playwright driver."""
+        self._close_page()
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
 
 
-def _render_code_as_image_and_insert(doc, code: str, language: str = "", width_inches: float = 6.0, hcti_user_id: str = None, hcti_api_key: str = None, use_cache: bool = True):
-    """Render code block to PNG (HCTI if available, otherwise local Playwright) and insert.
-    Falls back to text rendering if both fail.
+def _render_code_with_playwright(html_content: str, width_inches: float = 6.0, renderer: _PlaywrightRenderer = None) -> bytes:
+    """Render HTML to PNG using Playwright (local, no API credentials required).
+
+    Uses the given renderer's browser session, or a one-off session if none is given.
+    Returns PNG bytes on success, or None on failure/missing dependency.
     """
-    debug = os.environ.get('LUMPY_DEBUG') == '1'
-    
-    api_user_id = hcti_user_id or os.environ.get('HCTI_API_USER_ID')
-    api_key = hcti_api_key or os.environ.get('HCTI_API_KEY')
+    if renderer is not None:
+        return renderer.render(html_content, width_inches=width_inches)
+    with _PlaywrightRenderer() as one_off:
+        return one_off.render(html_content, width_inches=width_inches)
 
-    # Determine which renderer will be used
-    will_use_hcti = bool(api_user_id and api_key)
-    renderer = "hcti" if will_use_hcti else "playwright"
-    
-    if debug:
-        print(f"\n[DEBUG] _render_code_as_image_and_insert called")
-        print(f"[DEBUG] Language: {language}")
-        print(f"[DEBUG] Renderer: {renderer}")
-        print(f"[DEBUG] Code length: {len(code)} chars")
-        print(f"[DEBUG] Use cache: {use_cache}")
 
-    # Cache check first (with renderer-specific key)
-    if use_cache:
-        cached_image = _get_cached_image(code, language, renderer)
-        if cached_image:
-            if debug:
-                print(f"[DEBUG] Using cached image: {cached_image}")
-            try:
-                doc.add_picture(str(cached_image), width=Inches(width_inches))
-                return
-            except Exception as e:
-                if debug:
-                    print(f"[DEBUG] Error adding cached picture: {e}")
+def _hcti_credentials(hcti_user_id: str = None, hcti_api_key: str = None) -> Tuple[str, str]:
+    """Resolve HCTI credentials, falling back to environment variables."""
+    return (hcti_user_id or os.environ.get('HCTI_API_USER_ID'),
+            hcti_api_key or os.environ.get('HCTI_API_KEY'))
 
-    # Build HTML once (offline-friendly, no external assets)
-    html_content = f'''<!DOCTYPE html>
+
+def _code_image_html(code: str) -> str:
+    """Build the HTML page a code block is screenshotted from (offline-friendly, no external assets)."""
+    return f'''<!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8" />
@@ -365,54 +461,161 @@ def _render_code_as_image_and_insert(doc, code: str, language: str = "", width_i
 </body>
 </html>'''
 
+
+def _render_code_with_hcti(html_content: str, api_user_id: str, api_key: str, hcti_url: str = None) -> bytes:
+    """Render HTML to PNG using the HCTI API.
+
+    Returns PNG bytes on success, or None on failure.
+    """
+    debug = os.environ.get('LUMPY_DEBUG') == '1'
     if debug:
-        print(f"[DEBUG] Generated HTML: {len(html_content)} chars")
+        print(f"[DEBUG] Attempting HCTI rendering...")
+    try:
+        data = json.dumps({
+            'html': html_content,
+            'css': '',
+            'google_fonts': 'Courier New'
+        }).encode('utf-8')
 
-    img_bytes = None
+        credentials = base64.b64encode(f'{api_user_id}:{api_key}'.encode('utf-8')).decode('utf-8')
+        req = urllib.request.Request(
+            url=hcti_url or HCTI_API_URL,
+            data=data,
+            headers={
+                'Content-Type': 'application/json',
+                'Authorization': f'Basic {credentials}'
+            }
+        )
 
-    # Try HCTI if credentials are present
-    if api_user_id and api_key:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            result = json.loads(resp.read().decode('utf-8'))
+            img_url = result.get('url')
+            if debug:
+                print(f"[DEBUG] HCTI response URL: {img_url}")
+            if not img_url:
+                return None
+            with urllib.request.urlopen(img_url, timeout=30) as img_resp:
+                img_bytes = img_resp.read()
+                if debug:
+                    print(f"[DEBUG] HCTI image downloaded: {len(img_bytes)} bytes")
+                return img_bytes
+    except Exception as e:
         if debug:
-            print(f"[DEBUG] Attempting HCTI rendering...")
-        try:
-            import json
+            print(f"[DEBUG] HCTI rendering failed: {type(e).__name__}: {e}")
+        return None
 
-            data = json.dumps({
-                'html': html_content,
-                'css': '',
-                'google_fonts': 'Courier New'
-            }).encode('utf-8')
 
-            credentials = base64.b64encode(f'{api_user_id}:{api_key}'.encode('utf-8')).decode('utf-8')
-            req = urllib.request.Request(
-                url='https://hcti.io/v1/image',
-                data=data,
-                headers={
-                    'Content-Type': 'application/json',
-                    'Authorization': f'Basic {credentials}'
-                }
-            )
+def _collect_image_code_blocks(lines: List[str]) -> List[Tuple[str, str]]:
+    """Find the distinct (code, language) blocks that render_code_as_images turns into images.
 
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                result = json.loads(resp.read().decode('utf-8'))
-                img_url = result.get('url')
-                if debug:
-                    print(f"[DEBUG] HCTI response URL: {img_url}")
-                if img_url:
-                    with urllib.request.urlopen(img_url, timeout=30) as img_resp:
-                        img_bytes = img_resp.read()
-                        if debug:
-                            print(f"[DEBUG] HCTI image downloaded: {len(img_bytes)} bytes")
-        except Exception as e:
+    Matches _convert_lines: closed, non-empty, non-mermaid blocks only.
+    """
+    blocks = {}
+    for event in tokenize_blocks(lines):
+        if event[0] == BLOCK_CODE:
+            _, lang, code, closed = event
+            if closed and lang != 'mermaid':
+                blocks[code, lang] = None
+    return list(blocks)
+
+
+def _prerender_code_images(blocks: List[Tuple[str, str]], width_inches: float = 6.0, hcti_user_id: str = None, hcti_api_key: str = None, hcti_url: str = None, playwright_renderer: _PlaywrightRenderer = None, workers: int = DEFAULT_IMAGE_WORKERS, image_cache: ImageCache = None) -> set:
+    """Render every code block that is not already cached, ahead of building the document.
+
+    HCTI requests run concurrently in a bounded thread pool. Playwright's sync
+    API is tied to one thread, so blocks rendered locally (no credentials, or
+    HCTI failed) go through the shared browser one at a time. Each image is
+    written to image_cache as soon as it is rendered, so only the images in
+    flight are held in memory; the document is assembled from the cache.
+
+    Returns:
+        Set of (code, language) blocks that could not be rendered
+    """
+    cache = image_cache or _default_image_cache()
+    api_user_id, api_key = _hcti_credentials(hcti_user_id, hcti_api_key)
+    renderer = "hcti" if api_user_id and api_key else "playwright"
+    blocks = [block for block in blocks if not _get_cached_image(block[0], block[1], renderer, cache)]
+
+    failed = set(blocks)
+    if renderer == "hcti" and blocks:
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        with ThreadPoolExecutor(max_workers=max(1, workers or 1)) as executor:
+            futures = {
+                executor.submit(_render_code_with_hcti, _code_image_html(block[0]), api_user_id, api_key, hcti_url): block
+                for block in blocks
+            }
+            for future in as_completed(futures):
+                block = futures.pop(future)
+                img_bytes = future.result()
+                if img_bytes is not None:
+                    _save_to_cache(block[0], block[1], img_bytes, renderer, cache)
+                    failed.discard(block)
+
+    unrendered = set()
+    for block in blocks:
+        if block not in failed:
+            continue
+        img_bytes = _render_code_with_playwright(_code_image_html(block[0]), width_inches=width_inches, renderer=playwright_renderer)
+        if img_bytes is None:
+            unrendered.add(block)
+        else:
+            _save_to_cache(block[0], block[1], img_bytes, renderer, cache)
+    return unrendered
+
+
+def _render_code_as_image_and_insert(doc, code: str, language: str = "", width_inches: float = 6.0, hcti_user_id: str = None, hcti_api_key: str = None, use_cache: bool = True, playwright_renderer: _PlaywrightRenderer = None, hcti_url: str = None, unrendered: set = None, image_cache: ImageCache = None):
+    """Render code block to PNG (HCTI if available, otherwise local Playwright) and insert.
+    Falls back to text rendering if both fail. Pass a shared playwright_renderer
+    to reuse one browser session across blocks, the result of
+    _prerender_code_images as unrendered to skip blocks that already failed,
+    and a shared image_cache so access times are persisted once per document.
+    """
+    debug = os.environ.get('LUMPY_DEBUG') == '1'
+    
+    api_user_id, api_key = _hcti_credentials(hcti_user_id, hcti_api_key)
+
+    # Determine which renderer will be used
+    will_use_hcti = bool(api_user_id and api_key)
+    renderer = "hcti" if will_use_hcti else "playwright"
+    
+    if debug:
+        print(f"\n[DEBUG] _render_code_as_image_and_insert called")
+        print(f"[DEBUG] Language: {language}")
+        print(f"[DEBUG] Renderer: {renderer}")
+        print(f"[DEBUG] Code length: {len(code)} chars")
+        print(f"[DEBUG] Use cache: {use_cache}")
+
+    # Cache check first (with renderer-specific key)
+    if use_cache:
+        cached_image = _get_cached_image(code, language, renderer, image_cache)
+        if cached_image:
             if debug:
-                print(f"[DEBUG] HCTI rendering failed: {type(e).__name__}: {e}")
-            img_bytes = None
+                print(f"[DEBUG] Using cached image: {cached_image}")
+            try:
+                doc.add_picture(str(cached_image), width=Inches(width_inches))
+                return
+            except Exception as e:
+                if debug:
+                    print(f"[DEBUG] Error adding cached picture: {e}")
 
-    # If no HCTI or it failed, try local Playwright rendering
-    if img_bytes is None:
+    if unrendered is not None and (code, language) in unrendered:
+        img_bytes = None
+    else:
+        html_content = _code_image_html(code)
         if debug:
-            print(f"[DEBUG] Attempting Playwright rendering...")
-        img_bytes = _render_code_with_playwright(html_content, width_inches=width_inches)
+            print(f"[DEBUG] Generated HTML: {len(html_content)} chars")
+
+        img_bytes = None
+
+        # Try HCTI if credentials are present
+        if will_use_hcti:
+            img_bytes = _render_code_with_hcti(html_content, api_user_id, api_key, hcti_url)
+
+        # If no HCTI or it failed, try local Playwright rendering
+        if img_bytes is None:
+            if debug:
+                print(f"[DEBUG] Attempting Playwright rendering...")
+            img_bytes = _render_code_with_playwright(html_content, width_inches=width_inches, renderer=playwright_renderer)
 
     # If everything failed, fall back to text rendering
     if img_bytes is None:
@@ -427,7 +630,7 @@ def _render_code_as_image_and_insert(doc, code: str, language: str = "", width_i
     # Persist to cache if enabled, otherwise use a temp file
     if use_cache:
         try:
-            cached_path = _save_to_cache(code, language, img_bytes, renderer)
+            cached_path = _save_to_cache(code, language, img_bytes, renderer, image_cache)
             if debug:
                 print(f"[DEBUG] Cached to: {cached_path}")
             doc.add_picture(str(cached_path), width=Inches(width_inches))
@@ -448,20 +651,117 @@ def _render_code_as_image_and_insert(doc, code: str, language: str = "", width_i
 
 
 def _sanitize_xml_string(s: str) -> str:
-    """Remove characters not allowed in XML 1.0 (python-docx requirement)."""
-    # Remove control characters except for tab, newline, carriage return
-    return ''.join(
-        c for c in s
-        if (
-            c == '\t' or c == '\n' or c == '\r' or
-            (0x20 <= ord(c) <= 0xD7FF) or
-            (0xE000 <= ord(c) <= 0xFFFD) or
-            (0x10000 <= ord(c) <= 0x10FFFF)
-        )
-    )
+    """Remove characters not allowed in XML 1.0 (python-docx requirement).
+
+    Clean input (the usual case) is returned as-is after a single regex scan.
+    """
+    if _XML_INVALID_CHARS.search(s) is None:
+        return s
+    return _XML_INVALID_CHARS.sub('', s)
+
+
+def _block_key(block: List[str], options: str) -> str:
+    content = f"{DOCX_BLOCK_CACHE_VERSION}:{options}:" + "\n".join(block)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
 
-def markdown_to_docx(markdown_content: str, output_path: str, render_code_as_images: bool = False, hcti_user_id: str = None, hcti_api_key: str = None) -> bool:
+def _block_cacheable(block: List[str], elements: list, render_code_as_images: bool) -> bool:
+    """Whether a converted block's XML can be reused in another document.
+
+    Pictures reference image parts of the document they were added to, so
+    blocks with images are never cached. Blocks whose code or diagrams fell
+    back to text are skipped too, so a later export retries the render.
+    """
+    for line in block:
+        stripped = line.strip()
+        if stripped.startswith('```') and (render_code_as_images or stripped[3:].strip().lower() == 'mermaid'):
+            return False
+    return not any(element.xpath('.//w:drawing') for element in elements)
+
+
+def _load_block(cache_dir: str, key: str) -> list:
+    """Read a cached block's elements, or None if it isn't cached."""
+    try:
+        with open(os.path.join(cache_dir, f"{key}.xml"), "rb") as f:
+            wrapper = parse_xml(f.read())
+    except (OSError, etree.XMLSyntaxError):
+        return None
+    return list(wrapper)
+
+
+def _save_block(cache_dir: str, key: str, elements: list) -> None:
+    """Store a block's elements under one wrapper declaring the namespaces.
+
+    Each element serialized on its own repeats every namespace declaration
+    of the document (over 1KB); moved under the wrapper they are declared
+    once per block.
+    """
+    wrapper = etree.Element("block", nsmap=nsmap)
+    for element in elements:
+        wrapper.append(deepcopy(element))
+    etree.cleanup_namespaces(wrapper, top_nsmap=nsmap)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(etree.tostring(wrapper))
+        os.replace(tmp_path, os.path.join(cache_dir, f"{key}.xml"))
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def _prune_block_cache(cache_dir: str, used: set) -> None:
+    """Remove cached blocks this document no longer uses."""
+    try:
+        with os.scandir(cache_dir) as entries:
+            for entry in entries:
+                key, ext = os.path.splitext(entry.name)
+                if ext in (".xml", ".tmp") and key not in used:
+                    Path(entry.path).unlink(missing_ok=True)
+    except FileNotFoundError:
+        pass
+
+
+def _convert_blocks(doc, lines: List[str], block_cache: str, render_code_as_images: bool, options: str, **convert_kwargs) -> None:
+    """Convert lines block by block, splicing in cached XML for unchanged blocks.
+
+    block_cache is a directory holding one file per block, so only the blocks
+    in use are read and only new ones written. Blocks the document no longer
+    uses are removed, so the cache never grows beyond one document's worth.
+    """
+    used = set()
+    body = doc.element.body
+    sect_pr = body.sectPr
+
+    for block in split_blocks(lines):
+        key = _block_key(block, options)
+        elements = _load_block(block_cache, key)
+        if elements is not None:
+            for element in elements:
+                if sect_pr is not None:
+                    sect_pr.addprevious(element)
+                else:
+                    body.append(element)
+            used.add(key)
+            continue
+
+        # New elements land after the current last element and before sectPr
+        marker = sect_pr.getprevious() if sect_pr is not None else (body[-1] if len(body) else None)
+        _convert_lines(doc, block, **convert_kwargs)
+        elements = []
+        element = marker.getnext() if marker is not None else (body[0] if len(body) else None)
+        while element is not None and element is not sect_pr:
+            elements.append(element)
+            element = element.getnext()
+        if _block_cacheable(block, elements, render_code_as_images):
+            _save_block(block_cache, key, elements)
+            used.add(key)
+
+    _prune_block_cache(block_cache, used)
+
+
+def markdown_to_docx(markdown_content: str, output_path: str, render_code_as_images: bool = False, hcti_user_id: str = None, hcti_api_key: str = None, hcti_url: str = None, image_workers: int = DEFAULT_IMAGE_WORKERS, image_cache: ImageCache = None, kroki_url: str = None, block_cache: str = None) -> bool:
     """Convert markdown content to DOCX file.
     
     Args:
@@ -472,6 +772,12 @@ def markdown_to_docx(markdown_content: str, output_path: str, render_code_as_ima
                               Recommended to use HCTI API credentials for reliable image rendering.
         hcti_user_id: HCTI API User ID (optional, falls back to environment variable)
         hcti_api_key: HCTI API Key (optional, falls back to environment variable)
+        hcti_url: HCTI API endpoint (defaults to HCTI_API_URL)
+        image_workers: Maximum concurrent HCTI requests when rendering code images
+        image_cache: Cache for rendered images (defaults to LUMPY_CACHE_DIR or .lumpy_cache)
+        kroki_url: Kroki server for mermaid diagrams (defaults to LUMPY_KROKI_URL or KROKI_URL)
+        block_cache: Directory caching converted XML per `---`-separated block;
+                     unchanged blocks are copied from it instead of converted again
     
     Returns:
         True if conversion succeeded, False otherwise
@@ -491,64 +797,72 @@ def markdown_to_docx(markdown_content: str, output_path: str, render_code_as_ima
     section.left_margin = Inches(0.5)
     section.right_margin = Inches(0.5)
     
-    # Track if we're in a code block
-    in_code_block = False
-    code_block_lines = []
-    code_language = ""
-    
     lines = markdown_content.split('\n')
-    i = 0
+    image_cache = image_cache or _default_image_cache()
     
-    while i < len(lines):
-        line = lines[i]
-        
-        # Check for code block start
-        if line.strip().startswith('```'):
-            if in_code_block:
-                # End of code block
-                in_code_block = False
-                if code_block_lines:
-                    code_content = '\n'.join(code_block_lines)
-                    lang = (code_language or '').strip().lower()
-                    if lang == 'mermaid':
-                        _render_mermaid_and_insert(doc, code_content)
-                    elif render_code_as_images:
-                        _render_code_as_image_and_insert(doc, code_content, lang, hcti_user_id=hcti_user_id, hcti_api_key=hcti_api_key)
-                    else:
-                        _add_highlighted_code_block(doc, code_content, lang)
-                code_block_lines = []
-                code_language = ""
-            else:
-                # Start of code block
-                in_code_block = True
-                code_language = line.strip()[3:].strip()
-                code_block_lines = []
-            i += 1
-            continue
-        
-        # If in code block, accumulate lines
-        if in_code_block:
-            code_block_lines.append(line)
-            i += 1
-            continue
-        
-        # Skip empty lines
-        if not line.strip():
-            i += 1
-            continue
-        
-        # Handle headers
-        header_match = re.match(r'^(#{1,6})\s+(.+)$', line)
-        if header_match:
-            level = len(header_match.group(1))
-            title = header_match.group(2).strip()
-            style = f'Heading {level}'
-            _add_formatted_paragraph(doc, title, style=style)
-            i += 1
-            continue
-        
-        # Handle horizontal rules
-        if re.match(r'^[-_*]{3,}$', line.strip()):
+    # One browser session serves every code block in the document
+    renderer = _PlaywrightRenderer() if render_code_as_images else None
+    try:
+        image_options = None
+        if render_code_as_images:
+            # First pass: render all code images into the cache, then assemble the document
+            image_options = {
+                "hcti_user_id": hcti_user_id,
+                "hcti_api_key": hcti_api_key,
+                "hcti_url": hcti_url,
+                "playwright_renderer": renderer,
+                "image_cache": image_cache,
+            }
+            image_options["unrendered"] = _prerender_code_images(
+                _collect_image_code_blocks(lines), workers=image_workers, **image_options
+            )
+        if block_cache:
+            renderer_name = "hcti" if all(_hcti_credentials(hcti_user_id, hcti_api_key)) else "playwright"
+            options = f"{bool(render_code_as_images)}:{renderer_name}"
+            _convert_blocks(
+                doc, lines, block_cache, render_code_as_images, options,
+                image_options=image_options, kroki_url=kroki_url, image_cache=image_cache,
+            )
+        else:
+            _convert_lines(doc, lines, image_options, kroki_url=kroki_url, image_cache=image_cache)
+    finally:
+        if renderer is not None:
+            renderer.close()
+        image_cache.flush()
+    
+    # Save document
+    try:
+        doc.save(output_path)
+        return True
+    except Exception as e:
+        print(f"Error saving DOCX file: {e}")
+        return False
+
+
+def _convert_lines(doc, lines: List[str], image_options: dict = None, kroki_url: str = None, image_cache: ImageCache = None):
+    """Add the document body for the markdown lines to doc.
+
+    Code blocks become images when image_options (keyword arguments for
+    _render_code_as_image_and_insert) is given, highlighted text otherwise.
+    Mermaid blocks are always rendered through Kroki at kroki_url.
+    """
+    for event in tokenize_blocks(lines):
+        kind = event[0]
+
+        if kind == BLOCK_PARAGRAPH:
+            _add_formatted_paragraph(doc, event[1], style='Normal')
+
+        elif kind == BLOCK_HEADING:
+            _, level, title = event
+            _add_formatted_paragraph(doc, title, style=f'Heading {level}')
+
+        elif kind == BLOCK_BULLET or kind == BLOCK_ORDERED:
+            _, indent_level, list_text = event
+            style = 'List Bullet' if kind == BLOCK_BULLET else 'List Number'
+            para = _add_formatted_paragraph(doc, list_text, style=style)
+            para.paragraph_format.left_indent = Inches(0.25 + indent_level * 0.25)
+
+        elif kind == BLOCK_RULE:
             paragraph = doc.add_paragraph()
             pPr = paragraph._element.get_or_add_pPr()
             pBdr = OxmlElement('w:pBdr')
@@ -559,61 +873,19 @@ def markdown_to_docx(markdown_content: str, output_path: str, render_code_as_ima
             bottom.set(qn('w:color'), 'CCCCCC')
             pBdr.append(bottom)
             pPr.append(pBdr)
-            i += 1
-            continue
-        
-        # Handle unordered lists
-        list_match = re.match(r'^(\s*)[-*+]\s+(.+)$', line)
-        if list_match:
-            indent_level = len(list_match.group(1)) // 2
-            list_text = list_match.group(2).strip()
-            para = _add_formatted_paragraph(doc, list_text, style='List Bullet')
-            para.paragraph_format.left_indent = Inches(0.25 + indent_level * 0.25)
-            i += 1
-            continue
-        
-        # Handle ordered lists
-        ordered_list_match = re.match(r'^(\s*)\d+\.\s+(.+)$', line)
-        if ordered_list_match:
-            indent_level = len(ordered_list_match.group(1)) // 2
-            list_text = ordered_list_match.group(2).strip()
-            para = _add_formatted_paragraph(doc, list_text, style='List Number')
-            para.paragraph_format.left_indent = Inches(0.25 + indent_level * 0.25)
-            i += 1
-            continue
-        
-        # Handle regular paragraphs
-        # Accumulate consecutive non-empty lines as a paragraph
-        paragraph_lines = [line.strip()]
-        i += 1
-        
-        while i < len(lines) and lines[i].strip() and not re.match(r'^#+', lines[i]) and not re.match(r'^```', lines[i]) and not re.match(r'^(\s*)[-*+\d]\s', lines[i]):
-            paragraph_lines.append(lines[i].strip())
-            i += 1
-        
-        full_text = ' '.join(paragraph_lines)
-        if full_text:
-            _add_formatted_paragraph(doc, full_text, style='Normal')
-    
-    # Handle unclosed code block
-    if in_code_block and code_block_lines:
-        code_content = '\n'.join(code_block_lines)
-        lang = (code_language or '').strip().lower()
-        if lang == 'mermaid':
-            _render_mermaid_and_insert(doc, code_content)
-        else:
-            _add_highlighted_code_block(doc, code_content, lang)
-    
-    # Save document
-    try:
-        doc.save(output_path)
-        return True
-    except Exception as e:
-        print(f"Error saving DOCX file: {e}")
-        return False
+
+        elif kind == BLOCK_CODE:
+            _, lang, code_content, closed = event
+            if lang == 'mermaid':
+                _render_mermaid_and_insert(doc, code_content, kroki_url=kroki_url, image_cache=image_cache)
+            elif closed and image_options is not None:
+                _render_code_as_image_and_insert(doc, code_content, lang, **image_options)
+            else:
+                # Unclosed blocks are always highlighted as text
+                _add_highlighted_code_block(doc, code_content, lang)
 
 
-def markdown_file_to_docx(markdown_file: str, output_file: str = None, render_code_as_images: bool = False, hcti_user_id: str = None, hcti_api_key: str = None) -> bool:
+def markdown_file_to_docx(markdown_file: str, output_file: str = None, render_code_as_images: bool = False, hcti_user_id: str = None, hcti_api_key: str = None, hcti_url: str = None, image_workers: int = DEFAULT_IMAGE_WORKERS, image_cache: ImageCache = None, kroki_url: str = None, block_cache: str = None) -> bool:
     """Convert a markdown file to DOCX.
     
     Args:
@@ -622,6 +894,11 @@ def markdown_file_to_docx(markdown_file: str, output_file: str = None, render_co
         render_code_as_images: If True, render code blocks as images using HCTI API
         hcti_user_id: HCTI API User ID (optional, falls back to environment variable)
         hcti_api_key: HCTI API Key (optional, falls back to environment variable)
+        hcti_url: HCTI API endpoint (defaults to HCTI_API_URL)
+        image_workers: Maximum concurrent HCTI requests when rendering code images
+        image_cache: Cache for rendered images (defaults to LUMPY_CACHE_DIR or .lumpy_cache)
+        kroki_url: Kroki server for mermaid diagrams (defaults to LUMPY_KROKI_URL or KROKI_URL)
+        block_cache: Directory caching converted XML per block (see markdown_to_docx)
     
     Returns:
         True if conversion succeeded, False otherwise
@@ -637,8 +914,7 @@ def markdown_file_to_docx(markdown_file: str, output_file: str = None, render_co
     
     try:
         content = md_path.read_text(encoding='utf-8')
-        content = _sanitize_xml_string(content)
-        return markdown_to_docx(content, output_file, render_code_as_images, hcti_user_id, hcti_api_key)
+        return markdown_to_docx(content, output_file, render_code_as_images, hcti_user_id, hcti_api_key, hcti_url, image_workers, image_cache, kroki_url, block_cache)
     except Exception as e:
         print(f"Error reading markdown file: {e}")
         return False
@@ -648,7 +924,7 @@ def _parse_inline_formatting(text: str) -> List[Tuple[str, bool, bool, bool]]:
     """Parse text for bold, italic, and inline code."""
     segments = []
     pos = 0
-    for match in re.finditer(r'\*\*(.+?)\*\*|\*(.+?)\*|__(.+?)__|_(.+?)_|`(.+?)`', text):
+    for match in _INLINE_FORMATTING.finditer(text):
         if match.start() > pos:
             segments.append((text[pos:match.start()], False, False, False))
         if match.group(1):
@@ -0,0 +1,132 @@
+"""Single-pass block tokenizer for the markdown subset md_to_docx understands.
+
+tokenize_blocks() walks the lines once and yields block events, which the
+DOCX builder turns into paragraphs. Each line is classified by its first
+character before any regex runs, so plain paragraph text (most of a devlog)
+never touches the heading/list/rule patterns.
+"""
+
+import re
+from typing import Iterator, List, Tuple
+
+BLOCK_HEADING = "heading"
+BLOCK_RULE = "rule"
+BLOCK_BULLET = "bullet"
+BLOCK_ORDERED = "ordered"
+BLOCK_PARAGRAPH = "paragraph"
+BLOCK_CODE = "code"
+
+FENCE = "```"
+
+_HEADING = re.compile(r'(#{1,6})\s+(.+)$')
+_RULE = re.compile(r'[-_*]{3,}$')
+_BULLET = re.compile(r'(\s*)[-*+]\s+(.+)$')
+_ORDERED = re.compile(r'(\s*)\d+\.\s+(.+)$')
+# Lines that end a paragraph: headings, fences and list-like lines
+_PARAGRAPH_BREAK = re.compile(r'#|```|\s*[-*+\d]\s')
+
+
+def tokenize_blocks(lines: List[str]) -> Iterator[Tuple]:
+    """Yield block events for markdown lines in one pass.
+
+    Events are tuples whose first item is the block kind:
+        (BLOCK_HEADING, level, text)
+        (BLOCK_RULE,)
+        (BLOCK_BULLET, indent_level, text)
+        (BLOCK_ORDERED, indent_level, text)
+        (BLOCK_PARAGRAPH, text)
+        (BLOCK_CODE, language, code, closed)
+
+    Code language is lower-cased; closed is False for a fence left open at
+    the end of the input. Empty code blocks are dropped.
+
+    Args:
+        lines: Markdown split into lines (without line endings)
+    """
+    for _, event in _tokenize(lines):
+        yield event
+
+
+def split_blocks(lines: List[str]) -> List[List[str]]:
+    """Split markdown lines into blocks at top-level `---` separator lines.
+
+    A block starts at a `---` line that follows a blank line and that the
+    tokenizer itself reads as a rule (so not inside a code fence or a
+    paragraph). The tokenizer is back in its initial state there, so
+    tokenizing the blocks one after another gives the same events as
+    tokenizing all the lines at once.
+    """
+    starts = [0]
+    for start, event in _tokenize(lines):
+        if event[0] == BLOCK_RULE and start and lines[start].strip() == '---' and not lines[start - 1].strip():
+            starts.append(start)
+    starts.append(len(lines))
+    return [lines[begin:end] for begin, end in zip(starts, starts[1:])]
+
+
+def _tokenize(lines: List[str]) -> Iterator[Tuple[int, Tuple]]:
+    """Yield (index of the line the block starts on, event) pairs for tokenize_blocks."""
+    in_code_block = False
+    code_block_lines = []
+    code_language = ""
+    count = len(lines)
+    i = 0
+
+    while i < count:
+        start = i
+        line = lines[i]
+        i += 1
+        stripped = line.strip()
+
+        if stripped.startswith(FENCE):
+            if in_code_block:
+                in_code_block = False
+                if code_block_lines:
+                    yield code_start, (BLOCK_CODE, code_language, '\n'.join(code_block_lines), True)
+            else:
+                in_code_block = True
+                code_start = start
+                code_language = stripped[3:].strip().lower()
+                code_block_lines = []
+            continue
+
+        if in_code_block:
+            code_block_lines.append(line)
+            continue
+
+        if not stripped:
+            continue
+
+        first = stripped[0]
+        if line[0] == '#':
+            match = _HEADING.match(line)
+            if match:
+                yield start, (BLOCK_HEADING, len(match.group(1)), match.group(2).strip())
+                continue
+        if first in '-_*' and _RULE.match(stripped):
+            yield start, (BLOCK_RULE,)
+            continue
+        if first in '-*+':
+            match = _BULLET.match(line)
+            if match:
+                yield start, (BLOCK_BULLET, len(match.group(1)) // 2, match.group(2).strip())
+                continue
+        if first.isdigit():
+            match = _ORDERED.match(line)
+            if match:
+                yield start, (BLOCK_ORDERED, len(match.group(1)) // 2, match.group(2).strip())
+                continue
+
+        # Accumulate consecutive non-empty lines as a paragraph
+        paragraph_lines = [stripped]
+        while i < count:
+            line = lines[i]
+            stripped = line.strip()
+            if not stripped or _PARAGRAPH_BREAK.match(line):
+                break
+            paragraph_lines.append(stripped)
+            i += 1
+        yield start, (BLOCK_PARAGRAPH, ' '.join(paragraph_lines))
+
+    if in_code_block and code_block_lines:
+        yield code_start, (BLOCK_CODE, code_language, '\n'.join(code_block_lines), False)
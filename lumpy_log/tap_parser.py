@@ -2,9 +2,20 @@
 """TAP (Test Anything Protocol) parser for test output processing."""
 
 import re
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional
 from dataclasses import dataclass, field
 
+# Lines inspected when detecting the output format
+DETECT_LINES = 20
+# Most characters read from a stream in one go, so a long (e.g. single-line
+# XML) input is never held whole
+READ_CHUNK = 64 * 1024
+
+# Limits on what is kept for each failed test, so memory stays bounded
+MAX_DIAGNOSTIC_LINES = 50
+MAX_DIAGNOSTIC_LINE_LENGTH = 1000
+MAX_SUBTESTS = 20
+
 
 @dataclass
 class TAPResult:
@@ -31,76 +42,23 @@ class SimpleTAPParser:
         re.IGNORECASE
     )
     DIAGNOSTIC_RE = re.compile(r'^#\s*(.*)$')
+    YAML_START_RE = re.compile(r'^(\s+)---\s*$')
+    YAML_END_RE = re.compile(r'^\s+\.\.\.\s*$')
     BAIL_OUT_RE = re.compile(r'^Bail out!\s*(.*)$', re.IGNORECASE)
     
     @staticmethod
     def parse(tap_output: str) -> TAPResult:
         """Parse TAP format output"""
-        result = TAPResult(raw_output=tap_output)
-        lines = tap_output.split('\n')
-        
-        test_number = 0
-        plan_seen = False
-        
-        for line in lines:
-            line = line.rstrip()
-            
-            # Check version
-            version_match = SimpleTAPParser.VERSION_RE.match(line)
-            if version_match:
-                result.version = int(version_match.group(1))
-                continue
-            
-            # Check plan (only accept first plan line)
-            plan_match = SimpleTAPParser.PLAN_RE.match(line)
-            if plan_match and not plan_seen:
-                result.plan_start = 1
-                result.plan_end = int(plan_match.group(1))
-                plan_seen = True
-                continue
-            
-            # Check test line
-            test_match = SimpleTAPParser.TEST_LINE_RE.match(line)
-            if test_match:
-                status = test_match.group(1).lower()
-                number = test_match.group(2)
-                description = test_match.group(3).strip() if test_match.group(3) else ""
-                directive = test_match.group(4)
-                directive_reason = test_match.group(5)
-                
-                test_number += 1
-                result.tests_run = test_number
-                
-                if directive and directive.upper() == 'SKIP':
-                    result.tests_skipped += 1
-                elif status == 'ok':
-                    result.tests_passed += 1
-                else:  # not ok
-                    result.tests_failed += 1
-                    result.failed_tests.append({
-                        'number': number or str(test_number),
-                        'description': description,
-                        'line': line
-                    })
-                
-                continue
-            
-            # Check bail out
-            bail_match = SimpleTAPParser.BAIL_OUT_RE.match(line)
-            if bail_match:
-                result.failed_tests.append({
-                    'number': 'BAIL',
-                    'description': bail_match.group(1),
-                    'line': line
-                })
-                break
-        
+        parser = StreamingTAPParser()
+        parser.feed(tap_output.split('\n'))
+        result = parser.finish()
+        result.raw_output = tap_output
         return result
 
     @staticmethod
     def is_tap_format(output: str) -> bool:
         """Quick check if output appears to be TAP format"""
-        lines = output.split('\n')[:20]  # Check first 20 lines
+        lines = output.split('\n')[:DETECT_LINES]  # Check first 20 lines
         
         for line in lines:
             if SimpleTAPParser.VERSION_RE.match(line):
@@ -113,9 +71,191 @@ class SimpleTAPParser:
         return False
 
 
+class StreamingTAPParser:
+    """Incremental TAP parser that consumes output one line at a time.
+
+    Only counters and failed tests are kept, so memory use does not grow with
+    the amount of passing output. Uses the SimpleTAPParser patterns.
+
+    Failed tests also get, when present:
+        diagnostics: the TAP 13 YAML block that followed the test line
+        message: the YAML block's message field
+        subtests: failed indented subtests reported before the test line,
+            each with number, description, line, depth and its own diagnostics
+        subtests_dropped: failed subtests beyond MAX_SUBTESTS
+    Diagnostics are capped at MAX_DIAGNOSTIC_LINES lines.
+    """
+
+    def __init__(self):
+        self.result = TAPResult()
+        self._plan_seen = False
+        self._bailed = False
+        # Test line a following YAML block may belong to, and its failure entry (if any)
+        self._after_test = False
+        self._yaml_target = None
+        self._yaml = None
+        self._subtests = []
+        self._subtests_dropped = 0
+
+    def feed_line(self, line: str) -> None:
+        """Parse a single line of TAP output."""
+        if self._bailed:
+            return
+        result = self.result
+        line = line.rstrip()
+
+        if self._yaml is not None and self._feed_yaml(line):
+            return
+
+        after_test, self._after_test = self._after_test, False
+        if after_test:
+            yaml_match = SimpleTAPParser.YAML_START_RE.match(line)
+            if yaml_match:
+                self._yaml = {
+                    'target': self._yaml_target,
+                    'indent': len(yaml_match.group(1)),
+                    'lines': [],
+                    'dropped': 0,
+                }
+                return
+
+        # Indented lines belong to subtests
+        if line[:1].isspace():
+            self._feed_subtest(line)
+            return
+
+        # Check version
+        version_match = SimpleTAPParser.VERSION_RE.match(line)
+        if version_match:
+            result.version = int(version_match.group(1))
+            return
+
+        # Check plan (only accept first plan line)
+        plan_match = SimpleTAPParser.PLAN_RE.match(line)
+        if plan_match and not self._plan_seen:
+            result.plan_start = 1
+            result.plan_end = int(plan_match.group(1))
+            self._plan_seen = True
+            return
+
+        # Check test line
+        test_match = SimpleTAPParser.TEST_LINE_RE.match(line)
+        if test_match:
+            status = test_match.group(1).lower()
+            number = test_match.group(2)
+            description = test_match.group(3).strip() if test_match.group(3) else ""
+            directive = test_match.group(4)
+
+            result.tests_run += 1
+            subtests, self._subtests = self._subtests, []
+            subtests_dropped, self._subtests_dropped = self._subtests_dropped, 0
+            self._after_test = True
+            self._yaml_target = None
+
+            if directive and directive.upper() == 'SKIP':
+                result.tests_skipped += 1
+            elif status == 'ok':
+                result.tests_passed += 1
+            else:  # not ok
+                result.tests_failed += 1
+                failed = {
+                    'number': number or str(result.tests_run),
+                    'description': description,
+                    'line': line
+                }
+                if subtests:
+                    failed['subtests'] = subtests
+                if subtests_dropped:
+                    failed['subtests_dropped'] = subtests_dropped
+                result.failed_tests.append(failed)
+                self._yaml_target = failed
+            return
+
+        # Check bail out; nothing after it is parsed
+        bail_match = SimpleTAPParser.BAIL_OUT_RE.match(line)
+        if bail_match:
+            result.failed_tests.append({
+                'number': 'BAIL',
+                'description': bail_match.group(1),
+                'line': line
+            })
+            self._bailed = True
+
+    def _feed_subtest(self, line: str) -> None:
+        """Record an indented test line, keeping it only if it failed."""
+        stripped = line.lstrip()
+        test_match = SimpleTAPParser.TEST_LINE_RE.match(stripped)
+        if not test_match:
+            return
+        self._after_test = True
+        self._yaml_target = None
+
+        directive = test_match.group(4)
+        if test_match.group(1).lower() == 'ok' or (directive and directive.upper() == 'SKIP'):
+            return
+        if len(self._subtests) >= MAX_SUBTESTS:
+            self._subtests_dropped += 1
+            return
+        subtest = {
+            'number': test_match.group(2) or '',
+            'description': test_match.group(3).strip() if test_match.group(3) else "",
+            'line': stripped,
+            'depth': max(1, (len(line) - len(stripped)) // 4),
+        }
+        self._subtests.append(subtest)
+        self._yaml_target = subtest
+
+    def _feed_yaml(self, line: str) -> bool:
+        """Add a line to the open YAML block; returns False if the line ended it without being consumed."""
+        block = self._yaml
+        if SimpleTAPParser.YAML_END_RE.match(line):
+            self._close_yaml()
+            return True
+        if line.strip() and len(line) - len(line.lstrip()) < block['indent']:
+            # Dedented without a closing "...": the line is regular TAP again
+            self._close_yaml()
+            return False
+        if block['target'] is not None:
+            if len(block['lines']) < MAX_DIAGNOSTIC_LINES:
+                block['lines'].append(line[block['indent']:][:MAX_DIAGNOSTIC_LINE_LENGTH])
+            else:
+                block['dropped'] += 1
+        return True
+
+    def _close_yaml(self) -> None:
+        block, self._yaml = self._yaml, None
+        target = block['target']
+        if target is None or not block['lines']:
+            return
+        text = '\n'.join(block['lines'])
+        if block['dropped']:
+            target['diagnostics'] = f"{text}\n# ... {block['dropped']} more lines"
+            return
+        target['diagnostics'] = text
+
+        import yaml
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError:
+            return
+        if isinstance(data, dict) and data.get('message') is not None:
+            target['message'] = str(data['message']).strip()
+
+    def feed(self, lines: Iterable[str]) -> None:
+        """Parse each line from an iterable (e.g. an open text stream)."""
+        for line in lines:
+            self.feed_line(line)
+
+    def finish(self) -> TAPResult:
+        """Return the result for everything fed so far."""
+        if self._yaml is not None:
+            self._close_yaml()
+        return self.result
+
+
 def parse_test_output(output: str) -> Dict:
     """
-    Parse test output - TAP if available, raw otherwise
+    Parse test output - JUnit XML or TAP if detected, raw otherwise
     
     Returns dictionary with test results data
     """
@@ -130,26 +270,86 @@ def parse_test_output(output: str) -> Dict:
             'summary': 'No test output received'
         }
     
+    from .junit_parser import JUnitParser
+    if JUnitParser.is_junit_format(output):
+        return _result_summary(JUnitParser.parse(output), 'junit')
     if SimpleTAPParser.is_tap_format(output):
-        tap_result = SimpleTAPParser.parse(output)
-        return {
-            'format': 'tap',
-            'tests_run': tap_result.tests_run,
-            'tests_passed': tap_result.tests_passed,
-            'tests_failed': tap_result.tests_failed,
-            'tests_skipped': tap_result.tests_skipped,
-            'failed_tests': tap_result.failed_tests,
-            'summary': f'{tap_result.tests_run} tests run'
-        }
+        return _result_summary(SimpleTAPParser.parse(output), 'tap')
     else:
         # Fallback: just capture raw output
-        line_count = len(output.split('\n'))
-        return {
-            'format': 'raw',
-            'tests_run': 0,
-            'tests_passed': 0,
-            'tests_failed': 0,
-            'tests_skipped': 0,
-            'failed_tests': [],
-            'summary': f'{line_count} lines captured'
-        }
+        return _raw_summary(len(output.split('\n')))
+
+
+def parse_test_stream(stream) -> Dict:
+    """
+    Parse test output from a text stream without holding it in memory
+
+    Up to DETECT_LINES lines (and at most READ_CHUNK characters) are buffered
+    to detect the format; the rest is parsed as it is read. TAP is read line
+    by line, JUnit XML and raw output in READ_CHUNK pieces. Returns the same
+    dictionary as parse_test_output.
+
+    Args:
+        stream: Text stream with readline(size), e.g. an open file or stdin
+    """
+    head = []
+    size = 0
+    while len(head) < DETECT_LINES and size < READ_CHUNK:
+        piece = stream.readline(READ_CHUNK - size)
+        if not piece:
+            break
+        head.append(piece)
+        size += len(piece)
+    text = ''.join(head)
+    chunks = iter(lambda: stream.readline(READ_CHUNK), '')
+
+    from .junit_parser import JUnitParser
+    if JUnitParser.is_junit_format(text):
+        parser = JUnitParser()
+        parser.feed(head)
+        parser.feed(chunks)
+        return _result_summary(parser.finish(), 'junit')
+
+    if SimpleTAPParser.is_tap_format(text):
+        if head and not head[-1].endswith('\n'):
+            # Finish a line cut short by the detection limit
+            head[-1] += stream.readline()
+        parser = StreamingTAPParser()
+        parser.feed(head)
+        parser.feed(iter(stream.readline, ''))
+        return _result_summary(parser.finish(), 'tap')
+
+    # Count lines the way parse_test_output does (newlines + 1)
+    has_content = bool(text.strip())
+    newlines = text.count('\n')
+    for chunk in chunks:
+        newlines += chunk.count('\n')
+        if not has_content and chunk.strip():
+            has_content = True
+    if not has_content:
+        return parse_test_output('')
+    return _raw_summary(newlines + 1)
+
+
+def _result_summary(tap_result: TAPResult, format_name: str) -> Dict:
+    return {
+        'format': format_name,
+        'tests_run': tap_result.tests_run,
+        'tests_passed': tap_result.tests_passed,
+        'tests_failed': tap_result.tests_failed,
+        'tests_skipped': tap_result.tests_skipped,
+        'failed_tests': tap_result.failed_tests,
+        'summary': f'{tap_result.tests_run} tests run'
+    }
+
+
+def _raw_summary(line_count: int) -> Dict:
+    return {
+        'format': 'raw',
+        'tests_run': 0,
+        'tests_passed': 0,
+        'tests_failed': 0,
+        'tests_skipped': 0,
+        'failed_tests': [],
+        'summary': f'{line_count} lines captured'
+    }
@@ -3,13 +3,20 @@
 
 import sys
 import os
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from . import OUTPUT_TESTRESULTS_DIR
-from jinja2 import Environment, FileSystemLoader
-from .tap_parser import parse_test_output
+from .tap_parser import parse_test_output, parse_test_stream
 from .utils import _clean_markdown, _get_templates_dir, _format_markdown, _rebuild_index
-from .config import print_active_config, get_output_format, get_config_value, get_raw_output
+from .config import LumpyConfig
+
+NO_INPUT_MESSAGE = (
+    "No input provided. Either pipe test output or use --input <file>.\n"
+    "Example: pytest --tap | lumpy-log test"
+)
+EMPTY_INPUT_MESSAGE = "Empty input received. Please provide test output via pipe or file."
+
 
 class TestProcessor:
     """Process test output and generate markdown files"""
@@ -19,6 +26,7 @@ class TestProcessor:
         self.tests_dir = self.output_folder / OUTPUT_TESTRESULTS_DIR
         
         # Set up Jinja2 environment
+        from jinja2 import Environment, FileSystemLoader
         self.jinja_env = Environment(loader=FileSystemLoader(_get_templates_dir()))
     
     def setup_directories(self):
@@ -44,18 +52,35 @@ class TestProcessor:
         else:
             # Read from stdin
             if sys.stdin.isatty():
-                raise ValueError(
-                    "No input provided. Either pipe test output or use --input <file>.\n"
-                    "Example: pytest --tap | lumpy-log test"
-                )
+                raise ValueError(NO_INPUT_MESSAGE)
             
             content = sys.stdin.read()
             if not content or not content.strip():
-                raise ValueError(
-                    "Empty input received. Please provide test output via pipe or file."
-                )
+                raise ValueError(EMPTY_INPUT_MESSAGE)
             
             return content
+
+    @contextmanager
+    def open_input(self, input_file: str = None):
+        """
+        Open test output from file or stdin for line-by-line reading
+        
+        Args:
+            input_file: Path to file, or None to read from stdin
+            
+        Yields:
+            Text stream of test output (stdin is not closed afterwards)
+            
+        Raises:
+            ValueError: If no file is given and stdin is a terminal
+        """
+        if input_file:
+            with open(input_file, 'r', encoding='utf-8') as f:
+                yield f
+        else:
+            if sys.stdin.isatty():
+                raise ValueError(NO_INPUT_MESSAGE)
+            yield sys.stdin
     
     def generate_filename(self) -> str:
         """Generate timestamped filename for test results"""
@@ -70,6 +95,7 @@ class TestProcessor:
         build_devlog: bool = False,
         limit: int = None,
         output_formats: list = None,
+        config: LumpyConfig = None,
     ) -> Path:
         """
         Process test output and generate markdown file
@@ -79,6 +105,79 @@ class TestProcessor:
             verbose: Print progress messages
             raw_output: Include raw output in the markdown report
             output_formats: List of output formats (e.g., ['obsidian', 'docx'])
+            config: Resolved run configuration, passed on to the index rebuild
+            
+        Returns:
+            Path to generated markdown file
+        """
+        # Parse test output
+        test_data = parse_test_output(output)
+        
+        # Only include raw output if explicitly requested
+        if raw_output:
+            test_data['raw_output'] = output
+        
+        return self.write_results(
+            test_data,
+            verbose=verbose,
+            limit=limit,
+            output_formats=output_formats,
+            config=config,
+        )
+
+    def process_test_stream(
+        self,
+        stream,
+        verbose: bool = False,
+        limit: int = None,
+        output_formats: list = None,
+        config: LumpyConfig = None,
+        require_content: bool = False,
+    ) -> Path:
+        """
+        Process test output line by line and generate markdown file
+        
+        Unlike process_test_output the output is never held in memory, so
+        the raw output cannot be included in the report.
+        
+        Args:
+            stream: Text stream of output (e.g. an open text file or stdin)
+            verbose: Print progress messages
+            output_formats: List of output formats (e.g., ['obsidian', 'docx'])
+            config: Resolved run configuration, passed on to the index rebuild
+            require_content: Raise ValueError instead of writing a report for empty input
+            
+        Returns:
+            Path to generated markdown file
+        """
+        test_data = parse_test_stream(stream)
+        if require_content and test_data['format'] == 'empty':
+            raise ValueError(EMPTY_INPUT_MESSAGE)
+        
+        return self.write_results(
+            test_data,
+            verbose=verbose,
+            limit=limit,
+            output_formats=output_formats,
+            config=config,
+        )
+
+    def write_results(
+        self,
+        test_data: dict,
+        verbose: bool = False,
+        limit: int = None,
+        output_formats: list = None,
+        config: LumpyConfig = None,
+    ) -> Path:
+        """
+        Render parsed test results to markdown and rebuild the index
+        
+        Args:
+            test_data: Result dictionary from parse_test_output/parse_test_stream
+            verbose: Print progress messages
+            output_formats: List of output formats (e.g., ['obsidian', 'docx'])
+            config: Resolved run configuration, passed on to the index rebuild
             
         Returns:
             Path to generated markdown file
@@ -87,17 +186,10 @@ class TestProcessor:
         if output_formats is None:
             output_formats = ["obsidian"]
         
-        # Parse test output
-        test_data = parse_test_output(output)
-        
         # Add metadata
         test_data['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         test_data['generation_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Only include raw output if explicitly requested
-        if raw_output:
-            test_data['raw_output'] = output
-        
         # Load template and render
         template = self.jinja_env.get_template("test_results.md")
         markdown_content = template.render(test_data)
@@ -111,7 +203,7 @@ class TestProcessor:
         
         if verbose:
             print(f"Test results saved to: {filepath}")
-            if test_data['format'] == 'tap':
+            if test_data['format'] in ('tap', 'junit'):
                 print(f"  Tests run: {test_data['tests_run']}")
                 print(f"  Passed: {test_data['tests_passed']}")
                 print(f"  Failed: {test_data['tests_failed']}")
@@ -124,47 +216,87 @@ class TestProcessor:
             output_formats=output_formats,
             limit=limit,
             repo_path=".",
+            config=config,
         )
         
         return filepath
-    
-def main(args: dict) -> int:
+
+
+class TeeReader:
+    """Text stream wrapper that echoes everything read from it to out"""
+
+    def __init__(self, stream, out=None):
+        self.stream = stream
+        self.out = out or sys.stdout
+
+    def readline(self, size: int = -1) -> str:
+        """Read a line (at most size characters) and echo it straight away"""
+        line = self.stream.readline(size)
+        if line:
+            self.out.write(line)
+            self.out.flush()
+        return line
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+
+def main(args: dict, config: LumpyConfig = None) -> int:
     """
     Main entry point for test processing
     
     Args:
         args: Dictionary of CLI arguments
+        config: Resolved run configuration (loaded from args if not given)
     """
     repo_path = '.'
+    if config is None:
+        config = LumpyConfig(args, repo_path)
 
     # Resolve verbosity from CLI/config/defaults
-    verbose = get_config_value('verbose', args, repo_path, False)
+    verbose = config.get('verbose', False)
 
     if verbose:
-        print_active_config(args, repo_path)
+        config.print_active()
     
-    output_folder = get_config_value('outputfolder', args, repo_path, 'devlog')
+    output_folder = config.get('outputfolder', 'devlog')
     
     # Determine output formats from config and CLI
-    output_formats = get_output_format(args, repo_path)
+    output_formats = config.output_formats
     
     processor = TestProcessor(output_folder)
     processor.setup_directories()
     
     try:
-        # Read input
-        output = processor.read_input(args.get('input'))
-        
-        # Process and generate markdown
-        raw_output = bool(get_raw_output(args, repo_path, False))
-        filepath = processor.process_test_output(
-            output, 
-            verbose=verbose,
-            raw_output=raw_output,
-            build_devlog=args.get("devlog", False),
-            limit=args.get('limit'),
-            output_formats=output_formats,
-        )
+        raw_output = config.raw_output(False)
+        input_file = args.get('input')
+        with processor.open_input(input_file) as stream:
+            if args.get('tee'):
+                stream = TeeReader(stream, sys.stdout)
+            if raw_output:
+                # The report embeds the output, so it has to be read in full
+                output = ''.join(stream)
+                if not input_file and not output.strip():
+                    raise ValueError(EMPTY_INPUT_MESSAGE)
+                filepath = processor.process_test_output(
+                    output, 
+                    verbose=verbose,
+                    raw_output=raw_output,
+                    build_devlog=args.get("devlog", False),
+                    limit=args.get('limit'),
+                    output_formats=output_formats,
+                    config=config,
+                )
+            else:
+                # Parse as the output arrives, keeping only counts and failures
+                filepath = processor.process_test_stream(
+                    stream,
+                    verbose=verbose,
+                    limit=args.get('limit'),
+                    output_formats=output_formats,
+                    config=config,
+                    require_content=not input_file,
+                )
         
         if not verbose:
             print(f"Test results saved to: {filepath}")
@@ -1,12 +1,12 @@
 import os
 import re
+import json
 from pathlib import Path
 from . import OUTPUT_JOURNAL_DIR, OUTPUT_CHANGELOGS_DIR, OUTPUT_TESTRESULTS_DIR
 from . import ITEM_TYPE_CHANGELOG, ITEM_TYPE_TEST, ITEM_TYPE_ENTRY
+from . import __version__
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader
-import mdformat
-from lumpy_log.config import get_hcti_credentials
+from lumpy_log.config import LumpyConfig
 
 # Export for external use
 __all__ = [
@@ -20,6 +20,24 @@ __all__ = [
     "_rebuild_index",
 ]
 
+# Records which items index.md/devlog.md were built from, so later runs can
+# append new items instead of regenerating everything
+ITEM_MANIFEST = ".lumpy_manifest.json"
+MANIFEST_VERSION = 1
+DEVLOG_SEPARATOR = "\n\n---\n\n"
+DEVLOG_SEPARATOR_BYTES = DEVLOG_SEPARATOR.encode("utf-8")
+DEVLOG_COPY_CHUNK = 1024 * 1024
+# Converted docx XML per devlog block, reused by the next docx export
+DOCX_BLOCK_CACHE = ".lumpy_docx_blocks"
+DEVLOG_FILE = "devlog.md"
+# Devlog kept when only docx is requested, so the next run can extend it
+HIDDEN_DEVLOG_FILE = ".devlog.md"
+_ITEM_DIRS = (
+    (OUTPUT_CHANGELOGS_DIR, ITEM_TYPE_CHANGELOG),
+    (OUTPUT_TESTRESULTS_DIR, ITEM_TYPE_TEST),
+    (OUTPUT_JOURNAL_DIR, ITEM_TYPE_ENTRY),
+)
+
 
 def _get_templates_dir():
     package_dir = os.path.dirname(os.path.abspath(__file__))
@@ -32,6 +50,11 @@ def _clean_markdown(md: str) -> str:
     return cleaned.strip() + "\n"
 
 def _format_markdown(md: str) -> str:
+    # mdformat pulls in markdown-it, so only import it when formatting
+    try:
+        import mdformat
+    except ImportError:
+        mdformat = None
     if mdformat:
         try:
             return mdformat.text(md).rstrip() + "\n"
@@ -101,6 +124,7 @@ def _generate_obsidian_index(output_folder: str, items: list, verbose: bool = Fa
     entry_count = sum(1 for item in items if item["type"] == ITEM_TYPE_ENTRY)
     
     # Set up Jinja2 for templates
+    from jinja2 import Environment, FileSystemLoader
     jinja_env = Environment(loader=FileSystemLoader(_get_templates_dir()))
     
     index_path = output_path / "index.md"
@@ -122,53 +146,126 @@ def _generate_obsidian_index(output_folder: str, items: list, verbose: bool = Fa
     
     return {"obsidian": str(index_path)}
 
-def _generate_devlog(output_folder: str, items: list, verbose: bool = False, current_branch: str = None) -> dict:
-    """Generate devlog markdown from items.
-    
-    Args:
-        output_folder: Base output folder
-        items: List of items with path, name, type, and filename
-        verbose: Print progress messages
-        current_branch: Current git branch name
-    
-    Returns:
-        Dict with "devlog" key pointing to devlog path
-    """
+def _normalize_segment(text: str) -> str:
+    """Normalize one devlog segment the way _clean_markdown treats the whole file."""
+    cleaned = "\n".join(line.rstrip() for line in text.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", cleaned).strip()
+
+def _read_segments(output_folder: str, items: list, verbose: bool = False):
+    """Yield (item, segment) with the normalized, non-empty segment of each readable item."""
     output_path = Path(output_folder)
+    for item in items:
+        entry_path = output_path / item["path"]
+        try:
+            segment = _normalize_segment(entry_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            if verbose:
+                print(f"Missing item skipped: {entry_path}")
+            continue
+        if segment:
+            yield item, segment
+
+def _devlog_header(items: list, current_branch: str = None) -> str:
+    """Build the devlog header block that summarises the items."""
     commit_count = sum(1 for item in items if item["type"] == ITEM_TYPE_CHANGELOG)
     test_count = sum(1 for item in items if item["type"] == ITEM_TYPE_TEST)
     entry_count = sum(1 for item in items if item["type"] == ITEM_TYPE_ENTRY)
-    
     header_lines = [
         "# Devlog",
         "",
         datetime.now().strftime("Generated: %Y-%m-%d %H:%M:%S"),
         f"Branch: {current_branch or 'unknown'}",
         f"Items: {len(items)} ({commit_count} commits, {test_count} tests, {entry_count} entries)",
-        "",
     ]
+    return "\n".join(header_lines) + "\n"
+
+def _copy_range(src, dst, length: int) -> None:
+    """Copy length bytes from src to dst in bounded chunks."""
+    while length > 0:
+        chunk = src.read(min(length, DEVLOG_COPY_CHUNK))
+        if not chunk:
+            raise OSError("devlog.md is shorter than its manifest records")
+        dst.write(chunk)
+        length -= len(chunk)
+
+def _write_devlog(devlog_path: Path, header: str, segments, prefix: dict = None) -> dict:
+    """Stream a devlog to a temp file and move it into place.
     
-    segments = []
-    for item in items:
-        entry_path = output_path / item["path"]
-        try:
-            entry_text = entry_path.read_text(encoding="utf-8").strip()
-            segments.append(entry_text)
-        except FileNotFoundError:
-            if verbose:
-                print(f"Missing item skipped: {entry_path}")
+    Segments are written as they are produced, so only one item is held in
+    memory at a time.
     
-    devlog_body = "\n\n---\n\n".join(segments)
-    full_devlog = _clean_markdown("\n".join(header_lines + ([devlog_body] if devlog_body else [])))
+    Args:
+        devlog_path: Destination devlog.md
+        header: Header block from _devlog_header
+        segments: Iterable of (item, segment) pairs from _read_segments
+        prefix: Cached leading segments of the existing devlog.md (see
+            _devlog_prefix), copied ahead of the new segments
+    
+    Returns:
+        Layout dict with "body_offset" and "segments" (item path -> [offset, length] in bytes)
+    """
+    header_bytes = header.encode("utf-8")
+    layout = {"body_offset": len(header_bytes), "segments": {}}
+    tmp_path = devlog_path.with_name(devlog_path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(header_bytes)
+            has_body = False
+            if prefix and prefix["segments"]:
+                with open(devlog_path, "rb") as src:
+                    src.seek(prefix["body_offset"])
+                    _copy_range(src, out, prefix["end"] - prefix["body_offset"])
+                shift = layout["body_offset"] - prefix["body_offset"]
+                for path, (offset, length) in prefix["segments"].items():
+                    layout["segments"][path] = [offset + shift, length]
+                has_body = True
+            for item, segment in segments:
+                data = segment.encode("utf-8")
+                out.write(DEVLOG_SEPARATOR_BYTES if has_body else b"\n")
+                layout["segments"][item["path"]] = [out.tell(), len(data)]
+                out.write(data)
+                has_body = True
+            if has_body:
+                out.write(b"\n")
+        os.replace(tmp_path, devlog_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return layout
+
+def _generate_devlog(output_folder: str, items: list, verbose: bool = False, current_branch: str = None, prefix: dict = None, filename: str = DEVLOG_FILE) -> dict:
+    """Generate devlog markdown from items.
+    
+    Args:
+        output_folder: Base output folder
+        items: List of items with path, name, type, and filename
+        verbose: Print progress messages
+        current_branch: Current git branch name
+        prefix: Cached leading segments of the existing devlog.md; the first
+            prefix["count"] items are taken from it rather than re-read
+        filename: Devlog file name within output_folder
     
-    devlog_path = output_path / "devlog.md"
-    devlog_path.write_text(full_devlog, encoding="utf-8")
+    Returns:
+        Dict with "devlog" key pointing to devlog path and "layout" with the
+        segment offsets written
+    """
+    devlog_path = Path(output_folder) / filename
+    reused = prefix["count"] if prefix else 0
+    layout = _write_devlog(
+        devlog_path,
+        _devlog_header(items, current_branch),
+        _read_segments(output_folder, items[reused:], verbose),
+        prefix=prefix,
+    )
     if verbose:
-        print(f"Built devlog: {devlog_path}")
+        if reused:
+            print(f"Built devlog: {devlog_path} ({reused} cached, {len(items) - reused} read)")
+        else:
+            print(f"Built devlog: {devlog_path}")
     
-    return {"devlog": str(devlog_path)}
+    return {"devlog": str(devlog_path), "layout": layout}
 
-def _generate_docx(devlog_md_path: str, output_path: str = None, verbose: bool = False, render_code_as_images: bool = False, repo_path: str = ".") -> dict:
+def _generate_docx(devlog_md_path: str, output_path: str = None, verbose: bool = False, render_code_as_images: bool = False, repo_path: str = ".", config: LumpyConfig = None) -> dict:
     """Convert devlog markdown to docx using our custom converter.
     
     Args:
@@ -177,17 +274,25 @@ def _generate_docx(devlog_md_path: str, output_path: str = None, verbose: bool =
         verbose: Print progress messages
         render_code_as_images: If True, render code blocks as images using HCTI API or local Playwright
         repo_path: Repository path for loading HCTI credentials from config
+        config: Resolved run configuration (loaded from repo_path if not given)
     
     Returns:
         Dict with "docx" key pointing to docx path, or empty dict if conversion failed
     """
+    if config is None:
+        config = LumpyConfig({}, repo_path)
+
     if output_path is None:
         md_path = Path(devlog_md_path)
         output_path = str(md_path.parent / "devlog.docx")
     
+    # Earlier versions kept the block cache as a single JSON file
+    (Path(output_path).parent / ".lumpy_docx_blocks.json").unlink(missing_ok=True)
+    
     try:
         try:
             from lumpy_log.md_to_docx import markdown_file_to_docx
+            from lumpy_log.image_cache import ImageCache
         except ImportError as ie:
             msg = (
                 "Optional dependencies for docx playwright offline image generation are not installed.\n"
@@ -201,7 +306,7 @@ def _generate_docx(devlog_md_path: str, output_path: str = None, verbose: bool =
             return {}
 
         # Get HCTI credentials from config or environment
-        hcti_creds = get_hcti_credentials(repo_path)
+        hcti_creds = config.hcti_credentials
         hcti_user_id = hcti_creds.get('user_id')
         hcti_api_key = hcti_creds.get('api_key')
 
@@ -213,7 +318,12 @@ def _generate_docx(devlog_md_path: str, output_path: str = None, verbose: bool =
             str(output_path), 
             render_code_as_images,
             hcti_user_id=hcti_user_id,
-            hcti_api_key=hcti_api_key
+            hcti_api_key=hcti_api_key,
+            hcti_url=config.get('hcti_api_url'),
+            image_workers=config.get('image_workers'),
+            image_cache=ImageCache.from_config(config),
+            kroki_url=config.kroki_url,
+            block_cache=str(Path(output_path).parent / DOCX_BLOCK_CACHE),
         )
         if success:
             if verbose:
@@ -229,6 +339,149 @@ def _generate_docx(devlog_md_path: str, output_path: str = None, verbose: bool =
             print(f"Warning: docx conversion failed ({error_type}): {e}")
         return {}
 
+def _scan_items(output_folder: str) -> dict:
+    """Stat every item file under the output folder.
+    
+    Args:
+        output_folder: Base output folder containing change_logs/, test_results/, journal/
+    
+    Returns:
+        Dict mapping item path to an item dict (as in _collect_items) plus "mtime" and "size"
+    """
+    found = {}
+    for subdir, item_type in _ITEM_DIRS:
+        try:
+            entries = os.scandir(os.path.join(output_folder, subdir))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if not entry.name.endswith(".md") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                path = f"{subdir}/{entry.name}"
+                found[path] = {
+                    "path": path,
+                    "name": entry.name[:-3],
+                    "type": item_type,
+                    "filename": entry.name,
+                    "mtime": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                }
+    return found
+
+def _manifest_settings(changelog_order: bool, limit: int, output_formats: list) -> dict:
+    return {
+        "version": MANIFEST_VERSION,
+        "lumpy_version": __version__,
+        "changelog_order": bool(changelog_order),
+        "limit": limit if limit and limit > 0 else None,
+        "formats": sorted(set(output_formats)),
+    }
+
+def _load_manifest(output_folder: str):
+    try:
+        with open(os.path.join(output_folder, ITEM_MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def _save_manifest(output_folder: str, items: list, scanned: dict, settings: dict, layout: dict = None, devlog_file: str = DEVLOG_FILE) -> None:
+    """Record the items the outputs were built from and where each sits in the devlog."""
+    manifest_path = Path(output_folder) / ITEM_MANIFEST
+    devlog_path = Path(output_folder) / devlog_file
+    if layout is None or not devlog_path.exists():
+        layout = None
+    entries = []
+    for item in items:
+        current = scanned.get(item["path"])
+        if current is None:
+            # Item appeared or vanished mid-run; leave no manifest so the next run is a full rebuild
+            manifest_path.unlink(missing_ok=True)
+            return
+        entry = {"path": item["path"], "mtime": current["mtime"], "size": current["size"]}
+        if layout is not None:
+            entry["segment"] = layout["segments"].get(item["path"])
+        entries.append(entry)
+    manifest = dict(settings, items=entries)
+    if layout is not None:
+        manifest["devlog"] = {"file": devlog_file, "size": devlog_path.stat().st_size, "body_offset": layout["body_offset"]}
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+def _devlog_current(manifest: dict, output_folder: str) -> bool:
+    """Check the devlog is still the file the manifest describes."""
+    devlog = manifest.get("devlog")
+    if not devlog:
+        return False
+    try:
+        return os.stat(os.path.join(output_folder, devlog.get("file", DEVLOG_FILE))).st_size == devlog["size"]
+    except OSError:
+        return False
+
+def _devlog_prefix(manifest: dict, output_folder: str, items: list, scanned: dict, devlog_file: str = DEVLOG_FILE):
+    """Find the leading items whose segments devlog_file already holds.
+    
+    Item change logs are immutable once written, so a segment is reused when
+    the item's path, mtime and size all match the manifest entry at the same
+    position.
+    
+    Returns:
+        Prefix dict for _write_devlog (with "count" of items covered), or None
+    """
+    if not manifest or manifest.get("lumpy_version") != __version__ or not _devlog_current(manifest, output_folder):
+        return None
+    if manifest["devlog"].get("file", DEVLOG_FILE) != devlog_file:
+        return None
+    body_offset = manifest["devlog"]["body_offset"]
+    prefix = {"body_offset": body_offset, "end": body_offset, "segments": {}, "count": 0}
+    for item, entry in zip(items, manifest.get("items", [])):
+        current = scanned.get(item["path"])
+        if entry["path"] != item["path"] or current is None or (current["mtime"], current["size"]) != (entry["mtime"], entry["size"]) or "segment" not in entry:
+            break
+        if entry["segment"]:
+            offset, length = entry["segment"]
+            prefix["segments"][item["path"]] = [offset, length]
+            prefix["end"] = offset + length
+        prefix["count"] += 1
+    return prefix
+
+def _incremental_items(manifest: dict, output_folder: str, scanned: dict, settings: dict, needs_devlog: bool):
+    """Work out which items can simply be appended to the existing outputs.
+    
+    The incremental path only applies when every manifest item is unchanged on
+    disk and all new items sort after the last known one, so appending them
+    gives exactly what a full rebuild would.
+    
+    Returns:
+        Tuple of (all_items, new_items), or None if a full rebuild is needed
+    """
+    if settings["changelog_order"] or settings["limit"]:
+        return None
+    if manifest is None or any(manifest.get(key) != value for key, value in settings.items()):
+        return None
+    
+    known = manifest.get("items", [])
+    for entry in known:
+        current = scanned.get(entry["path"])
+        if current is None or current["mtime"] != entry["mtime"] or current["size"] != entry["size"]:
+            return None
+    
+    if needs_devlog and not _devlog_current(manifest, output_folder):
+        return None
+    
+    known_paths = {entry["path"] for entry in known}
+    new_items = sorted((item for path, item in scanned.items() if path not in known_paths), key=lambda x: x["filename"])
+    if known and new_items and new_items[0]["filename"] <= scanned[known[-1]["path"]]["filename"]:
+        return None
+    
+    return [scanned[entry["path"]] for entry in known] + new_items, new_items
+
 def _rebuild_index(
     output_folder: str,
     verbose: bool = False,
@@ -237,9 +490,14 @@ def _rebuild_index(
     current_branch: str = None,
     limit: int = None,
     repo_path: str = ".",
+    config: LumpyConfig = None,
+    incremental: bool = True,
 ):
     """Rebuild the unified index with commits and tests interleaved by time.
 
+    When the item manifest left by the previous run still matches the output
+    folder, only newly added items are merged into index.md and devlog.md.
+
     Args:
         output_folder: Base output folder containing commits/ and tests/
         verbose: Print progress messages
@@ -248,46 +506,82 @@ def _rebuild_index(
         current_branch: Current git branch name
         limit: If specified, limit to N most recent entries
         repo_path: Repository path for loading HCTI credentials from config
+        config: Resolved run configuration (loaded from repo_path if not given)
+        incremental: If False, always regenerate everything from scratch
     """
     if output_formats is None:
         output_formats = ["obsidian"]
+    if config is None:
+        config = LumpyConfig({}, repo_path)
     
     results = {}
     
     if True or verbose:
         print(f"Rebuilding index with formats: {output_formats}")
     
-    # Collect items
-    items, commit_files, test_files, entry_files, total_before_limit = _collect_items(output_folder, changelog_order, limit)
+    needs_devlog = "devlog" in output_formats or "docx" in output_formats
+    settings = _manifest_settings(changelog_order, limit, output_formats)
+    scanned = _scan_items(output_folder)
+    manifest = _load_manifest(output_folder)
+    plan = _incremental_items(manifest, output_folder, scanned, settings, needs_devlog) if incremental else None
+    
+    if plan is not None:
+        items, new_items = plan
+        if verbose:
+            print(f"Incremental rebuild: {len(new_items)} new item(s)")
+    else:
+        # Collect items
+        items, commit_files, test_files, entry_files, total_before_limit = _collect_items(output_folder, changelog_order, limit)
+        new_items = items
+        
+        if verbose and limit and total_before_limit > len(items):
+            print(f"Limited to {len(items)} most recent entries (out of {total_before_limit} total)")
     
-    if verbose and limit and total_before_limit > len(items):
-        print(f"Limited to {len(items)} most recent entries (out of {total_before_limit} total)")
+    unchanged = plan is not None and not new_items
     
     # Generate obsidian index
     if "obsidian" in output_formats:
         results.update(_generate_obsidian_index(output_folder, items, verbose, current_branch))
     
     # Generate devlog and/or docx
-    if "devlog" in output_formats or "docx" in output_formats:
-        devlog_result = _generate_devlog(output_folder, items, verbose, current_branch)
-        results.update(devlog_result)
-        devlog_path = devlog_result.get("devlog")
+    layout = None
+    # With only docx requested the devlog is kept hidden rather than deleted,
+    # so the next run can still extend it incrementally
+    devlog_file = DEVLOG_FILE if "devlog" in output_formats else HIDDEN_DEVLOG_FILE
+    if needs_devlog:
+        devlog_path = str(Path(output_folder) / devlog_file)
+        if not unchanged:
+            devlog_result = _generate_devlog(
+                output_folder, items, verbose, current_branch,
+                prefix=_devlog_prefix(manifest, output_folder, items, scanned, devlog_file),
+                filename=devlog_file,
+            )
+            layout = devlog_result.pop("layout")
+            devlog_path = devlog_result["devlog"]
+        results["devlog"] = devlog_path
+        docx_path = Path(output_folder) / "devlog.docx"
+        if unchanged and "docx" in output_formats and docx_path.exists():
+            # Nothing new since the last run, so the existing docx is current
+            results["docx"] = str(docx_path)
+            devlog_path = None
         
         if "docx" in output_formats and devlog_path:
             # Check if code-as-images rendering should be enabled
-            from .config import get_config_value
-            render_code_as_images = get_config_value('render_code_as_images', {}, repo_path, False)
+            render_code_as_images = config.get('render_code_as_images', False)
             if verbose and render_code_as_images:
-                hcti_creds = get_hcti_credentials(repo_path)
+                hcti_creds = config.hcti_credentials
                 if hcti_creds:
                     print(f"Code-as-images: HCTI API (from {hcti_creds.get('source')})")
                 else:
                     print("Code-as-images: Playwright (local rendering)")
-            docx_result = _generate_docx(devlog_path, verbose=verbose, render_code_as_images=render_code_as_images, repo_path=repo_path)
+            docx_result = _generate_docx(devlog_path, output_path=str(docx_path), verbose=verbose, render_code_as_images=render_code_as_images, repo_path=repo_path, config=config)
             results.update(docx_result)
-            
-            # Clean up devlog.md if only docx was requested
-            if "devlog" not in output_formats and docx_result:
-                Path(devlog_path).unlink(missing_ok=True)
+        
+        # Only one devlog file is current; drop the other left by a run with different formats
+        stale_file = HIDDEN_DEVLOG_FILE if devlog_file == DEVLOG_FILE else DEVLOG_FILE
+        (Path(output_folder) / stale_file).unlink(missing_ok=True)
+    
+    if not unchanged:
+        _save_manifest(output_folder, items, scanned, settings, layout, devlog_file)
     
     return results
@@ -1,6 +1,6 @@
 import re
 import pytest
-from lumpy_log.changelump import ChangeLump
+from lumpy_log.changelump import ChangeLump, multiline_comment_mask
 from lumpy_log.languages import Languages
 import os
 
@@ -493,4 +493,82 @@ class TestChangeLumpMisc:
         lump = ChangeLump(python_language, code, start=10, end=12)
         assert lump.start == None
         assert lump.end == None
-        assert lump.code == ""
\ No newline at end of file
+        assert lump.code == ""
+
+class TestMultilineCommentMask:
+    """Test the shared per-file multiline comment scan"""
+
+    @pytest.fixture
+    def c_language(self, languages):
+        return languages.getByExtension(".c")
+
+    def test_python_docstring_lines_are_masked(self, python_language):
+        """Delimiter lines and the lines between them are inside the comment"""
+        code = [
+            "import os",
+            "\"\"\"",
+            "Module docstring.",
+            "\"\"\"",
+            "x = 1",
+        ]
+        mask = multiline_comment_mask(python_language, code)
+        assert mask[1:] == [False, True, True, True, False]
+
+    def test_c_block_comment_lines_are_masked(self, c_language):
+        """Lines from an unmatched begin marker to its end marker are inside the comment"""
+        code = [
+            "int x;",
+            "/* start",
+            " * middle",
+            " end */",
+            "int y;",
+        ]
+        mask = multiline_comment_mask(c_language, code)
+        assert mask[1:] == [False, True, True, True, False]
+
+    def test_no_multiline_comments(self, languages):
+        """Languages without begin/end markers have no mask"""
+        shell = languages.getByExtension(".sh")
+        assert multiline_comment_mask(shell, ["echo hi"]) is None
+
+    def test_extend_over_block_comment(self, c_language):
+        """extendOverComments should walk back over a multi-line block comment"""
+        code = [
+            "int other;",
+            "/*",
+            " * Adds two numbers",
+            " */",
+            "int add(int a, int b) {",
+            "    return a + b;",
+            "}",
+        ]
+        lump = ChangeLump(c_language, code, func={"start_line": 5, "end_line": 7, "name": "add"})
+        lump.extendOverComments()
+        assert lump.commentStart == 2
+        assert "Adds two numbers" in lump.code
+
+    def test_mask_is_shared_between_lumps(self, c_language):
+        """A precomputed mask is used as-is rather than rescanning the file"""
+        code = ["int x;", "int y;"]
+        mask = [False, False, True]
+        lump = ChangeLump(c_language, code, start=2, comment_mask=mask)
+        assert lump.lineIsComment(2) is True
+        assert lump.comment_mask is mask
+
+
+class TestChangeLumpSharedLines:
+    """Test that lumps share one line buffer per file"""
+
+    def test_lumps_share_line_buffer(self, python_language, sample_python_code):
+        """Lumps built from the same view should not copy the lines"""
+        from lumpy_log.list1 import list1view
+        lines = list1view(sample_python_code)
+        first = ChangeLump(python_language, lines, start=2)
+        second = ChangeLump(python_language, lines, start=7)
+        assert first.lines is lines
+        assert second.lines is lines
+
+    def test_plain_list_is_not_copied(self, python_language, sample_python_code):
+        """A plain list is wrapped without copying its contents"""
+        lump = ChangeLump(python_language, sample_python_code, start=2)
+        assert lump.lines.data is sample_python_code
@@ -0,0 +1,112 @@
+"""Tests for lumpy_log.config module."""
+
+import os
+import pytest
+import yaml
+from lumpy_log.config import LumpyConfig, get_config_value, _load_config_file
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A repo folder with a .lumpyconfig.yml."""
+    (tmp_path / ".lumpyconfig.yml").write_text(
+        "outputfolder: from_config\nverbose: true\noutput_format:\n  - devlog\n  - docx\n",
+        encoding="utf-8",
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def parse_count(monkeypatch):
+    """Count how often the YAML config is parsed."""
+    calls = []
+    original = yaml.safe_load
+
+    def counting_load(stream):
+        calls.append(stream)
+        return original(stream)
+
+    monkeypatch.setattr(yaml, "safe_load", counting_load)
+    return calls
+
+
+class TestLoadConfigFile:
+    """Tests for the cached config file loader."""
+
+    def test_missing_file(self, tmp_path):
+        """Should return an empty dict when there is no config file."""
+        assert _load_config_file(str(tmp_path)) == {}
+
+    def test_parsed_once(self, repo, parse_count):
+        """Repeated loads of an unchanged file should parse it once."""
+        for _ in range(5):
+            _load_config_file(str(repo))
+        assert len(parse_count) == 1
+
+    def test_reloads_after_edit(self, repo, parse_count):
+        """A changed mtime should trigger a re-parse."""
+        assert _load_config_file(str(repo))["outputfolder"] == "from_config"
+        config_file = repo / ".lumpyconfig.yml"
+        config_file.write_text("outputfolder: edited\n", encoding="utf-8")
+        stat = config_file.stat()
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert _load_config_file(str(repo))["outputfolder"] == "edited"
+        assert len(parse_count) == 2
+
+
+class TestLumpyConfig:
+    """Tests for the per-run LumpyConfig object."""
+
+    def test_cli_overrides_config_file(self, repo):
+        """CLI args win over the config file."""
+        config = LumpyConfig({"outputfolder": "from_cli"}, str(repo))
+        assert config.get("outputfolder", "devlog") == "from_cli"
+
+    def test_config_file_overrides_default(self, repo):
+        """Config file values win over defaults."""
+        config = LumpyConfig({"outputfolder": None}, str(repo))
+        assert config.get("outputfolder", "devlog") == "from_config"
+        assert config.get("verbose", False) is True
+
+    def test_defaults(self, tmp_path):
+        """Missing values fall back to the given default, then DEFAULTS."""
+        config = LumpyConfig({}, str(tmp_path))
+        assert config.get("outputfolder", "elsewhere") == "elsewhere"
+        assert config.get("changelog") is False
+
+    def test_output_formats(self, repo):
+        """Output formats come from the config file unless given on the CLI."""
+        assert LumpyConfig({}, str(repo)).output_formats == ["devlog", "docx"]
+        assert LumpyConfig({"output_format": "obsidian"}, str(repo)).output_formats == ["obsidian"]
+
+    def test_raw_output_aliases(self, tmp_path):
+        """raw_test_output and raw_output are both honoured."""
+        assert LumpyConfig({"raw_output": True}, str(tmp_path)).raw_output() is True
+        assert LumpyConfig({"raw_test_output": False, "raw_output": True}, str(tmp_path)).raw_output() is False
+        assert LumpyConfig({}, str(tmp_path)).raw_output() is False
+
+    def test_hcti_credentials_from_config(self, tmp_path, monkeypatch):
+        """Credentials are read from the config file when not in the environment."""
+        monkeypatch.delenv("HCTI_API_USER_ID", raising=False)
+        monkeypatch.delenv("HCTI_API_KEY", raising=False)
+        (tmp_path / ".lumpyconfig.yml").write_text(
+            "hcti_api_user_id: user\nhcti_api_key: key\n", encoding="utf-8"
+        )
+        creds = LumpyConfig({}, str(tmp_path)).hcti_credentials
+        assert creds == {"user_id": "user", "api_key": "key", "source": "config file"}
+
+    def test_values_resolved_once(self, repo, monkeypatch):
+        """Each value is resolved once per config object."""
+        config = LumpyConfig({}, str(repo))
+        calls = []
+        original = config._resolve
+        monkeypatch.setattr(config, "_resolve", lambda *a: calls.append(a) or original(*a))
+        for _ in range(3):
+            config.get("outputfolder", "devlog")
+        assert len(calls) == 1
+
+    def test_module_helper_matches(self, repo):
+        """get_config_value gives the same answer as LumpyConfig.get."""
+        args = {"verbose": None}
+        assert get_config_value("verbose", args, str(repo), False) == LumpyConfig(args, str(repo)).get("verbose", False)
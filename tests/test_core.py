@@ -0,0 +1,349 @@
+"""Tests for lumpy_log.core commit processing."""
+
+import json
+import os
+import subprocess
+from pathlib import Path
+import sys
+import pytest
+from lumpy_log import OUTPUT_CHANGELOGS_DIR
+from lumpy_log.core import main as core_main
+
+
+def _git(repo, *args, date=None):
+    env = dict(os.environ)
+    env.update({
+        "GIT_AUTHOR_NAME": "Tester",
+        "GIT_AUTHOR_EMAIL": "tester@example.com",
+        "GIT_COMMITTER_NAME": "Tester",
+        "GIT_COMMITTER_EMAIL": "tester@example.com",
+    })
+    if date:
+        env["GIT_AUTHOR_DATE"] = date
+        env["GIT_COMMITTER_DATE"] = date
+    subprocess.run(["git", *args], cwd=repo, env=env, check=True, capture_output=True)
+
+
+@pytest.fixture
+def sample_repo(tmp_path):
+    """A small git repository with a handful of commits touching Python code."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+
+    source = repo / "app.py"
+    body = ["# Helpers", "def greet(name):", "    return 'Hello ' + name", ""]
+    for n in range(6):
+        body += [f"# Function {n}", f"def func_{n}(x):", f"    return x + {n}", ""]
+        source.write_text("\n".join(body), encoding="utf-8")
+        (repo / f"notes_{n}.txt").write_text(f"note {n}\n", encoding="utf-8")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-q", "-m", f"Commit {n}", date=f"2024-01-0{n + 1}T12:00:00")
+    return repo
+
+
+@pytest.fixture
+def multi_method_repo(sample_repo):
+    """sample_repo plus a commit that changes several methods at once."""
+    source = sample_repo / "app.py"
+    text = source.read_text(encoding="utf-8")
+    for n in (0, 2, 3, 5):
+        text = text.replace(f"    return x + {n}\n", f"    return x * {n}\n")
+    source.write_text(text, encoding="utf-8")
+    _git(sample_repo, "add", "-A")
+    _git(sample_repo, "commit", "-q", "-m", "Change several functions", date="2024-01-08T12:00:00")
+    return sample_repo
+
+
+@pytest.fixture
+def render_calls(monkeypatch):
+    """Record the hash of every commit rendered by the serial path."""
+    from lumpy_log import core
+
+    rendered = []
+    original = core._render_commit
+
+    def counting_render(commit, *args, **kwargs):
+        rendered.append(commit.hash)
+        return original(commit, *args, **kwargs)
+
+    monkeypatch.setattr(core, "_render_commit", counting_render)
+    return rendered
+
+
+def _run(repo, outputfolder, **overrides):
+    args = {
+        "command": "changes",
+        "repo": str(repo),
+        "outputfolder": str(outputfolder),
+        "from_commit": None,
+        "to_commit": None,
+        "verbose": None,
+        "force": False,
+        "dryrun": False,
+        "devlog": None,
+        "limit": None,
+        "jobs": None,
+    }
+    args.update(overrides)
+    return core_main(args)
+
+
+def _run_in_process(repo, outputfolder, hash_seed, **overrides):
+    """Run changes in a fresh interpreter with its own hash seed."""
+    args = {
+        "command": "changes", "repo": str(repo), "outputfolder": str(outputfolder),
+        "from_commit": None, "to_commit": None, "verbose": None, "force": False,
+        "dryrun": False, "devlog": None, "limit": None, "jobs": None,
+    }
+    args.update(overrides)
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(Path(__file__).resolve().parents[1]), env.get("PYTHONPATH")]))
+    subprocess.run(
+        [sys.executable, "-c", f"from lumpy_log.core import main; main({args!r})"],
+        cwd=repo, env=env, check=True, capture_output=True,
+    )
+
+
+def _read_changelogs(outputfolder):
+    changelogs = Path(outputfolder) / OUTPUT_CHANGELOGS_DIR
+    return {p.name: p.read_bytes() for p in sorted(changelogs.glob("*.md"))}
+
+
+class TestChangesMain:
+    """Tests for the changes command entry point."""
+
+    def test_writes_one_file_per_commit(self, sample_repo, tmp_path):
+        """Should write a change log for every commit."""
+        _run(sample_repo, tmp_path / "out")
+        assert len(_read_changelogs(tmp_path / "out")) == 6
+
+    def test_parallel_output_matches_serial(self, sample_repo, tmp_path):
+        """--jobs should produce byte-identical change logs to the serial path."""
+        _run(sample_repo, tmp_path / "serial")
+        _run(sample_repo, tmp_path / "parallel", jobs=3)
+
+        serial = _read_changelogs(tmp_path / "serial")
+        parallel = _read_changelogs(tmp_path / "parallel")
+        assert serial
+        assert serial == parallel
+
+    def test_output_is_stable_across_processes(self, multi_method_repo, tmp_path):
+        """Commits changing several methods should render identically in any process, serial or parallel."""
+        _run_in_process(multi_method_repo, tmp_path / "serial_a", hash_seed=1)
+        _run_in_process(multi_method_repo, tmp_path / "serial_b", hash_seed=2)
+        _run_in_process(multi_method_repo, tmp_path / "parallel", hash_seed=3, jobs=3)
+
+        serial = _read_changelogs(tmp_path / "serial_a")
+        assert len(serial) == 7
+        assert serial == _read_changelogs(tmp_path / "serial_b")
+        assert serial == _read_changelogs(tmp_path / "parallel")
+        multi = next(content for name, content in sorted(serial.items()) if name.startswith("20240108"))
+        positions = [multi.index(f"def func_{n}".encode()) for n in (0, 2, 3, 5)]
+        assert positions == sorted(positions)
+
+    def test_parallel_dryrun_writes_nothing(self, sample_repo, tmp_path):
+        """--jobs with --dryrun should not create any files."""
+        _run(sample_repo, tmp_path / "dry", jobs=2, dryrun=True)
+        assert not (tmp_path / "dry").exists()
+
+    def test_existing_change_logs_are_not_rerendered(self, sample_repo, tmp_path, render_calls):
+        """A second run should only render commits without a change log."""
+        _run(sample_repo, tmp_path / "out")
+        first = sorted((tmp_path / "out" / OUTPUT_CHANGELOGS_DIR).glob("*.md"))
+        first[-1].unlink()
+        render_calls.clear()
+
+        _run(sample_repo, tmp_path / "out")
+
+        assert len(render_calls) == 1
+        assert render_calls[0][:7] in first[-1].name
+        assert len(_read_changelogs(tmp_path / "out")) == 6
+
+    def test_force_rerenders_existing_change_logs(self, sample_repo, tmp_path, render_calls):
+        """--force should ignore the existing change logs."""
+        _run(sample_repo, tmp_path / "out")
+        render_calls.clear()
+
+        _run(sample_repo, tmp_path / "out", force=True)
+
+        assert len(render_calls) == 6
+
+
+class TestMainBranchCommits:
+    """Tests for the main branch reachability set."""
+
+    def test_contains_every_commit_on_branch(self, sample_repo):
+        """Should list all commits reachable from the branch."""
+        from lumpy_log.core import _main_branch_commits
+        hashes = subprocess.run(
+            ["git", "log", "--format=%H"], cwd=sample_repo, capture_output=True, text=True, check=True
+        ).stdout.split()
+        assert _main_branch_commits(str(sample_repo), "main") == set(hashes)
+
+    def test_excludes_other_branches(self, sample_repo):
+        """Commits only on another branch should not be in the set."""
+        from lumpy_log.core import _main_branch_commits
+        _git(sample_repo, "checkout", "-q", "-b", "feature")
+        (sample_repo / "feature.txt").write_text("feature\n", encoding="utf-8")
+        _git(sample_repo, "add", "-A")
+        _git(sample_repo, "commit", "-q", "-m", "Feature work")
+        feature_head = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=sample_repo, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+        assert feature_head not in _main_branch_commits(str(sample_repo), "main")
+        assert feature_head in _main_branch_commits(str(sample_repo), "feature")
+
+    def test_unknown_branch_returns_none(self, sample_repo):
+        """Should return None when git can't resolve the branch."""
+        from lumpy_log.core import _main_branch_commits
+        assert _main_branch_commits(str(sample_repo), "no-such-branch") is None
+
+    def test_changes_does_not_query_branches_per_commit(self, sample_repo, tmp_path, monkeypatch):
+        """The changes run should not touch pydriller's in_main_branch."""
+        from pydriller.domain.commit import Commit
+
+        def fail(self):
+            raise AssertionError("in_main_branch should not be called")
+
+        monkeypatch.setattr(Commit, "in_main_branch", property(fail))
+        _run(sample_repo, tmp_path / "out")
+        assert len(_read_changelogs(tmp_path / "out")) == 6
+
+
+class TestRunState:
+    """Tests for the persistent run state used by incremental runs."""
+
+    @pytest.fixture
+    def repository_calls(self, monkeypatch):
+        """Record the keyword arguments passed to pydriller's Repository."""
+        from lumpy_log import core
+
+        calls = []
+        original = core.Repository
+
+        def recording_repository(path, **kwargs):
+            calls.append(kwargs)
+            return original(path, **kwargs)
+
+        monkeypatch.setattr(core, "Repository", recording_repository)
+        return calls
+
+    @pytest.fixture
+    def loaded_commits(self, monkeypatch):
+        """Record the hash of every commit pydriller loads."""
+        from pydriller.domain.commit import Commit
+
+        loaded = []
+        original = Commit.__init__
+
+        def recording_init(self, commit, conf):
+            loaded.append(commit.hexsha)
+            original(self, commit, conf)
+
+        monkeypatch.setattr(Commit, "__init__", recording_init)
+        return loaded
+
+    def _head(self, repo):
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=repo, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    def test_state_records_last_commit(self, sample_repo, tmp_path):
+        """Should record the newest processed commit in the output folder."""
+        from lumpy_log.core import RUN_STATE_FILE
+
+        _run(sample_repo, tmp_path / "out")
+        state = json.loads((tmp_path / "out" / RUN_STATE_FILE).read_text(encoding="utf-8"))
+
+        assert state["last_commit"] == self._head(sample_repo)
+        assert state["fingerprint"]
+
+    def test_next_run_resumes_from_last_commit(self, sample_repo, tmp_path, render_calls, loaded_commits):
+        """Should only load and render history added since the last run."""
+        _run(sample_repo, tmp_path / "out")
+        previous_head = self._head(sample_repo)
+        (sample_repo / "extra.py").write_text("def extra():\n    return 1\n", encoding="utf-8")
+        _git(sample_repo, "add", "-A")
+        _git(sample_repo, "commit", "-q", "-m", "Extra", date="2024-01-09T12:00:00")
+        render_calls.clear()
+        loaded_commits.clear()
+
+        _run(sample_repo, tmp_path / "out")
+
+        assert loaded_commits == [previous_head, self._head(sample_repo)]
+        assert render_calls == [self._head(sample_repo)]
+
+    def test_resume_includes_commits_merged_from_older_branches(self, sample_repo, tmp_path, render_calls):
+        """Commits on a branch forked before the last run should still get change logs once merged."""
+        _git(sample_repo, "checkout", "-q", "-b", "feature", "HEAD~2")
+        (sample_repo / "feature.py").write_text("def feature():\n    return 1\n", encoding="utf-8")
+        _git(sample_repo, "add", "-A")
+        _git(sample_repo, "commit", "-q", "-m", "featX", date="2024-01-08T12:00:00")
+        feature_commit = self._head(sample_repo)
+        _git(sample_repo, "checkout", "-q", "main")
+        _run(sample_repo, tmp_path / "out")
+        assert feature_commit not in render_calls
+        render_calls.clear()
+
+        _git(sample_repo, "merge", "-q", "--no-ff", "-m", "Merge feature", "feature", date="2024-01-09T12:00:00")
+        _run(sample_repo, tmp_path / "out")
+
+        assert sorted(render_calls) == sorted([feature_commit, self._head(sample_repo)])
+        assert any(name.endswith(f"_{feature_commit[:7]}.md") for name in _read_changelogs(tmp_path / "out"))
+
+    def test_fingerprint_change_regenerates_everything(self, sample_repo, tmp_path, render_calls, repository_calls):
+        """Changing .lumpyignore should trigger a full regeneration."""
+        _run(sample_repo, tmp_path / "out")
+        (sample_repo / ".lumpyignore").write_text("*.txt\n", encoding="utf-8")
+        render_calls.clear()
+        repository_calls.clear()
+
+        _run(sample_repo, tmp_path / "out")
+
+        assert "from_commit" not in repository_calls[0]
+        assert len(render_calls) == 6
+        for content in _read_changelogs(tmp_path / "out").values():
+            assert b"notes_" not in content
+
+    def test_lump_format_change_changes_fingerprint(self, sample_repo, monkeypatch):
+        """Changing lump detection output should invalidate existing change logs."""
+        from lumpy_log import core
+
+        before = core._run_fingerprint(str(sample_repo))
+        monkeypatch.setattr(core, "LUMP_FORMAT", core.LUMP_FORMAT + 1)
+
+        assert core._run_fingerprint(str(sample_repo)) != before
+
+    def test_unknown_last_commit_walks_full_history(self, sample_repo, tmp_path, repository_calls):
+        """A last commit that no longer exists (e.g. after a rebase) is ignored."""
+        from lumpy_log.core import RUN_STATE_FILE
+
+        _run(sample_repo, tmp_path / "out")
+        state_path = tmp_path / "out" / RUN_STATE_FILE
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        state["last_commit"] = "0" * 40
+        state_path.write_text(json.dumps(state), encoding="utf-8")
+        repository_calls.clear()
+
+        _run(sample_repo, tmp_path / "out")
+
+        assert "from_commit" not in repository_calls[0]
+
+
+class TestExistingCommitHashes:
+    """Tests for _existing_commit_hashes."""
+
+    def test_missing_directory(self, tmp_path):
+        """Should return an empty set when change_logs/ does not exist."""
+        from lumpy_log.core import _existing_commit_hashes
+        assert _existing_commit_hashes(str(tmp_path / "nope")) == set()
+
+    def test_reads_hash_suffix(self, tmp_path):
+        """Should collect the hash suffix of each change log filename."""
+        from lumpy_log.core import _existing_commit_hashes
+        (tmp_path / "20240101_1200_abc1234.md").write_text("x", encoding="utf-8")
+        (tmp_path / "20240102_0900_def5678.md").write_text("x", encoding="utf-8")
+        (tmp_path / "notes.txt").write_text("x", encoding="utf-8")
+        assert _existing_commit_hashes(str(tmp_path)) == {"abc1234", "def5678"}
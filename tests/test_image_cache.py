@@ -0,0 +1,169 @@
+"""Tests for lumpy_log.image_cache module."""
+
+import json
+import pytest
+from lumpy_log.config import LumpyConfig
+from lumpy_log.image_cache import ImageCache, IMAGES_SUBDIR, INDEX_FILE
+from lumpy_log.cli import cache_main
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ImageCache(str(tmp_path / "cache"), max_bytes=100)
+
+
+class TestImageCache:
+    """Tests for ImageCache storage and lookup."""
+
+    def test_miss_then_hit(self, cache):
+        """Should return None before a put and the stored file after."""
+        key = ImageCache.key("hcti", "python", "print(1)")
+        assert cache.get(key) is None
+
+        path = cache.put(key, b"png")
+
+        assert cache.get(key) == path
+        assert path.read_bytes() == b"png"
+
+    def test_key_matches_previous_layout(self):
+        """Should keep the renderer:language:code addressing of older caches."""
+        import hashlib
+        expected = hashlib.sha256(b"hcti:python:x = 1").hexdigest()
+        assert ImageCache.key("hcti", "python", "x = 1") == expected
+
+    def test_lookup_does_not_create_directory(self, cache):
+        """Should not touch the filesystem on a miss."""
+        cache.get("missing")
+        cache.flush()
+
+        assert not cache.root.exists()
+
+    def test_put_leaves_no_temp_files(self, cache):
+        """Should write images atomically via a temp file."""
+        cache.put("a", b"x" * 10)
+        cache.flush()
+
+        assert sorted(p.name for p in cache.directory.iterdir()) == ["a.png", INDEX_FILE]
+
+    def test_evicts_least_recently_used(self, cache):
+        """Should evict the entry used longest ago when over the cap."""
+        cache.put("a", b"x" * 40)
+        cache.put("b", b"x" * 40)
+        cache.get("a")
+
+        cache.put("c", b"x" * 40)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def test_index_persists_access_order(self, tmp_path, cache):
+        """Should keep LRU order across instances once flushed."""
+        cache.put("a", b"x" * 40)
+        cache.put("b", b"x" * 40)
+        cache.get("a")
+        cache.flush()
+
+        reopened = ImageCache(str(tmp_path / "cache"), max_bytes=100)
+        reopened.put("c", b"x" * 40)
+
+        assert not (reopened.directory / "b.png").exists()
+        assert (reopened.directory / "a.png").exists()
+
+    def test_reconciles_index_with_files(self, cache):
+        """Should drop index entries whose files are gone and adopt unindexed files."""
+        cache.put("a", b"x" * 10)
+        cache.flush()
+        (cache.directory / "a.png").unlink()
+        (cache.directory / "b.png").write_bytes(b"x" * 20)
+
+        stats = ImageCache(str(cache.root), max_bytes=100).stats()
+
+        assert stats["entries"] == 1
+        assert stats["bytes"] == 20
+
+    def test_tracks_total_size(self, cache):
+        """Should keep the byte total in step with puts, overwrites, evictions and stale entries."""
+        cache.put("a", b"x" * 30)
+        cache.put("a", b"x" * 20)
+        cache.put("b", b"x" * 40)
+        cache.put("c", b"x" * 50)
+        assert cache.stats()["bytes"] == 90
+
+        (cache.directory / "b.png").unlink()
+        assert cache.get("b") is None
+
+        assert cache.stats()["bytes"] == 50
+        assert cache.prune(0) == (1, 50)
+        assert cache.stats()["bytes"] == 0
+
+    def test_prune(self, cache):
+        """Should evict down to the requested size."""
+        cache.put("a", b"x" * 40)
+        cache.put("b", b"x" * 40)
+
+        assert cache.prune(50) == (1, 40)
+        assert cache.prune(0) == (1, 40)
+        assert cache.stats()["entries"] == 0
+        assert json.loads((cache.directory / INDEX_FILE).read_text())["entries"] == {}
+
+
+class TestImageCacheLocation:
+    """Tests for resolving the cache location from config."""
+
+    def test_defaults_to_repo_cache(self, tmp_path, monkeypatch):
+        """Should use .lumpy_cache under the repo by default."""
+        monkeypatch.delenv("LUMPY_CACHE_DIR", raising=False)
+
+        cache = ImageCache.from_config(LumpyConfig({}, str(tmp_path)))
+
+        assert cache.directory == tmp_path / ".lumpy_cache" / IMAGES_SUBDIR
+        assert cache.max_bytes == 256 * 1024 * 1024
+
+    def test_config_file(self, tmp_path, monkeypatch):
+        """Should use cache_dir and cache_max_mb from .lumpyconfig.yml."""
+        monkeypatch.delenv("LUMPY_CACHE_DIR", raising=False)
+        (tmp_path / ".lumpyconfig.yml").write_text("cache_dir: build/images\ncache_max_mb: 1\n")
+
+        cache = ImageCache.from_config(LumpyConfig({}, str(tmp_path)))
+
+        assert cache.directory == tmp_path / "build" / "images" / IMAGES_SUBDIR
+        assert cache.max_bytes == 1024 * 1024
+
+    @pytest.mark.parametrize("setting", ["cache_max_mb:\n", "cache_max_mb: null\n"])
+    def test_empty_max_mb_uses_default(self, tmp_path, monkeypatch, setting):
+        """Should fall back to the default cap when cache_max_mb is empty or null."""
+        monkeypatch.delenv("LUMPY_CACHE_DIR", raising=False)
+        (tmp_path / ".lumpyconfig.yml").write_text(setting)
+
+        cache = ImageCache.from_config(LumpyConfig({}, str(tmp_path)))
+
+        assert cache.max_bytes == 256 * 1024 * 1024
+
+    def test_environment_overrides_config(self, tmp_path, monkeypatch):
+        """Should prefer LUMPY_CACHE_DIR over the config file."""
+        (tmp_path / ".lumpyconfig.yml").write_text("cache_dir: build/images\n")
+        monkeypatch.setenv("LUMPY_CACHE_DIR", str(tmp_path / "user_cache"))
+
+        cache = ImageCache.from_config(LumpyConfig({}, str(tmp_path)))
+
+        assert cache.directory == tmp_path / "user_cache" / IMAGES_SUBDIR
+
+
+class TestCacheCommand:
+    """Tests for the cache CLI command."""
+
+    def test_stats_and_prune(self, tmp_path, monkeypatch, capsys):
+        """Should report cache contents and prune on request."""
+        monkeypatch.setenv("LUMPY_CACHE_DIR", str(tmp_path))
+        cache = ImageCache(str(tmp_path))
+        cache.put("a", b"x" * 2048)
+        cache.flush()
+
+        assert cache_main({"action": "stats"}) == 0
+        assert "Images: 1" in capsys.readouterr().out
+
+        assert cache_main({"action": "prune", "max_mb": 0}) == 0
+        out = capsys.readouterr().out
+        assert "Pruned 1 image(s), freed 2.0 KB" in out
+        assert "Images: 0" in out
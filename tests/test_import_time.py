@@ -0,0 +1,57 @@
+"""Import-time guard for the CLI.
+
+Runs imports in a fresh interpreter with ``-X importtime`` and checks that
+heavy dependencies are only pulled in by the subcommands that need them.
+"""
+
+import functools
+import subprocess
+import sys
+import pytest
+
+# Only needed by `lumpy-log changes`
+CHANGES_ONLY = ["pydriller", "git", "pathspec"]
+# Only needed when a subcommand renders templates, formats markdown or exports docx
+DEFERRED = ["jinja2", "mdformat", "yaml", "docx"]
+
+
+@functools.lru_cache(maxsize=None)
+def _import_profile(statement):
+    """Return (imported top-level modules, cumulative microseconds) for statement."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    top_level = {name.split(".")[0] for name in modules}
+    return top_level, modules.get(statement.split()[-1], 0)
+
+
+@pytest.mark.parametrize("module", CHANGES_ONLY + DEFERRED)
+def test_cli_import_is_light(module):
+    """Importing the CLI entry point should not import heavy dependencies."""
+    imported, total_us = _import_profile("import lumpy_log.cli")
+    print(f"lumpy_log.cli imported in {total_us / 1000:.1f} ms")
+    assert module not in imported
+
+
+@pytest.mark.parametrize("module", CHANGES_ONLY + ["docx"])
+def test_test_command_skips_git_dependencies(module):
+    """`lumpy-log test` should not import git or docx dependencies."""
+    imported, total_us = _import_profile("import lumpy_log.test_processor")
+    print(f"lumpy_log.test_processor imported in {total_us / 1000:.1f} ms")
+    assert module not in imported
+
+
+def test_changes_still_imports_pydriller():
+    """Sanity check: the changes command module does load pydriller."""
+    imported, _ = _import_profile("import lumpy_log.core")
+    assert "pydriller" in imported
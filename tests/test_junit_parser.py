@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+"""Tests for JUnit XML parser module."""
+
+import io
+import tracemalloc
+from lumpy_log.junit_parser import JUnitParser
+from lumpy_log.tap_parser import (
+    MAX_DIAGNOSTIC_LINES,
+    MAX_DIAGNOSTIC_LINE_LENGTH,
+    parse_test_output,
+    parse_test_stream,
+)
+
+
+JUNIT_OUTPUT = """<?xml version="1.0" encoding="UTF-8"?>
+<testsuites>
+  <testsuite name="suite" tests="4">
+    <testcase classname="com.example.FooTest" name="passes" time="0.1"/>
+    <testcase classname="com.example.FooTest" name="fails">
+      <failure type="AssertionError" message="expected 1 but was 2">java.lang.AssertionError: expected 1 but was 2
+    at com.example.FooTest.fails(FooTest.java:12)</failure>
+    </testcase>
+    <testcase classname="com.example.FooTest" name="skipped"><skipped/></testcase>
+    <testcase name="errors"><error message="boom"/></testcase>
+    <system-out>ok 1 - not TAP</system-out>
+  </testsuite>
+</testsuites>
+"""
+
+
+class TestJUnitParserIsJUnitFormat:
+    """Tests for is_junit_format detection"""
+    
+    def test_detects_testsuites(self):
+        """Should detect a <testsuites> root after the XML declaration"""
+        assert JUnitParser.is_junit_format(JUNIT_OUTPUT) is True
+    
+    def test_detects_single_testsuite_with_comment(self):
+        """Should detect a <testsuite> root preceded by a comment"""
+        assert JUnitParser.is_junit_format("<!-- generated -->\n<testsuite name='x'>") is True
+    
+    def test_rejects_other_xml_and_tap(self):
+        """Should reject other XML documents and TAP"""
+        assert JUnitParser.is_junit_format("<?xml version='1.0'?><project/>") is False
+        assert JUnitParser.is_junit_format("1..1\nok 1") is False
+
+
+class TestJUnitParserParse:
+    """Tests for parse and incremental feeding"""
+    
+    def test_counts_outcomes(self):
+        """Should count passed, failed (failure or error) and skipped test cases"""
+        result = JUnitParser.parse(JUNIT_OUTPUT)
+        
+        assert result.tests_run == 4
+        assert result.tests_passed == 1
+        assert result.tests_failed == 2
+        assert result.tests_skipped == 1
+    
+    def test_records_failures(self):
+        """Should keep name, message and failure text for failed test cases"""
+        first, second = JUnitParser.parse(JUNIT_OUTPUT).failed_tests
+        
+        assert first['number'] == '2'
+        assert first['description'] == 'com.example.FooTest.fails'
+        assert first['line'] == 'failure (AssertionError): expected 1 but was 2'
+        assert first['message'] == 'expected 1 but was 2'
+        assert 'FooTest.java:12' in first['diagnostics']
+        assert second['description'] == 'errors'
+        assert second['line'] == 'error: boom'
+        assert 'diagnostics' not in second
+    
+    def test_feeding_in_pieces(self):
+        """Should give the same result however the input is split"""
+        parser = JUnitParser()
+        for i in range(0, len(JUNIT_OUTPUT), 7):
+            parser.feed_line(JUNIT_OUTPUT[i:i + 7])
+        
+        assert parser.finish() == JUnitParser.parse(JUNIT_OUTPUT)
+    
+    def test_failure_text_is_bounded(self):
+        """Should keep at most MAX_DIAGNOSTIC_LINES lines of failure text"""
+        trace = "\n".join("at frame{}".format(i) for i in range(MAX_DIAGNOSTIC_LINES * 3))
+        output = '<testsuite><testcase name="t"><failure>{}</failure></testcase></testsuite>'.format(trace)
+        
+        diagnostics = JUnitParser.parse(output).failed_tests[0]['diagnostics']
+        
+        assert diagnostics.count("at frame") == MAX_DIAGNOSTIC_LINES
+        assert diagnostics.endswith("... (truncated)")
+    
+    def test_message_is_bounded(self):
+        """Should cap the failure message attribute like the failure text"""
+        message = "x" * (MAX_DIAGNOSTIC_LINE_LENGTH * 5)
+        output = '<testsuite><testcase name="t"><failure message="{}"/></testcase></testsuite>'.format(message)
+        
+        failed = JUnitParser.parse(output).failed_tests[0]
+        
+        assert failed['message'] == "x" * MAX_DIAGNOSTIC_LINE_LENGTH + "\n... (truncated)"
+    
+    def test_truncated_xml(self):
+        """Should keep counts so far and report malformed input"""
+        result = JUnitParser.parse('<testsuite><testcase name="a"/><testcase name="b">')
+        
+        assert result.tests_run == 1
+        assert result.failed_tests[-1]['number'] == 'ERROR'
+
+
+class TestJUnitDetection:
+    """Tests for JUnit auto-detection in parse_test_output and parse_test_stream"""
+    
+    def test_parse_test_output(self):
+        """Should report JUnit XML with the same fields as TAP"""
+        result = parse_test_output(JUNIT_OUTPUT)
+        
+        assert result['format'] == 'junit'
+        assert result['tests_failed'] == 2
+        assert result['summary'] == '4 tests run'
+    
+    def test_parse_test_stream_matches(self):
+        """Should give the same dictionary when streaming"""
+        assert parse_test_stream(io.StringIO(JUNIT_OUTPUT)) == parse_test_output(JUNIT_OUTPUT)
+
+    def test_single_line_report_streams_in_chunks(self):
+        """Should not hold a single-line report in memory"""
+        cases = '<testcase classname="Suite" name="case"/>' * 200000
+        output = '<?xml version="1.0"?><testsuites><testsuite>' + cases + '</testsuite></testsuites>'
+        stream = io.StringIO(output)
+        
+        tracemalloc.start()
+        try:
+            result = parse_test_stream(stream)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        
+        assert result['tests_passed'] == 200000
+        assert peak < len(output) // 4
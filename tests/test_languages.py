@@ -0,0 +1,99 @@
+"""Tests for lumpy_log.languages lookups."""
+
+import os
+import pytest
+from lumpy_log.languages import Languages
+
+
+@pytest.fixture
+def languages():
+    """Load the languages configuration"""
+    lang_path = os.path.join(os.path.dirname(__file__), "..", "lumpy_log", "languages.yml")
+    return Languages(lang_path)
+
+
+class TestLanguagesLookup:
+    """Test the extension index and Language cache"""
+
+    def _linear_lookup(self, languages, ext):
+        table = languages.LANGUAGES
+        for Lang in table:
+            if table[Lang].get('primary_extension') == ext:
+                return Lang
+        for Lang in table:
+            if ext in (table[Lang].get('extensions') or []):
+                return Lang
+        return None
+
+    def test_index_matches_linear_scan(self, languages):
+        """Every known extension resolves to the same language as a full scan"""
+        extensions = set()
+        for oLang in languages.LANGUAGES.values():
+            extensions.add(oLang.get('primary_extension'))
+            extensions.update(oLang.get('extensions') or [])
+        extensions.discard(None)
+        for ext in extensions:
+            assert languages._getByExtension(ext) == self._linear_lookup(languages, ext), ext
+
+    def test_lookups_return_cached_objects(self, languages):
+        """Repeated lookups return the same resolved Language"""
+        assert languages.getByExtension(".py") is languages.getByExtension(".py")
+        assert languages.getLanguage("Python") is languages.getByExtension(".py")
+
+    def test_unknown_extension_is_cached(self, languages):
+        """Unknown extensions get a cached data Language"""
+        lang = languages.getByExtension(".nosuchext")
+        assert lang.name == "nosuchext"
+        assert lang is languages.getByExtension(".nosuchext")
+
+    def test_comment_family_resolved(self, languages):
+        """Languages that borrow comment rules still resolve them"""
+        actionscript = languages.getLanguage("ActionScript")
+        assert actionscript.comment_lang is languages.getLanguage("C")
+        assert actionscript.comment_structure == languages.getLanguage("C").comment_structure
+
+
+class TestCommentPatterns:
+    """Test the precompiled comment patterns on Language"""
+
+    def test_patterns_are_compiled(self, languages):
+        """Comment markers are exposed as compiled patterns"""
+        patterns = languages.getLanguage("C").comment_patterns
+        assert patterns["single"].search("// note")
+        assert patterns["begin"].search("/* start")
+        assert patterns["end"].search("end */")
+        assert patterns["symmetric"] is False
+
+    def test_python_delimiters_are_symmetric(self, languages):
+        """Python's triple quotes open and close with the same delimiter"""
+        assert languages.getLanguage("Python").comment_patterns["symmetric"] is True
+
+    def test_patterns_are_built_once(self, languages):
+        """The same pattern objects are returned on every access"""
+        lang = languages.getLanguage("C")
+        assert lang.comment_patterns is lang.comment_patterns
+
+    def test_no_comment_structure(self, languages):
+        """Data files without comment rules have no patterns"""
+        patterns = languages.getByExtension(".nosuchext").comment_patterns
+        assert patterns["single"] is None
+        assert patterns["begin"] is None
+
+    def test_lump_detection_does_not_recompile(self, languages, monkeypatch):
+        """Comment detection in lumps uses the precompiled patterns"""
+        import re
+        from lumpy_log.changelump import ChangeLump
+
+        lang = languages.getLanguage("C")
+        lang.comment_patterns
+        code = ["/*", " * doc", " */", "int f(void) {", "}"]
+
+        def no_compile(*args, **kwargs):
+            raise AssertionError("pattern recompiled")
+
+        monkeypatch.setattr(re, "compile", no_compile)
+        monkeypatch.setattr(re, "search", no_compile)
+        monkeypatch.setattr(re, "findall", no_compile)
+        lump = ChangeLump(lang, code, func={"start_line": 4, "end_line": 5, "name": "f"})
+        lump.extendOverComments()
+        assert lump.commentStart == 1
@@ -1,5 +1,5 @@
 import pytest
-from lumpy_log.list1 import list1
+from lumpy_log.list1 import list1, list1view
 
 
 class TestList1Basic:
@@ -325,3 +325,59 @@ class TestList1EdgeCases:
         assert "10" in repr_str
         assert "20" in repr_str
         assert "30" in repr_str
+
+
+class TestList1View:
+    """Test the read-only, zero-copy list1view."""
+
+    def test_shares_underlying_data(self):
+        """The view should reference the original list, not copy it."""
+        data = ["a", "b", "c"]
+        view = list1view(data)
+        assert view.data is data
+
+    def test_view_of_list1_shares_data(self):
+        """Wrapping a list1 or another view should reuse its data."""
+        l = list1(["a", "b"])
+        assert list1view(l).data is l.data
+        view = list1view(["a"])
+        assert list1view(view).data is view.data
+
+    def test_getitem_is_1_indexed(self):
+        """Test 1-indexed access like list1."""
+        view = list1view([10, 20, 30])
+        assert view[1] == 10
+        assert view[3] == 30
+        assert view[-1] == 30
+
+    def test_getitem_zero_index(self):
+        """Index 0 should raise IndexError like list1."""
+        with pytest.raises(IndexError):
+            list1view([10, 20])[0]
+
+    def test_getitem_slice(self):
+        """Slicing should match list1 slicing and return a view."""
+        data = [10, 20, 30, 40, 50]
+        view = list1view(data)
+        assert isinstance(view[2:4], list1view)
+        assert view[2:4] == list1(data)[2:4]
+        assert list(view[2:4]) == [20, 30]
+
+    def test_is_read_only(self):
+        """The view should not support item assignment or deletion."""
+        view = list1view([10, 20])
+        with pytest.raises(TypeError):
+            view[1] = 5
+        with pytest.raises(TypeError):
+            del view[1]
+
+    def test_len_iter_contains(self):
+        """Test len, iteration and membership."""
+        view = list1view([10, 20, 30])
+        assert len(view) == 3
+        assert list(view) == [10, 20, 30]
+        assert 20 in view
+
+    def test_index(self):
+        """index should return a 1-indexed position."""
+        assert list1view([10, 20, 30]).index(20) == 2
@@ -1,13 +1,102 @@
 """Tests for the custom markdown to DOCX converter."""
 
+import json
+import struct
+import sys
 import tempfile
+import threading
+import time
+import types
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 import pytest
+from docx import Document
+from docx.shared import RGBColor
 from lumpy_log.md_to_docx import (
     markdown_to_docx,
     markdown_file_to_docx,
     _parse_inline_formatting,
+    _PlaywrightRenderer,
+    _add_highlighted_code_block,
+    _parse_style,
+    _sanitize_xml_string,
 )
+import lumpy_log.md_to_docx as md_to_docx_module
+from lumpy_log.md_tokenizer import split_blocks
+
+
+def _png_bytes():
+    """A valid 1x1 white PNG."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(b"\x00\xff\xff\xff")) + chunk(b"IEND", b"")
+
+
+class _FakePage:
+    def __init__(self, log):
+        self.log = log
+
+    def set_content(self, html, wait_until=None):
+        self.log.append("render")
+
+    def evaluate(self, script):
+        return {"width": 700, "height": 80}
+
+    def set_viewport_size(self, size):
+        pass
+
+    def wait_for_load_state(self, state):
+        pass
+
+    def screenshot(self, full_page=False):
+        return _png_bytes()
+
+    def close(self):
+        self.log.append("page closed")
+
+
+class _FakeBrowser:
+    def __init__(self, log):
+        self.log = log
+
+    def new_page(self, viewport=None):
+        self.log.append("new page")
+        return _FakePage(self.log)
+
+    def close(self):
+        self.log.append("browser closed")
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch, tmp_path):
+    """Install a stand-in playwright.sync_api that records browser activity."""
+    log = []
+
+    class BrowserType:
+        def launch(self, **kwargs):
+            log.append("launch")
+            return _FakeBrowser(log)
+
+    class Driver:
+        chromium = firefox = webkit = BrowserType()
+
+        def start(self):
+            return self
+
+        def stop(self):
+            log.append("stopped")
+
+    sync_api = types.ModuleType("playwright.sync_api")
+    sync_api.sync_playwright = Driver
+    monkeypatch.setitem(sys.modules, "playwright", types.ModuleType("playwright"))
+    monkeypatch.setitem(sys.modules, "playwright.sync_api", sync_api)
+    monkeypatch.delenv("HCTI_API_USER_ID", raising=False)
+    monkeypatch.delenv("HCTI_API_KEY", raising=False)
+    # Keep the image cache out of the working tree
+    monkeypatch.chdir(tmp_path)
+    return log
 
 
 class TestParseInlineFormatting:
@@ -261,3 +350,397 @@ class Feature:
             docx_file = md_file.with_suffix(".docx")
             assert docx_file.exists()
             assert docx_file.stat().st_size > 0
+
+
+class TestPlaywrightRenderer:
+    """Tests for the shared Playwright browser session."""
+
+    def test_one_browser_for_all_code_blocks(self, fake_playwright, tmp_path):
+        """Should launch the browser once and reuse one page for every block."""
+        markdown = "\n\n".join(f"```python\nprint({n})\n```" for n in range(3))
+        output = tmp_path / "out.docx"
+
+        assert markdown_to_docx(markdown, str(output), render_code_as_images=True)
+
+        assert fake_playwright.count("launch") == 1
+        assert fake_playwright.count("new page") == 1
+        assert fake_playwright.count("render") == 3
+        assert fake_playwright[-2:] == ["browser closed", "stopped"]
+        assert len(Document(str(output)).inline_shapes) == 3
+
+    def test_no_browser_without_code_blocks(self, fake_playwright, tmp_path):
+        """Should not launch a browser when nothing needs rendering."""
+        assert markdown_to_docx("# Title\n\ntext", str(tmp_path / "out.docx"), render_code_as_images=True)
+
+        assert fake_playwright == []
+
+    def test_missing_playwright_returns_none(self, monkeypatch):
+        """Should give up quietly when Playwright is not installed."""
+        monkeypatch.setitem(sys.modules, "playwright.sync_api", None)
+
+        with _PlaywrightRenderer() as renderer:
+            assert renderer.render("<pre>x</pre>") is None
+            assert renderer.render("<pre>y</pre>") is None
+
+
+@pytest.fixture
+def hcti_stub(monkeypatch, tmp_path):
+    """Serve a stand-in HCTI API on localhost that tracks concurrent requests."""
+    stats = {"posts": 0, "in_flight": 0, "max_in_flight": 0, "auth": set()}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            with lock:
+                stats["posts"] += 1
+                stats["in_flight"] += 1
+                stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+                stats["auth"].add(self.headers["Authorization"])
+            time.sleep(0.2)
+            with lock:
+                stats["in_flight"] -= 1
+            body = json.dumps({"url": f"http://127.0.0.1:{self.server.server_port}/image.png"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            body = _png_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.chdir(tmp_path)
+    stats["url"] = f"http://127.0.0.1:{server.server_port}/v1/image"
+    yield stats
+    server.shutdown()
+    server.server_close()
+
+
+class TestConcurrentCodeImages:
+    """Tests for pre-rendering code images against a stub HCTI API."""
+
+    def _convert(self, markdown, output, url, workers=4):
+        return markdown_to_docx(
+            markdown, str(output), render_code_as_images=True,
+            hcti_user_id="user", hcti_api_key="key", hcti_url=url, image_workers=workers,
+        )
+
+    def test_renders_blocks_concurrently(self, hcti_stub, tmp_path):
+        """Should keep several HCTI requests in flight, bounded by image_workers."""
+        markdown = "\n\n".join(f"```python\nprint({n})\n```" for n in range(6))
+        output = tmp_path / "out.docx"
+
+        assert self._convert(markdown, output, hcti_stub["url"], workers=3)
+
+        assert hcti_stub["posts"] == 6
+        assert 1 < hcti_stub["max_in_flight"] <= 3
+        assert len(hcti_stub["auth"]) == 1
+        assert len(Document(str(output)).inline_shapes) == 6
+
+    def test_duplicate_blocks_rendered_once(self, hcti_stub, tmp_path):
+        """Should render identical blocks once and insert each occurrence."""
+        markdown = "```python\nx = 1\n```\n\ntext\n\n```python\nx = 1\n```"
+        output = tmp_path / "out.docx"
+
+        assert self._convert(markdown, output, hcti_stub["url"])
+
+        assert hcti_stub["posts"] == 1
+        assert len(Document(str(output)).inline_shapes) == 2
+
+    def test_skips_cached_blocks(self, hcti_stub, tmp_path):
+        """Should not request images that are already cached."""
+        markdown = "```python\nx = 1\n```\n\n```python\ny = 2\n```"
+        assert self._convert(markdown, tmp_path / "first.docx", hcti_stub["url"])
+
+        assert self._convert(markdown, tmp_path / "second.docx", hcti_stub["url"])
+
+        assert hcti_stub["posts"] == 2
+        assert len(Document(str(tmp_path / "second.docx")).inline_shapes) == 2
+
+    def test_prerendered_images_go_straight_to_cache(self, hcti_stub, tmp_path):
+        """Should store each rendered image in the cache rather than return it."""
+        from lumpy_log.image_cache import ImageCache
+
+        cache = ImageCache(str(tmp_path / "cache"))
+        blocks = [(f"print({n})", "python") for n in range(3)]
+
+        unrendered = md_to_docx_module._prerender_code_images(
+            blocks, hcti_user_id="user", hcti_api_key="key", hcti_url=hcti_stub["url"], image_cache=cache,
+        )
+
+        assert unrendered == set()
+        assert cache.stats()["entries"] == 3
+
+
+@pytest.fixture
+def kroki_stub(monkeypatch, tmp_path):
+    """Serve a stand-in Kroki server on localhost that counts renders."""
+    stats = {"posts": 0, "paths": set()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            stats["posts"] += 1
+            stats["paths"].add(self.path)
+            body = _png_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("LUMPY_KROKI_URL", raising=False)
+    stats["url"] = f"http://127.0.0.1:{server.server_port}"
+    yield stats
+    server.shutdown()
+    server.server_close()
+
+
+class TestMermaidRendering:
+    """Tests for cached mermaid rendering through Kroki."""
+
+    MARKDOWN = "# Flow\n\n```mermaid\ngraph TD; A-->B\n```\n"
+
+    def test_renders_through_configured_server(self, kroki_stub, tmp_path):
+        """Should post diagrams to the configured Kroki server."""
+        output = tmp_path / "out.docx"
+
+        assert markdown_to_docx(self.MARKDOWN, str(output), kroki_url=kroki_stub["url"])
+
+        assert kroki_stub["paths"] == {"/mermaid/png"}
+        assert len(Document(str(output)).inline_shapes) == 1
+
+    def test_repeat_export_makes_no_network_calls(self, kroki_stub, tmp_path):
+        """Should serve unchanged diagrams from the image cache."""
+        markdown_to_docx(self.MARKDOWN, str(tmp_path / "first.docx"), kroki_url=kroki_stub["url"])
+
+        assert markdown_to_docx(self.MARKDOWN, str(tmp_path / "second.docx"), kroki_url=kroki_stub["url"])
+
+        assert kroki_stub["posts"] == 1
+        assert len(Document(str(tmp_path / "second.docx")).inline_shapes) == 1
+
+    def test_environment_url(self, kroki_stub, tmp_path, monkeypatch):
+        """Should fall back to LUMPY_KROKI_URL when no URL is passed."""
+        monkeypatch.setenv("LUMPY_KROKI_URL", kroki_stub["url"])
+
+        assert markdown_to_docx(self.MARKDOWN, str(tmp_path / "out.docx"))
+
+        assert kroki_stub["posts"] == 1
+
+
+DEVLOG = """# Devlog
+
+Generated: 2024-01-01 12:00:00
+
+---
+
+# Commit one
+
+Some **bold** text and `code`.
+
+- item
+- another
+
+```python
+x = 1
+```
+
+---
+
+# Commit two
+
+1. first
+2. second
+
+```text
+---
+```
+"""
+
+
+def _body_xml(path):
+    from lxml import etree
+    return etree.tostring(Document(str(path)).element.body)
+
+
+class TestSplitBlocks:
+    """Tests for splitting markdown into cacheable blocks."""
+
+    def test_splits_at_separators(self):
+        """Should start a block at each top-level separator."""
+        blocks = split_blocks(DEVLOG.split("\n"))
+
+        assert [block[0] for block in blocks] == ["# Devlog", "---", "---"]
+
+    def test_ignores_separators_in_code(self):
+        """Should not split inside fenced code."""
+        blocks = split_blocks(DEVLOG.split("\n"))
+
+        assert "```text" in blocks[-1] and blocks[-1][-3] == "---"
+
+    def test_needs_blank_line_before_separator(self):
+        """Should not split where the separator could belong to a paragraph."""
+        assert len(split_blocks(["text", "---", "more"])) == 1
+
+    def test_indented_fence_in_paragraph_does_not_open_code(self):
+        """Should track fences the way the tokenizer does, not on every ``` line."""
+        lines = ["text", "   ```", "", "---", "", "more"]
+
+        assert [block[0] for block in split_blocks(lines)] == ["text", "---"]
+
+
+class TestBlockCache:
+    """Tests for reusing converted XML per devlog block."""
+
+    @pytest.mark.parametrize("markdown", [
+        DEVLOG,
+        # An indented fence after a paragraph line is paragraph text, so the
+        # later fence opens a code block holding a `---` line
+        "# Devlog\n\nSome text\n   ```\n\n---\n\n```\ncode\n\n---\n\nstill code\n```\n\n---\n\n# After\n",
+    ])
+    def test_matches_uncached_conversion(self, tmp_path, markdown):
+        """Should produce the same body cold, warm and without a cache."""
+        cache = str(tmp_path / "blocks")
+        markdown_to_docx(markdown, str(tmp_path / "plain.docx"))
+        markdown_to_docx(markdown, str(tmp_path / "cold.docx"), block_cache=cache)
+        markdown_to_docx(markdown, str(tmp_path / "warm.docx"), block_cache=cache)
+
+        expected = _body_xml(tmp_path / "plain.docx")
+        assert _body_xml(tmp_path / "cold.docx") == expected
+        assert _body_xml(tmp_path / "warm.docx") == expected
+
+    def test_only_converts_changed_blocks(self, tmp_path, monkeypatch):
+        """Should convert just the new block on the next export."""
+        cache = str(tmp_path / "blocks")
+        markdown_to_docx(DEVLOG, str(tmp_path / "first.docx"), block_cache=cache)
+        converted = []
+        original = md_to_docx_module._convert_lines
+
+        def tracking_convert_lines(doc, lines, *args, **kwargs):
+            converted.append(lines[0])
+            original(doc, lines, *args, **kwargs)
+
+        monkeypatch.setattr(md_to_docx_module, "_convert_lines", tracking_convert_lines)
+
+        markdown_to_docx(DEVLOG + "\n---\n\n# Commit three\n", str(tmp_path / "second.docx"), block_cache=cache)
+
+        assert converted == ["---"]
+        assert len(Document(str(tmp_path / "second.docx")).paragraphs) == len(Document(str(tmp_path / "first.docx")).paragraphs) + 2
+
+    def test_skips_blocks_with_images(self, kroki_stub, tmp_path):
+        """Should not cache blocks whose XML references image parts."""
+        cache = tmp_path / "blocks"
+        markdown = "# Title\n\n---\n\n```mermaid\ngraph TD; A-->B\n```\n"
+
+        markdown_to_docx(markdown, str(tmp_path / "out.docx"), kroki_url=kroki_stub["url"], block_cache=str(cache))
+
+        assert len(list(cache.glob("*.xml"))) == 1
+        markdown_to_docx(markdown, str(tmp_path / "again.docx"), kroki_url=kroki_stub["url"], block_cache=str(cache))
+        assert len(Document(str(tmp_path / "again.docx")).inline_shapes) == 1
+
+    def test_stores_one_file_per_block_without_repeated_namespaces(self, tmp_path):
+        """Should declare namespaces once per block file and drop unused blocks."""
+        cache = tmp_path / "blocks"
+        markdown_to_docx(DEVLOG, str(tmp_path / "first.docx"), block_cache=str(cache))
+
+        files = list(cache.glob("*.xml"))
+        assert len(files) == len(split_blocks(DEVLOG.split("\n")))
+        for path in files:
+            assert path.read_text(encoding="utf-8").count("xmlns:w=") == 1
+
+        markdown_to_docx("# Devlog\n", str(tmp_path / "second.docx"), block_cache=str(cache))
+        assert len(list(cache.glob("*.xml"))) == 1
+
+class TestHighlightedCodeBlock:
+    """Tests for Pygments-highlighted code blocks."""
+
+    def _runs(self, code, language="python"):
+        doc = Document()
+        _add_highlighted_code_block(doc, code, language)
+        return [[(run.text, run.bold, run.font.color.rgb) for run in p.runs] for p in doc.paragraphs]
+
+    def test_one_paragraph_per_line(self):
+        """Should keep each code line in its own shaded paragraph."""
+        lines = self._runs("x = 1\n\ny = 2")
+
+        # Pygments ends the code with a newline, which leaves a trailing empty paragraph
+        assert ["".join(text for text, _, _ in line) for line in lines] == ["x = 1", "", "y = 2", ""]
+
+    def test_merges_runs_with_identical_styling(self):
+        """Should not split text with the same styling into several runs."""
+        lines = self._runs("a = b + c", language="text")
+
+        assert len(lines[0]) == 1
+        assert lines[0][0][0] == "a = b + c"
+
+    def test_adjacent_runs_differ(self):
+        """Should only start a new run when the styling changes."""
+        for line in self._runs("def f(x):\n    return x  # done"):
+            for left, right in zip(line, line[1:]):
+                assert left[1:] != right[1:]
+
+    def test_keyword_styling(self):
+        """Should apply the style's colour and weight to keywords."""
+        line = self._runs("def f(): pass")[0]
+
+        assert ("def", True, RGBColor(0x00, 0x70, 0x20)) in line
+
+
+class TestParseStyle:
+    """Tests for parsing Pygments style strings."""
+
+    def test_parses_attributes(self):
+        """Should pick out colour, bold and italic."""
+        assert _parse_style("bold italic #007020") == ("007020", True, True)
+
+    def test_expands_short_colours(self):
+        """Should expand three-digit colours."""
+        assert _parse_style("#04D") == ("0044DD", False, False)
+
+    def test_ignores_background(self):
+        """Should ignore background and border colours."""
+        assert _parse_style("bg:#f0f0f0 border:#ff0000") == (None, False, False)
+
+
+class TestSanitizeXmlString:
+    """Tests for stripping characters XML 1.0 does not allow."""
+
+    def test_clean_input_returned_unchanged(self):
+        """Should return the same object when nothing needs removing."""
+        text = "Tabs\tnewlines\n\r, accents \u00e9 and emoji \U0001F600"
+        assert _sanitize_xml_string(text) is text
+
+    def test_removes_invalid_characters(self):
+        """Should drop control characters, lone surrogates and U+FFFE/U+FFFF."""
+        text = "a\x00b\x1fc\ud800d\ufffee\uffff\tf"
+        assert _sanitize_xml_string(text) == "abcde\tf"
+
+    def test_file_conversion_sanitizes_once(self, tmp_path, monkeypatch):
+        """Should sanitize file content a single time per export."""
+        calls = []
+        original = md_to_docx_module._sanitize_xml_string
+        monkeypatch.setattr(md_to_docx_module, "_sanitize_xml_string", lambda s: calls.append(s) or original(s))
+        md_file = tmp_path / "devlog.md"
+        md_file.write_text("# Title\n\nBad \x01 byte")
+
+        assert markdown_file_to_docx(str(md_file)) is True
+        assert len(calls) == 1
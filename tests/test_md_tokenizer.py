@@ -0,0 +1,80 @@
+"""Tests for lumpy_log.md_tokenizer module."""
+
+from lumpy_log.md_tokenizer import (
+    tokenize_blocks,
+    BLOCK_HEADING,
+    BLOCK_RULE,
+    BLOCK_BULLET,
+    BLOCK_ORDERED,
+    BLOCK_PARAGRAPH,
+    BLOCK_CODE,
+)
+
+
+def _events(markdown):
+    return list(tokenize_blocks(markdown.split("\n")))
+
+
+class TestTokenizeBlocks:
+    """Tests for the block event stream."""
+
+    def test_headings(self):
+        """Should emit heading level and stripped title."""
+        assert _events("# One\n###   Three  ") == [
+            (BLOCK_HEADING, 1, "One"),
+            (BLOCK_HEADING, 3, "Three"),
+        ]
+
+    def test_hash_without_space_is_paragraph(self):
+        """Should treat #tag as paragraph text."""
+        assert _events("#tag") == [(BLOCK_PARAGRAPH, "#tag")]
+
+    def test_rules(self):
+        """Should recognise ---, *** and ___ as horizontal rules."""
+        assert _events("---\n***\n____") == [(BLOCK_RULE,)] * 3
+
+    def test_lists_with_indent(self):
+        """Should emit bullet and ordered items with indent levels."""
+        assert _events("- a\n  * b\n+ c\n1. d\n    12. e") == [
+            (BLOCK_BULLET, 0, "a"),
+            (BLOCK_BULLET, 1, "b"),
+            (BLOCK_BULLET, 0, "c"),
+            (BLOCK_ORDERED, 0, "d"),
+            (BLOCK_ORDERED, 2, "e"),
+        ]
+
+    def test_paragraph_joins_lines(self):
+        """Should join consecutive lines until a blank, heading or list line."""
+        assert _events("one\n two\n\nthree\n- item\nfour\n# H") == [
+            (BLOCK_PARAGRAPH, "one two"),
+            (BLOCK_PARAGRAPH, "three"),
+            (BLOCK_BULLET, 0, "item"),
+            (BLOCK_PARAGRAPH, "four"),
+            (BLOCK_HEADING, 1, "H"),
+        ]
+
+    def test_paragraph_stops_at_fence(self):
+        """Should end a paragraph at a code fence."""
+        assert _events("text\n```py\nx = 1\n```") == [
+            (BLOCK_PARAGRAPH, "text"),
+            (BLOCK_CODE, "py", "x = 1", True),
+        ]
+
+    def test_code_block_keeps_content_verbatim(self):
+        """Should not tokenize markdown inside fences and lower-case the language."""
+        assert _events("```Python\n# not a heading\n  - not a list\n```") == [
+            (BLOCK_CODE, "python", "# not a heading\n  - not a list", True),
+        ]
+
+    def test_empty_code_block_dropped(self):
+        """Should emit nothing for a fence with no content."""
+        assert _events("```\n```") == []
+
+    def test_unclosed_code_block(self):
+        """Should emit an open fence at the end of input as unclosed."""
+        assert _events("```js\nlet a;") == [(BLOCK_CODE, "js", "let a;", False)]
+
+    def test_is_lazy(self):
+        """Should yield events without consuming the whole input first."""
+        events = tokenize_blocks(["# First"] + ["```"] * 3)
+        assert next(events) == (BLOCK_HEADING, 1, "First")
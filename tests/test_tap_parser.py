@@ -2,7 +2,17 @@
 """Tests for TAP parser module."""
 
 import pytest
-from lumpy_log.tap_parser import SimpleTAPParser, TAPResult, parse_test_output
+import io
+from lumpy_log.tap_parser import (
+    SimpleTAPParser,
+    StreamingTAPParser,
+    TAPResult,
+    MAX_DIAGNOSTIC_LINES,
+    MAX_SUBTESTS,
+    READ_CHUNK,
+    parse_test_output,
+    parse_test_stream,
+)
 
 
 class TestTAPResult:
@@ -309,6 +319,172 @@ not ok 2 - failing test
         assert 'raw_output' not in result  # Parser doesn't include it anymore
 
 
+class TestStreamingTAPParser:
+    """Tests for the incremental TAP parser"""
+    
+    def test_matches_simple_parser(self):
+        """Streaming line by line gives the same counts as parse"""
+        tap_output = """TAP version 13
+1..4
+ok 1 - first
+not ok 2 - second
+ok 3 - third # SKIP later
+not ok 4 - fourth # TODO
+"""
+        parser = StreamingTAPParser()
+        for line in io.StringIO(tap_output):
+            parser.feed_line(line)
+        streamed = parser.finish()
+        parsed = SimpleTAPParser.parse(tap_output)
+        
+        assert streamed.tests_run == parsed.tests_run == 4
+        assert streamed.tests_failed == parsed.tests_failed == 2
+        assert streamed.tests_skipped == parsed.tests_skipped == 1
+        assert streamed.failed_tests == parsed.failed_tests
+        assert streamed.raw_output == ""
+    
+    def test_ignores_lines_after_bail_out(self):
+        """Stops parsing once a Bail out! line is seen"""
+        parser = StreamingTAPParser()
+        parser.feed(["1..3\n", "ok 1\n", "Bail out! broken\n", "not ok 2\n"])
+        result = parser.finish()
+        
+        assert result.tests_run == 1
+        assert [t['number'] for t in result.failed_tests] == ['BAIL']
+    
+    def test_keeps_only_failures(self):
+        """Passing tests are counted but not stored"""
+        parser = StreamingTAPParser()
+        parser.feed("ok {}\n".format(i) for i in range(1, 10001))
+        parser.feed_line("not ok 10001 - last")
+        result = parser.finish()
+        
+        assert result.tests_passed == 10000
+        assert len(result.failed_tests) == 1
+
+
+class TestFailureDiagnostics:
+    """Tests for YAML diagnostics and subtests on failed tests"""
+    
+    def test_captures_yaml_block(self):
+        """Attaches a TAP 13 YAML block and its message to the failure"""
+        tap_output = """TAP version 13
+1..2
+not ok 1 - compares values
+  ---
+  message: values differ
+  at:
+    line: 12
+  ...
+ok 2 - next
+"""
+        result = SimpleTAPParser.parse(tap_output)
+        
+        failed = result.failed_tests[0]
+        assert failed['message'] == 'values differ'
+        assert failed['diagnostics'] == "message: values differ\nat:\n  line: 12"
+        assert result.tests_passed == 1
+    
+    def test_yaml_after_passing_test_ignored(self):
+        """Skips YAML blocks of passing tests without miscounting"""
+        tap_output = "1..2\nok 1\n  ---\n  ok: not a test\n  ...\nnot ok 2\n"
+        result = SimpleTAPParser.parse(tap_output)
+        
+        assert result.tests_run == 2
+        assert 'diagnostics' not in result.failed_tests[0]
+    
+    def test_diagnostics_are_bounded(self):
+        """Keeps at most MAX_DIAGNOSTIC_LINES lines of a YAML block"""
+        lines = ["not ok 1\n", "  ---\n"] + ["  - line\n"] * (MAX_DIAGNOSTIC_LINES + 5)
+        parser = StreamingTAPParser()
+        parser.feed(lines)
+        failed = parser.finish().failed_tests[0]
+        
+        assert failed['diagnostics'].count('- line') == MAX_DIAGNOSTIC_LINES
+        assert failed['diagnostics'].endswith('# ... 5 more lines')
+    
+    def test_unterminated_yaml_ends_on_dedent(self):
+        """Treats a dedented line as the end of an unclosed YAML block"""
+        tap_output = "not ok 1\n  ---\n  message: oops\nok 2\n"
+        result = SimpleTAPParser.parse(tap_output)
+        
+        assert result.tests_passed == 1
+        assert result.failed_tests[0]['message'] == 'oops'
+    
+    def test_failed_subtests_attached_to_parent(self):
+        """Collects failed indented subtests onto the failing parent test"""
+        tap_output = """1..2
+    # Subtest: group
+    ok 1 - inner passes
+    not ok 2 - inner fails
+      ---
+      message: inner broke
+      ...
+    1..2
+not ok 1 - group
+    # Subtest: other
+    not ok 1 - skipped # SKIP
+    1..1
+ok 2 - other
+"""
+        result = SimpleTAPParser.parse(tap_output)
+        
+        assert result.tests_run == 2
+        assert result.tests_failed == 1
+        [subtest] = result.failed_tests[0]['subtests']
+        assert subtest['line'] == 'not ok 2 - inner fails'
+        assert subtest['depth'] == 1
+        assert subtest['message'] == 'inner broke'
+    
+    def test_subtests_are_bounded(self):
+        """Keeps at most MAX_SUBTESTS failed subtests and counts the rest"""
+        lines = ["    not ok {}\n".format(i) for i in range(MAX_SUBTESTS + 3)] + ["not ok 1\n"]
+        parser = StreamingTAPParser()
+        parser.feed(lines)
+        failed = parser.finish().failed_tests[0]
+        
+        assert len(failed['subtests']) == MAX_SUBTESTS
+        assert failed['subtests_dropped'] == 3
+
+
+class TestParseTestStream:
+    """Tests for parse_test_stream"""
+    
+    def test_tap_matches_parse_test_output(self):
+        """Returns the same dictionary as parse_test_output for TAP"""
+        tap_output = "1..2\nok 1 - passing\nnot ok 2 - failing\n"
+        
+        assert parse_test_stream(io.StringIO(tap_output)) == parse_test_output(tap_output)
+    
+    def test_detects_tap_after_preamble(self):
+        """Finds TAP lines within the buffered detection window"""
+        output = "collecting...\n" * 5 + "1..1\nok 1\n"
+        
+        result = parse_test_stream(io.StringIO(output))
+        
+        assert result['format'] == 'tap'
+        assert result['tests_passed'] == 1
+    
+    def test_raw_line_count_matches(self):
+        """Counts raw lines the same way as parse_test_output"""
+        for output in ["Running tests...\nAll done\n", "one line", "x\n" * 50]:
+            assert parse_test_stream(io.StringIO(output)) == parse_test_output(output)
+    
+    def test_line_cut_by_detection_limit(self):
+        """Completes a long line split by the bounded detection read"""
+        output = "ok 1 - " + "x" * (READ_CHUNK * 2) + "\nnot ok 2 - last\n"
+        
+        result = parse_test_stream(io.StringIO(output))
+        
+        assert result['tests_run'] == 2
+        assert result['failed_tests'][0]['description'] == '- last'
+    
+    def test_empty_stream(self):
+        """Whitespace-only streams are reported as empty"""
+        assert parse_test_stream(io.StringIO("  \n\n"))['format'] == 'empty'
+        assert parse_test_stream(io.StringIO(""))['format'] == 'empty'
+
+
 class TestEdgeCases:
     """Tests for edge cases and boundary conditions"""
     
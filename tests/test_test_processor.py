@@ -0,0 +1,128 @@
+"""Tests for lumpy_log.test_processor module."""
+
+import io
+import pytest
+from lumpy_log import OUTPUT_TESTRESULTS_DIR
+import lumpy_log.test_processor as test_processor_module
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    processor = test_processor_module.TestProcessor(str(tmp_path / "devlog"))
+    processor.setup_directories()
+    return processor
+
+
+class TestProcessTestStream:
+    """Tests for streaming test output into a report."""
+
+    def test_writes_report(self, processor):
+        """Should render counts and failures parsed from the stream."""
+        stream = io.StringIO("1..2\nok 1 - passes\nnot ok 2 - breaks\n")
+
+        filepath = processor.process_test_stream(stream)
+
+        content = filepath.read_text(encoding="utf-8")
+        assert "**Tests Run:** 2" in content
+        assert "- breaks" in content
+        assert "Raw Output" not in content
+
+    def test_renders_failure_diagnostics(self, processor):
+        """Should render YAML diagnostics and failed subtests without raw output."""
+        stream = io.StringIO(
+            "1..1\n"
+            "    not ok 1 - inner\n"
+            "not ok 1 - outer\n"
+            "  ---\n"
+            "  message: expected 1\n"
+            "  ...\n"
+        )
+
+        content = processor.process_test_stream(stream).read_text(encoding="utf-8")
+
+        assert "```yaml" in content
+        assert "message: expected 1" in content
+        assert "`not ok 1 - inner`" in content
+
+    def test_renders_junit_results(self, processor):
+        """Should report JUnit XML counts and failures like TAP."""
+        stream = io.StringIO(
+            '<testsuite><testcase name="ok"/>'
+            '<testcase classname="Suite" name="bad"><failure message="nope"/></testcase></testsuite>\n'
+        )
+
+        content = processor.process_test_stream(stream).read_text(encoding="utf-8")
+
+        assert "**Tests Run:** 2" in content
+        assert "Suite.bad" in content
+
+    def test_empty_input_rejected_when_required(self, processor):
+        """Should raise ValueError for empty piped input."""
+        with pytest.raises(ValueError):
+            processor.process_test_stream(io.StringIO("\n"), require_content=True)
+
+        assert list(processor.tests_dir.iterdir()) == []
+
+
+class TestMain:
+    """Tests for the test command entry point."""
+
+    def test_streams_input_file(self, tmp_path, monkeypatch):
+        """Should parse --input files without reading them whole."""
+        monkeypatch.chdir(tmp_path)
+        results = tmp_path / "results.tap"
+        results.write_text("1..1\nok 1 - passes\n", encoding="utf-8")
+
+        def fail_read(*args, **kwargs):
+            raise AssertionError("read_input should not be used")
+        monkeypatch.setattr(test_processor_module.TestProcessor, "read_input", fail_read)
+
+        assert test_processor_module.main({"input": str(results), "outputfolder": "devlog"}) == 0
+        [report] = (tmp_path / "devlog" / OUTPUT_TESTRESULTS_DIR).glob("*.md")
+        assert "**Passed:** 1" in report.read_text(encoding="utf-8")
+
+    def test_raw_output_includes_content(self, tmp_path, monkeypatch):
+        """Should still embed the full output when raw output is requested."""
+        monkeypatch.chdir(tmp_path)
+        results = tmp_path / "results.tap"
+        results.write_text("1..1\nok 1 - passes\n", encoding="utf-8")
+
+        assert test_processor_module.main({"input": str(results), "outputfolder": "devlog", "raw_test_output": True}) == 0
+        [report] = (tmp_path / "devlog" / OUTPUT_TESTRESULTS_DIR).glob("*.md")
+        assert "ok 1 - passes" in report.read_text(encoding="utf-8")
+
+    def test_tee_echoes_stdin(self, tmp_path, monkeypatch, capsys):
+        """Should echo piped output to stdout before reporting the results."""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr("sys.stdin", io.StringIO("1..2\nok 1 - passes\nnot ok 2 - breaks\n"))
+
+        assert test_processor_module.main({"outputfolder": "devlog", "tee": True}) == 0
+
+        out = capsys.readouterr().out
+        assert out.startswith("1..2\nok 1 - passes\nnot ok 2 - breaks\n")
+        assert "Test results saved to" in out
+        [report] = (tmp_path / "devlog" / OUTPUT_TESTRESULTS_DIR).glob("*.md")
+        assert "**Failed:** 1" in report.read_text(encoding="utf-8")
+
+
+class TestTeeReader:
+    """Tests for echoing output while it is consumed."""
+
+    def test_echoes_each_line_as_it_is_read(self):
+        """Should write a line to the output as soon as it is read."""
+        out = io.StringIO()
+        reader = test_processor_module.TeeReader(io.StringIO("a\nb\n"), out)
+
+        assert reader.readline() == "a\n"
+        assert out.getvalue() == "a\n"
+        assert list(reader) == ["b\n"]
+        assert out.getvalue() == "a\nb\n"
+
+    def test_echoes_partial_reads(self):
+        """Should echo size-limited reads of a long line piece by piece."""
+        out = io.StringIO()
+        reader = test_processor_module.TeeReader(io.StringIO("abcdef"), out)
+
+        assert reader.readline(4) == "abcd"
+        assert out.getvalue() == "abcd"
@@ -1,6 +1,7 @@
 """Tests for lumpy_log.utils module."""
 
 import os
+import json
 from pathlib import Path
 import pytest
 from lumpy_log import OUTPUT_CHANGELOGS_DIR, OUTPUT_TESTRESULTS_DIR, OUTPUT_JOURNAL_DIR
@@ -15,7 +16,10 @@ from lumpy_log.utils import (
     _generate_devlog,
     _generate_docx,
     _rebuild_index,
+    ITEM_MANIFEST,
+    HIDDEN_DEVLOG_FILE,
 )
+import lumpy_log.utils as utils_module
 
 
 class TestGetTemplatesDir:
@@ -450,19 +454,18 @@ class TestRebuildIndex:
         assert "devlog" in result
 
     def test_only_docx_removes_devlog_md(self, tmp_path):
-        """Should remove devlog.md if only docx is requested."""
+        """Should keep the devlog hidden instead of writing devlog.md if only docx is requested."""
         change_logs_dir = tmp_path / OUTPUT_CHANGELOGS_DIR
         change_logs_dir.mkdir()
         (change_logs_dir / "20240101_1200_test.md").write_text("content")
+        (tmp_path / "devlog.md").write_text("stale")
 
         result = _rebuild_index(str(tmp_path), output_formats=["docx"])
 
-        # devlog.md should be cleaned up if only docx was requested
-        # and docx failed (since we're not mocking the conversion)
-        # If docx succeeded, the file is cleaned up
-        # If docx failed, the file is cleaned up anyway
-        # So we just check that the behavior is consistent
         assert isinstance(result, dict)
+        assert not (tmp_path / "devlog.md").exists()
+        assert (tmp_path / HIDDEN_DEVLOG_FILE).exists()
+        assert (tmp_path / "devlog.docx").exists()
 
     def test_changelog_order_oldest_first(self, tmp_path):
         """Should order oldest first when changelog_order=False."""
@@ -498,3 +501,201 @@ class TestRebuildIndex:
 
         captured = capsys.readouterr()
         assert "Rebuilding index" in captured.out
+
+
+def _devlog_body(path):
+    """Devlog text without the header lines (which carry the generation time)."""
+    return path.read_text(encoding="utf-8").split("\n", 5)[5]
+
+
+class TestIncrementalRebuild:
+    """Tests for the manifest-driven incremental path of _rebuild_index."""
+
+    @pytest.fixture
+    def output(self, tmp_path):
+        change_logs_dir = tmp_path / OUTPUT_CHANGELOGS_DIR
+        change_logs_dir.mkdir()
+        (change_logs_dir / "20240101_1200_first.md").write_text("# First\n\n\n\nbody  \n")
+        (change_logs_dir / "20240102_1200_second.md").write_text("# Second")
+        return tmp_path
+
+    def _full_rebuild_body(self, output):
+        _rebuild_index(str(output), output_formats=["obsidian", "devlog"], incremental=False)
+        return _devlog_body(output / "devlog.md")
+
+    def test_docx_only_stays_incremental(self, output, capsys):
+        """Should extend the hidden devlog on later docx-only runs."""
+        _rebuild_index(str(output), output_formats=["docx"])
+        (output / OUTPUT_CHANGELOGS_DIR / "20240103_1200_third.md").write_text("# Third")
+        capsys.readouterr()
+
+        _rebuild_index(str(output), verbose=True, output_formats=["docx"])
+
+        assert "Incremental rebuild: 1 new item(s)" in capsys.readouterr().out
+        hidden_body = _devlog_body(output / HIDDEN_DEVLOG_FILE)
+        assert hidden_body == self._full_rebuild_body(output)
+        assert not (output / HIDDEN_DEVLOG_FILE).exists()
+
+    def test_writes_manifest(self, output):
+        """Should record the items it built from."""
+        _rebuild_index(str(output), output_formats=["devlog"])
+
+        manifest = json.loads((output / ITEM_MANIFEST).read_text())
+        assert [entry["path"] for entry in manifest["items"]] == [
+            f"{OUTPUT_CHANGELOGS_DIR}/20240101_1200_first.md",
+            f"{OUTPUT_CHANGELOGS_DIR}/20240102_1200_second.md",
+        ]
+
+    def test_appends_new_items(self, output, capsys):
+        """Should append new items and match a full rebuild."""
+        _rebuild_index(str(output), output_formats=["obsidian", "devlog"])
+        tests_dir = output / OUTPUT_TESTRESULTS_DIR
+        tests_dir.mkdir()
+        (tests_dir / "20240103_1200_tests.md").write_text("# Tests")
+        capsys.readouterr()
+
+        _rebuild_index(str(output), verbose=True, output_formats=["obsidian", "devlog"])
+
+        assert "Incremental rebuild: 1 new item(s)" in capsys.readouterr().out
+        devlog = (output / "devlog.md").read_text(encoding="utf-8")
+        assert "Items: 3 (2 commits, 1 tests, 0 entries)" in devlog
+        assert "20240103_1200_tests" in (output / "index.md").read_text(encoding="utf-8")
+        assert _devlog_body(output / "devlog.md") == self._full_rebuild_body(output)
+
+    def test_full_rebuild_when_item_removed(self, output, capsys):
+        """Should regenerate everything when a known item disappears."""
+        _rebuild_index(str(output), output_formats=["devlog"])
+        (output / OUTPUT_CHANGELOGS_DIR / "20240101_1200_first.md").unlink()
+        capsys.readouterr()
+
+        _rebuild_index(str(output), verbose=True, output_formats=["devlog"])
+
+        assert "Incremental rebuild" not in capsys.readouterr().out
+        assert "# First" not in (output / "devlog.md").read_text(encoding="utf-8")
+
+    def test_full_rebuild_when_item_edited(self, output):
+        """Should regenerate everything when a known item changes."""
+        _rebuild_index(str(output), output_formats=["devlog"])
+        (output / OUTPUT_CHANGELOGS_DIR / "20240102_1200_second.md").write_text("# Second, edited")
+
+        _rebuild_index(str(output), output_formats=["devlog"])
+
+        assert "# Second, edited" in (output / "devlog.md").read_text(encoding="utf-8")
+
+    def test_full_rebuild_when_new_item_sorts_earlier(self, output):
+        """Should regenerate everything when a new item belongs before known ones."""
+        _rebuild_index(str(output), output_formats=["devlog"])
+        (output / OUTPUT_CHANGELOGS_DIR / "20231231_1200_earlier.md").write_text("# Earlier")
+
+        _rebuild_index(str(output), output_formats=["devlog"])
+
+        devlog = (output / "devlog.md").read_text(encoding="utf-8")
+        assert devlog.index("# Earlier") < devlog.index("# First")
+
+    def test_full_rebuild_when_devlog_edited(self, output):
+        """Should regenerate everything when devlog.md no longer matches the manifest."""
+        _rebuild_index(str(output), output_formats=["devlog"])
+        (output / "devlog.md").write_text("stale")
+        (output / OUTPUT_CHANGELOGS_DIR / "20240103_1200_third.md").write_text("# Third")
+
+        _rebuild_index(str(output), output_formats=["devlog"])
+
+        devlog = (output / "devlog.md").read_text(encoding="utf-8")
+        assert "stale" not in devlog
+        assert "# First" in devlog and "# Third" in devlog
+
+
+class TestStreamingDevlog:
+    """Tests for streamed devlog writing."""
+
+    def _items(self, tmp_path, texts):
+        change_logs_dir = tmp_path / OUTPUT_CHANGELOGS_DIR
+        change_logs_dir.mkdir(exist_ok=True)
+        items = []
+        for n, text in enumerate(texts):
+            filename = f"2024010{n + 1}_1200_item.md"
+            (change_logs_dir / filename).write_text(text, encoding="utf-8")
+            items.append({"path": f"{OUTPUT_CHANGELOGS_DIR}/{filename}", "name": filename[:-3], "type": ITEM_TYPE_CHANGELOG, "filename": filename})
+        return items
+
+    def test_matches_whole_document_cleaning(self, tmp_path):
+        """Should produce what cleaning the joined document produces."""
+        texts = ["# One  \n\n\n\ntext\n", "\n\n# Two\n", "# Three\t\n"]
+        items = self._items(tmp_path, texts)
+
+        _generate_devlog(str(tmp_path), items)
+
+        written = (tmp_path / "devlog.md").read_text(encoding="utf-8")
+        header = written.split("\n", 5)[:5]
+        expected = _clean_markdown("\n".join(header + ["", "\n\n---\n\n".join(t.strip() for t in texts)]))
+        assert written == expected
+
+    def test_leaves_no_temp_file(self, tmp_path):
+        """Should move the temp file into place."""
+        items = self._items(tmp_path, ["# One"])
+
+        _generate_devlog(str(tmp_path), items)
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == [OUTPUT_CHANGELOGS_DIR, "devlog.md"]
+
+    def test_layout_records_segment_offsets(self, tmp_path):
+        """Should report where each segment was written."""
+        items = self._items(tmp_path, ["# One", "# Two"])
+
+        layout = _generate_devlog(str(tmp_path), items)["layout"]
+
+        data = (tmp_path / "devlog.md").read_bytes()
+        assert data[layout["body_offset"]:layout["body_offset"] + 1] == b"\n"
+        for item, text in zip(items, [b"# One", b"# Two"]):
+            offset, length = layout["segments"][item["path"]]
+            assert data[offset:offset + length] == text
+
+
+class TestDevlogSegmentCache:
+    """Tests for reusing cached devlog segments on a full rebuild."""
+
+    @pytest.fixture
+    def output(self, tmp_path):
+        change_logs_dir = tmp_path / OUTPUT_CHANGELOGS_DIR
+        change_logs_dir.mkdir()
+        for n in range(1, 4):
+            (change_logs_dir / f"2024010{n}_1200_item.md").write_text(f"# Item {n}\n\ntext \u00e9 {n}\n")
+        return tmp_path
+
+    def _rebuild(self, output):
+        _rebuild_index(str(output), verbose=True, output_formats=["devlog"], incremental=False)
+        return (output / "devlog.md").read_text(encoding="utf-8")
+
+    def test_reuses_unchanged_items(self, output, capsys, monkeypatch):
+        """Should copy every unchanged segment from the existing devlog."""
+        monkeypatch.setattr(utils_module, "DEVLOG_COPY_CHUNK", 3)
+        first = self._rebuild(output)
+        capsys.readouterr()
+
+        second = self._rebuild(output)
+
+        assert "(3 cached, 0 read)" in capsys.readouterr().out
+        assert second.split("\n", 5)[5] == first.split("\n", 5)[5]
+
+    def test_rereads_from_first_changed_item(self, output, capsys):
+        """Should stop reusing segments at the first edited item."""
+        self._rebuild(output)
+        (output / OUTPUT_CHANGELOGS_DIR / "20240102_1200_item.md").write_text("# Item 2, longer now")
+        capsys.readouterr()
+
+        rebuilt = self._rebuild(output)
+
+        assert "(1 cached, 2 read)" in capsys.readouterr().out
+        (output / ITEM_MANIFEST).unlink()
+        assert rebuilt.split("\n", 5)[5] == self._rebuild(output).split("\n", 5)[5]
+
+    def test_ignores_cache_when_devlog_changed(self, output, capsys):
+        """Should read every item if devlog.md no longer matches the manifest."""
+        self._rebuild(output)
+        (output / "devlog.md").write_text("edited by hand")
+        capsys.readouterr()
+
+        rebuilt = self._rebuild(output)
+
+        assert "cached" not in capsys.readouterr().out
+        assert "edited by hand" not in rebuilt